@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException, Body, Query
+import json
+from fastapi import APIRouter, HTTPException, Body, Header, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from app.models.schemas import (
     UserProfile, 
     MealPlan, 
@@ -9,57 +11,224 @@ from app.models.schemas import (
     WorkoutPlanDay
 )
 from app.services.openAI_services import get_meal_plan, get_workout_plan
-from app.services.nutrition_service import calculate_nutrition_for_foods
-from app.services.combined_service import get_meal_plan_with_nutrition
+from app.services.nutrition_service import (
+    calculate_nutrition_for_foods,
+    nutrient_lookups,
+    nutrition_calculations
+)
+from app.services.combined_service import get_meal_plan_with_nutrition, stream_meal_plan_with_nutrition
 from app.models.combined_response import MealPlanWithNutrition
-from typing import List, Union, Dict
+from app.api.serialization import ndjson_line
+from app.services.nutrition_cache import nutrition_cache
+from app.services.nutrient_db import nutrient_db
+from app.services.food_matcher import food_matcher
+from app.services.upstream_scheduler import fatsecret_scheduler
+from app.services.plan_cache import plan_cache
+from app.services.llm_repair import repair_stats
+from app.services.deadline import start_budget
+from app.core.config import settings
+from app.services.metrics_publisher import render_all_workers
+from app.db.database import plan_store
+from app.models.batch_response import BatchJob
+from app.models.weekly_response import WeeklyMealPlan
+from app.models.fitness_response import FitnessPlan
+from app.services.batch_service import create_batch_job, run_batch_job, start_batch_job, get_batch_job
+from app.services.weekly_plan_service import get_weekly_meal_plan
+from app.services.fitness_plan_service import get_fitness_plan
+from pydantic import ValidationError
+from typing import List, Optional, Union, Dict
 
 router = APIRouter()
 
-# In-memory storage to replace MongoDB
-meal_plans_db: Dict[str, MealPlan] = {}
-# In-memory storage for workout plans
-workout_plans_db: Dict[str, WorkoutPlan] = {}
+def with_text(plan, include_text: bool):
+    """Render the legacy text field only for clients that ask for it"""
+    if not include_text:
+        return plan
+    if isinstance(plan, MealPlanWithNutrition):
+        return plan.model_copy(update={"meal_plan": plan.meal_plan.with_text()})
+    return plan.with_text()
+
+def start_request_budget(budget_seconds: Optional[float], budget_header: Optional[float]) -> None:
+    """Apply the query parameter, else the X-Request-Budget header, else the server default"""
+    if budget_seconds is None:
+        budget_seconds = budget_header if budget_header is not None else settings.REQUEST_BUDGET_SECONDS
+    start_budget(budget_seconds)
 
 @router.get("/health")
 async def check_health():
     return {
         "status": "healthy",
-        "message": f"Application is running. Total meal plans in memory: {len(meal_plans_db)}"
+        "message": f"Application is running. Total meal plans stored: {await plan_store.count('meal')}"
     }
 
 @router.post("/meal-plans", response_model=Union[MealPlan, MealPlanWithNutrition])
-async def create_meal_plan(user: UserProfile, include_nutrition: bool = Query(False, description="Include nutrition information for meal plan items")):
+async def create_meal_plan(
+    user: UserProfile,
+    include_nutrition: bool = Query(False, description="Include nutrition information for meal plan items"),
+    use_cache: bool = Query(settings.PLAN_CACHE_ENABLED, description="Reuse a cached plan generated for a similar profile"),
+    pipeline: bool = Query(False, description="With include_nutrition, look up each item while the plan is still being generated"),
+    adjust_rdi: bool = Query(settings.RDI_PROFILE_ADJUSTED, description="Report RDI percentages against the user's calorie target instead of a 2000 kcal diet"),
+    include_text: bool = Query(False, description="Also return the plan as JSON text (meal_plan_text/workout_plan_text) for older clients"),
+    budget_seconds: Optional[float] = Query(None, gt=0, description="Latency budget in seconds; with include_nutrition, items not resolved in time are returned as pending"),
+    budget_header: Optional[float] = Header(None, alias="X-Request-Budget", gt=0, description="Latency budget in seconds (budget_seconds takes precedence)"),
+):
     """Create a new meal plan, optionally with nutrition information"""
+    start_request_budget(budget_seconds, budget_header)
     try:
         if include_nutrition:
-            result = await get_meal_plan_with_nutrition(user)
-            # Store the meal plan in our in-memory db
-            if 'meal_plan' in result and hasattr(result['meal_plan'], 'id'):
-                meal_plans_db[result['meal_plan'].id] = result['meal_plan']
-            return result
+            result = await get_meal_plan_with_nutrition(user, use_cache=use_cache, pipeline=pipeline, adjust_rdi=adjust_rdi)
+            # Store the meal plan in the plan store
+            await plan_store.save("meal", result.meal_plan)
+            return with_text(result, include_text)
         else:
-            meal_plan = await get_meal_plan(user)
-            # Store in our in-memory db
-            meal_plans_db[meal_plan.id] = meal_plan
-            return meal_plan
+            meal_plan = await get_meal_plan(user, use_cache=use_cache)
+            # Store in the plan store
+            await plan_store.save("meal", meal_plan)
+            return with_text(meal_plan, include_text)
+    except HTTPException as e:
+        if e.status_code == 504:
+            raise
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/meal-plans/stream")
+async def stream_meal_plan(
+    user: UserProfile,
+    include_nutrition: bool = Query(False, description="Include nutrition information for meal plan items"),
+    adjust_rdi: bool = Query(settings.RDI_PROFILE_ADJUSTED, description="Report RDI percentages against the user's calorie target instead of a 2000 kcal diet")
+):
+    """Stream a new meal plan as NDJSON, one event per line.
+
+    Events: ``item`` (a validated FoodItem), ``nutrition`` (lookup result for
+    the item at ``index``), then ``done`` with the stored meal plan, or
+    ``error``.
+    """
+    async def events():
+        try:
+            async for event in stream_meal_plan_with_nutrition(user, include_nutrition, adjust_rdi=adjust_rdi):
+                if event["event"] == "done":
+                    meal_plan = event["meal_plan"]
+                    await plan_store.save("meal", meal_plan)
+                yield ndjson_line(event)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield ndjson_line({"event": "error", "detail": detail})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def parse_batch_profiles(body: bytes, content_type: str) -> List[UserProfile]:
+    """Parse a JSON array or JSONL (one profile per line) batch body"""
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            raw_profiles = [json.loads(line) for line in body.decode().splitlines() if line.strip()]
+        else:
+            raw_profiles = json.loads(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+    if not isinstance(raw_profiles, list) or not raw_profiles:
+        raise HTTPException(status_code=400, detail="Batch body must be a non-empty list of profiles")
+
+    profiles = []
+    for index, raw_profile in enumerate(raw_profiles):
+        try:
+            profiles.append(UserProfile.model_validate(raw_profile))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail={"index": index, "errors": e.errors(include_url=False)})
+    return profiles
+
+@router.post("/meal-plans:batch")
+async def create_meal_plans_batch(
+    request: Request,
+    include_nutrition: bool = Query(False, description="Include nutrition information for meal plan items"),
+    adjust_rdi: bool = Query(settings.RDI_PROFILE_ADJUSTED, description="Report RDI percentages against the user's calorie target instead of a 2000 kcal diet"),
+    stream: bool = Query(False, description="Stream results as NDJSON instead of returning a job to poll")
+):
+    """Generate meal plans for many profiles (JSON array or JSONL body).
+
+    Identical profiles are generated once, generation runs through a
+    bounded worker pool and nutrition lookups are shared across the batch.
+    By default the job runs in the background and is polled with
+    ``GET /meal-plans:batch/{job_id}``; with ``stream=true`` each item is
+    streamed as it finishes, followed by the job stats.
+    """
+    profiles = parse_batch_profiles(await request.body(), request.headers.get("content-type", ""))
+    job = await create_batch_job(profiles, include_nutrition, adjust_rdi=adjust_rdi)
+
+    if not stream:
+        start_batch_job(job, profiles)
+        return {"job_id": job.job_id, "status": job.status, "stats": job.stats}
+
+    async def events():
+        async for item in run_batch_job(job, profiles):
+            yield ndjson_line({"event": "item", **item.model_dump()})
+        yield ndjson_line({"event": "done", "job_id": job.job_id, "stats": job.stats})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/meal-plans:batch/{job_id}", response_model=BatchJob)
+async def get_meal_plans_batch(job_id: str):
+    """Get the status, per-item results and throughput stats of a batch job"""
+    job = await get_batch_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+@router.post("/meal-plans:weekly", response_model=WeeklyMealPlan)
+async def create_weekly_meal_plan(
+    user: UserProfile,
+    days: int = Query(7, ge=1, le=7, description="Number of days, starting on Monday"),
+    include_nutrition: bool = Query(True, description="Include per-day and weekly nutrition"),
+    adjust_rdi: bool = Query(settings.RDI_PROFILE_ADJUSTED, description="Report RDI percentages against the user's calorie target instead of a 2000 kcal diet"),
+    budget_seconds: Optional[float] = Query(None, gt=0, description="Latency budget in seconds; items not resolved in time are returned as pending"),
+    budget_header: Optional[float] = Header(None, alias="X-Request-Budget", gt=0, description="Latency budget in seconds (budget_seconds takes precedence)")
+):
+    """Create a multi-day meal plan, generating the days concurrently.
+
+    Each day is steered toward different main foods, foods repeated across
+    days are looked up once, and every day's plan is stored like a
+    single-day plan.
+    """
+    start_request_budget(budget_seconds, budget_header)
+    try:
+        weekly_plan = await get_weekly_meal_plan(user, days=days, include_nutrition=include_nutrition, adjust_rdi=adjust_rdi)
+        for day in weekly_plan.days:
+            await plan_store.save("meal", day.meal_plan)
+        return weekly_plan
+    except HTTPException as e:
+        if e.status_code == 504:
+            raise
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/meal-plans/{meal_plan_id}", response_model=MealPlan)
-async def get_meal_plan_by_id(meal_plan_id: str):
+async def get_meal_plan_by_id(
+    meal_plan_id: str,
+    include_text: bool = Query(False, description="Also return the plan as JSON text (meal_plan_text/workout_plan_text) for older clients")
+):
     """Get a specific meal plan by ID"""
-    if meal_plan_id not in meal_plans_db:
+    meal_plan = await plan_store.get("meal", meal_plan_id)
+    if meal_plan is None:
         raise HTTPException(status_code=404, detail="Meal plan not found")
-    return meal_plans_db[meal_plan_id]
+    return with_text(meal_plan, include_text)
 
 @router.get("/meal-plans", response_model=List[MealPlan])
-async def get_all_meal_plans(skip: int = 0, limit: int = 10):
-    """Get all meal plans with pagination"""
-    plans = list(meal_plans_db.values())
-    start = min(skip, len(plans))
-    end = min(skip + limit, len(plans))
-    return plans[start:end]
+async def get_all_meal_plans(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    include_text: bool = Query(False, description="Also return the plan as JSON text (meal_plan_text/workout_plan_text) for older clients")
+):
+    """Get all meal plans with pagination (pass cursor for keyset pagination)"""
+    try:
+        plans, next_cursor = await plan_store.list("meal", limit, cursor=cursor, skip=skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [with_text(plan, include_text) for plan in plans]
 
 @router.post("/calculate-nutrition", response_model=NutritionResponse)
 async def calculate_nutrition(food_items: List[FoodItem] = Body(...)):
@@ -70,27 +239,119 @@ async def calculate_nutrition(food_items: List[FoodItem] = Body(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Latency histograms, error/skip/cache counters and in-flight gauges in Prometheus text format, summed over all workers"""
+    return PlainTextResponse(await render_all_workers(), media_type="text/plain; version=0.0.4")
+
+@router.get("/nutrition/cache-stats")
+async def get_nutrition_cache_stats():
+    """Hit/miss/eviction counters for the FatSecret nutrition cache and the local nutrient table"""
+    return {**nutrition_cache.stats(), "local_db": nutrient_db.stats()}
+
+@router.get("/nutrition/matcher-stats")
+async def get_food_matcher_stats():
+    """Alias/index hit counters for the food-name matcher that skips FatSecret search"""
+    return food_matcher.stats()
+
+@router.get("/nutrition/scheduler-stats")
+async def get_nutrition_scheduler_stats():
+    """Queue depth, wait times and retry counters for FatSecret calls"""
+    return fatsecret_scheduler.stats()
+
+@router.get("/nutrition/coalescing-stats")
+async def get_nutrition_coalescing_stats():
+    """Executed vs coalesced counts for identical concurrent food lookups and nutrition requests"""
+    return {flight.name: flight.stats() for flight in (nutrient_lookups, nutrition_calculations)}
+
+@router.get("/llm/repair-stats")
+async def get_llm_repair_stats():
+    """How LLM plan responses were decoded (clean, repaired, continued, salvaged, failed) and tokens saved"""
+    return repair_stats.stats()
+
+@router.get("/plan-cache/stats")
+async def get_plan_cache_stats():
+    """Hit/miss/eviction counters for the generated plan cache"""
+    return plan_cache.stats()
+
 @router.post("/workout-plans", response_model=WorkoutPlan)
-async def create_workout_plan(user: UserProfile):
+async def create_workout_plan(
+    user: UserProfile,
+    use_cache: bool = Query(settings.PLAN_CACHE_ENABLED, description="Reuse a cached plan generated for a similar profile"),
+    include_text: bool = Query(False, description="Also return the plan as JSON text (meal_plan_text/workout_plan_text) for older clients"),
+    budget_seconds: Optional[float] = Query(None, gt=0, description="Latency budget in seconds"),
+    budget_header: Optional[float] = Header(None, alias="X-Request-Budget", gt=0, description="Latency budget in seconds (budget_seconds takes precedence)"),
+):
     """Create a new workout plan"""
+    start_request_budget(budget_seconds, budget_header)
     try:
-        workout_plan = await get_workout_plan(user)
-        workout_plans_db[workout_plan.id] = workout_plan
-        return workout_plan
+        workout_plan = await get_workout_plan(user, use_cache=use_cache)
+        await plan_store.save("workout", workout_plan)
+        return with_text(workout_plan, include_text)
+    except HTTPException as e:
+        if e.status_code == 504:
+            raise
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/workout-plans/{workout_plan_id}", response_model=WorkoutPlan)
-async def get_workout_plan_by_id(workout_plan_id: str):
+async def get_workout_plan_by_id(
+    workout_plan_id: str,
+    include_text: bool = Query(False, description="Also return the plan as JSON text (meal_plan_text/workout_plan_text) for older clients")
+):
     """Get a specific workout plan by ID"""
-    if workout_plan_id not in workout_plans_db:
+    workout_plan = await plan_store.get("workout", workout_plan_id)
+    if workout_plan is None:
         raise HTTPException(status_code=404, detail="Workout plan not found")
-    return workout_plans_db[workout_plan_id]
+    return with_text(workout_plan, include_text)
 
 @router.get("/workout-plans", response_model=List[WorkoutPlan])
-async def get_all_workout_plans(skip: int = 0, limit: int = 10):
-    """Get all workout plans with pagination"""
-    plans = list(workout_plans_db.values())
-    start = min(skip, len(plans))
-    end = min(skip + limit, len(plans))
-    return plans[start:end]
\ No newline at end of file
+async def get_all_workout_plans(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    include_text: bool = Query(False, description="Also return the plan as JSON text (meal_plan_text/workout_plan_text) for older clients")
+):
+    """Get all workout plans with pagination (pass cursor for keyset pagination)"""
+    try:
+        plans, next_cursor = await plan_store.list("workout", limit, cursor=cursor, skip=skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [with_text(plan, include_text) for plan in plans]
+
+@router.post("/fitness-plans", response_model=FitnessPlan)
+async def create_fitness_plan(
+    user: UserProfile,
+    use_cache: bool = Query(settings.PLAN_CACHE_ENABLED, description="Reuse cached plans generated for a similar profile"),
+    pipeline: bool = Query(False, description="Look up each meal item while the meal plan is still being generated"),
+    adjust_rdi: bool = Query(settings.RDI_PROFILE_ADJUSTED, description="Report RDI percentages against the user's calorie target instead of a 2000 kcal diet"),
+    include_text: bool = Query(False, description="Also return the plans as JSON text (meal_plan_text/workout_plan_text) for older clients"),
+    budget_seconds: Optional[float] = Query(None, gt=0, description="Latency budget in seconds; meal items not resolved in time are returned as pending"),
+    budget_header: Optional[float] = Header(None, alias="X-Request-Budget", gt=0, description="Latency budget in seconds (budget_seconds takes precedence)"),
+):
+    """Create a meal plan with nutrition and a workout plan in one request.
+
+    Both plans are generated concurrently and stored like their single-plan
+    counterparts, linked through workout_plan_id and meal_plan_id.
+    """
+    start_request_budget(budget_seconds, budget_header)
+    try:
+        fitness_plan = await get_fitness_plan(user, use_cache=use_cache, pipeline=pipeline, adjust_rdi=adjust_rdi)
+        await plan_store.save("meal", fitness_plan.meal_plan.meal_plan)
+        await plan_store.save("workout", fitness_plan.workout_plan)
+        if include_text:
+            fitness_plan = fitness_plan.model_copy(update={
+                "meal_plan": with_text(fitness_plan.meal_plan, True),
+                "workout_plan": with_text(fitness_plan.workout_plan, True),
+            })
+        return fitness_plan
+    except HTTPException as e:
+        if e.status_code == 504:
+            raise
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
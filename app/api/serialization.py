@@ -0,0 +1,25 @@
+import json
+from typing import Any, Type
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+
+def response_class() -> Type[JSONResponse]:
+    """Default response class for the app: ORJSONResponse when orjson is available"""
+    if settings.ORJSON_RESPONSES and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+def ndjson_line(event: Any) -> bytes:
+    """Encode one NDJSON streaming event, newline included"""
+    data = jsonable_encoder(event)
+    if settings.ORJSON_RESPONSES and orjson is not None:
+        return orjson.dumps(data) + b"\n"
+    return (json.dumps(data) + "\n").encode()
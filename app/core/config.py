@@ -2,7 +2,7 @@ import os
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 from functools import lru_cache
-from typing import ClassVar, Dict
+from typing import ClassVar, Dict, List
 
 load_dotenv()
 
@@ -11,28 +11,140 @@ class Settings(BaseSettings):
     API_KEY: str
     API_URL: str = "https://api.openai.com/v1/chat/completions"
     MODEL: str = "gpt-4.1"  # or "gpt-3.5-turbo"
+
+    # LLM HTTP client (shared connection pool)
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_CONNECTIONS_PER_HOST: int = 20
+    LLM_KEEPALIVE_SECONDS: float = 60.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    # Per attempt; under a request budget the budget wins (see below)
+    LLM_TIMEOUT_SECONDS: float = 120.0
+
+    # Default latency budget for plan requests (X-Request-Budget header or
+    # budget_seconds query parameter override it); 0 means no budget.
+    # Each LLM call is cut to what is left of the budget, so with the
+    # defaults an interactive LLM call gets at most 60 s and
+    # LLM_TIMEOUT_SECONDS only applies to requests without a budget.
+    # FatSecret calls keep FAT_SECRET_TIMEOUT_SECONDS: items still being
+    # looked up at the deadline are returned as pending and their lookups
+    # finish in the background to fill the cache
+    REQUEST_BUDGET_SECONDS: float = 60.0
+
+    # Ask the model to finish a plan cut off mid-array instead of regenerating it
+    LLM_CONTINUATION_ENABLED: bool = True
+
+    # max_tokens is sized from the expected plan (see app.services.prompts):
+    # the estimate times the headroom, clamped to these bounds
+    LLM_OUTPUT_TOKEN_HEADROOM: float = 1.3
+    LLM_MIN_OUTPUT_TOKENS: int = 256
+    LLM_MAX_OUTPUT_TOKENS: int = 8192
     
     # FatSecret API Configuration
     FAT_SECRET_BASEURL: str = "https://platform.fatsecret.com/rest/server.api"
     FAT_SECRET_CLIENT_ID: str
     FAT_SECRET_CLIENT_SECRET: str
     FAT_SECRET_AUTH_URL: str = "https://oauth.fatsecret.com/connect/token"
+    FAT_SECRET_MAX_CONNECTIONS_PER_HOST: int = 20
+    FAT_SECRET_TIMEOUT_SECONDS: float = 15.0
+    FAT_SECRET_TOKEN_REFRESH_MARGIN_SECONDS: int = 300
+    FAT_SECRET_MAX_CONCURRENCY: int = 10
+    FAT_SECRET_RATE_LIMIT_PER_SECOND: float = 20.0
+    FAT_SECRET_RATE_LIMIT_BURST: int = 20
+
+    # Retry policy for upstream calls (429/5xx)
+    UPSTREAM_MAX_RETRIES: int = 3
+    UPSTREAM_BACKOFF_BASE_SECONDS: float = 0.25
+    UPSTREAM_BACKOFF_MAX_SECONDS: float = 4.0
+
+    # Local nutrient database (per-100 g table; FatSecret is the fallback)
+    NUTRIENT_DB_ENABLED: bool = True
+    NUTRIENT_DB_PATH: str = ""  # empty means the bundled app/data/foods.csv
+
+    # Food-name matching (skips foods.search for confident matches)
+    FOOD_MATCH_MIN_SCORE: float = 0.8  # trigram Dice similarity, 0-1
+    FOOD_ALIAS_PATH: str = "./data/food_aliases.db"
+    FOOD_CATALOG_PATH: str = ""  # optional CSV export with food_id,food_name columns
+
+    # Nutrition cache (in-process LRU in front of an on-disk SQLite store)
+    NUTRITION_CACHE_SIZE: int = 2048
+    NUTRITION_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    NUTRITION_CACHE_DISK_TTL_SECONDS: int = 30 * 24 * 60 * 60
+    NUTRITION_CACHE_PATH: str = "./data/nutrition_cache.db"
+    NUTRITION_CACHE_WARM_FOODS: List[str] = []
     
-    # RDI Values (based on 2000 calorie diet) - standard values
+    # Plan cache (opt-in reuse of generated plans for similar profiles)
+    PLAN_CACHE_ENABLED: bool = False
+    PLAN_CACHE_SIZE: int = 1024
+    PLAN_CACHE_TTL_SECONDS: int = 6 * 60 * 60
+    PLAN_CACHE_VARIANTS_PER_KEY: int = 3
+    PLAN_CACHE_AGE_BAND_YEARS: int = 5
+    PLAN_CACHE_WEIGHT_BAND_KG: float = 5.0
+    PLAN_CACHE_CALORIE_BAND_KCAL: int = 100  # meal plans only
+
+    # Plan storage: "sqlite" (default), "memory" or "mongo"
+    PLAN_STORE_BACKEND: str = "sqlite"
+    PLAN_STORE_PATH: str = "./data/plans.db"
+    PLAN_STORE_BATCH_SIZE: int = 50
+    PLAN_STORE_FLUSH_INTERVAL_SECONDS: float = 0.5
+    PLAN_STORE_RETENTION_DAYS: int = 90
+    PLAN_STORE_MAX_PLANS: int = 0  # per plan type; 0 means unlimited
+    PLAN_STORE_MEMORY_MAX_PLANS: int = 10000
+    MONGO_URI: str = "mongodb://localhost:27017"
+    DB_NAME: str = "meal_plan_api"
+
+    # State shared by all worker processes (FatSecret token, plan cache, batch jobs);
+    # empty keeps it per-process, which is only correct with a single worker
+    SHARED_STATE_PATH: str = "./data/shared_state.db"
+
+    # Weekly meal plans: days generated concurrently, at most this many at once
+    WEEKLY_PLAN_MAX_PARALLEL_DAYS: int = 7
+
+    # Batch meal-plan generation
+    BATCH_MAX_WORKERS: int = 8
+    BATCH_MAX_PROFILES: int = 1000
+    BATCH_MAX_JOBS: int = 100  # finished jobs kept for polling
+    BATCH_JOB_TTL_SECONDS: int = 24 * 60 * 60  # progress shared with other workers
+
+    # RDI Values (based on 2000 calorie diet) - standard values, keyed by NutritionResponse field
     RDI_VALUES: ClassVar[Dict[str, int]] = {
+        "calories": 2000,  # kcal
         "protein": 50,  # g
         "carbs": 300,  # g
         "fat": 65,  # g
-        "saturatedFat": 20,  # g
+        "saturated_fat": 20,  # g
+        "sugar": 50,  # g
         "fiber": 25,  # g
         "cholesterol": 300,  # mg
         "sodium": 2300,  # mg
         "potassium": 4700,  # mg
         "calcium": 1000,  # mg
         "iron": 18,  # mg
-        "vitaminA": 900,  # mcg RAE
-        "vitaminC": 90,  # mg
+        "vitamin_a": 900,  # mcg RAE
+        "vitamin_c": 90,  # mg
     }
+    RDI_REFERENCE_CALORIES: int = 2000
+    # Scale energy-based RDIs to each user's calorie target by default
+    RDI_PROFILE_ADJUSTED: bool = False
+
+    # Calorie and macro targets: plans with nutrition whose calories miss the
+    # target by more than the tolerance get every portion rescaled locally;
+    # macros outside the tolerance are reported in the plan's targets
+    PLAN_CALORIE_TOLERANCE: float = 0.10
+    PLAN_RESCALE_MIN_FACTOR: float = 0.5
+    PLAN_RESCALE_MAX_FACTOR: float = 2.0
+
+    # Metrics: each worker publishes its values to shared state this often, and
+    # GET /metrics on any worker sums them. A worker that stops publishing
+    # (e.g. restarted) drops out after the TTL, which Prometheus sees as a reset.
+    METRICS_PUBLISH_INTERVAL_SECONDS: float = 5.0
+    METRICS_WORKER_TTL_SECONDS: int = 60
+
+    # Serialize responses with orjson when it is installed
+    ORJSON_RESPONSES: bool = True
+
+    # Logging (queued, written by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False  # one JSON object per line instead of plain text
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,272 @@
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans a local cache hit up to a slow LLM completion
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """Base for metrics rendered in the Prometheus text exposition format"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def collect(self) -> Dict[LabelValues, Any]:
+        """Current value per label set, JSON-serializable so workers can share it"""
+
+    @staticmethod
+    def merge(a: Any, b: Any) -> Any:
+        """Combine one label set's values from two worker processes"""
+        return a + b
+
+    @abstractmethod
+    def samples(self, values: Optional[Dict[LabelValues, Any]] = None) -> List[str]:
+        """Sample lines for ``values``, or for this worker's current values"""
+
+    def render(self, values: Optional[Dict[LabelValues, Any]] = None) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples(values)]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self, values: Optional[Dict[LabelValues, float]] = None) -> List[str]:
+        if values is None:
+            values = self.collect()
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Count the block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last slot is +Inf), sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the block, including when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> Dict[LabelValues, Tuple[List[int], float]]:
+        with self._lock:
+            return {key: (list(counts), total[0]) for key, (counts, total) in self._series.items()}
+
+    @staticmethod
+    def merge(a: Tuple[List[int], float], b: Tuple[List[int], float]) -> Tuple[List[int], float]:
+        return [x + y for x, y in zip(a[0], b[0])], a[1] + b[1]
+
+    def samples(self, values: Optional[Dict[LabelValues, Tuple[List[int], float]]] = None) -> List[str]:
+        if values is None:
+            values = self.collect()
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Metric read at scrape time from counters a component already keeps.
+
+    Each source returns ``{label value: number}`` for the single label.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, labelname: str):
+        super().__init__(name, help, (labelname,))
+        self.kind = kind
+        self._sources: List[Callable[[], Dict[str, float]]] = []
+
+    def add_source(self, source: Callable[[], Dict[str, float]]) -> None:
+        self._sources.append(source)
+
+    def collect(self) -> Dict[LabelValues, float]:
+        values: Dict[LabelValues, float] = {}
+        for source in self._sources:
+            for label, value in source().items():
+                values[(str(label),)] = values.get((str(label),), 0.0) + value
+        return values
+
+    def samples(self, values: Optional[Dict[LabelValues, float]] = None) -> List[str]:
+        if values is None:
+            values = self.collect()
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+    def snapshot(self) -> Dict[str, List[list]]:
+        """This process's values as JSON-ready ``{metric: [[labels, value], ...]}``"""
+        return {
+            name: [[list(key), value] for key, value in metric.collect().items()]
+            for name, metric in self._metrics.items()
+        }
+
+    def render_merged(self, snapshots: Iterable[Dict[str, List[list]]]) -> str:
+        """Render the sum of several processes' snapshots (see ``snapshot``)"""
+        merged: Dict[str, Dict[LabelValues, Any]] = {name: {} for name in self._metrics}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged[name]
+                for labels, value in series:
+                    key = tuple(labels)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+        return "\n".join(metric.render(merged[name]) for name, metric in self._metrics.items()) + "\n"
+
+
+registry = Registry()
+
+# Latency
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_seconds", "Total request time through the last response chunk, by route template",
+    ("method", "route", "status")))
+LLM_REQUEST_SECONDS = registry.register(Histogram(
+    "llm_request_seconds", "Chat-completions call duration (streams until the last chunk)", ("mode",)))
+FATSECRET_REQUEST_SECONDS = registry.register(Histogram(
+    "fatsecret_request_seconds", "FatSecret API call duration per attempt", ("method",)))
+FATSECRET_TOKEN_REFRESH_SECONDS = registry.register(Histogram(
+    "fatsecret_token_refresh_seconds", "FatSecret OAuth token refresh duration"))
+PLAN_PARSE_SECONDS = registry.register(Histogram(
+    "plan_parse_seconds", "Decoding and validating LLM output into a plan", ("kind",)))
+
+# Token usage per chat-completions call, as reported by the API
+LLM_TOKENS = registry.register(Histogram(
+    "llm_tokens", "Tokens per chat-completions call, by prompt kind and type (prompt, cached_prompt, completion)",
+    ("kind", "type"), buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)))
+
+# Errors and skipped work
+UPSTREAM_ERRORS = registry.register(Counter(
+    "upstream_errors_total", "Failed upstream calls, by upstream and HTTP status (0 for connection errors)",
+    ("upstream", "status")))
+MEAL_ITEMS_SKIPPED = registry.register(Counter(
+    "meal_items_skipped_total", "Meal items dropped from a plan or its nutrition", ("reason",)))
+PLAN_TARGET_CHECKS = registry.register(Counter(
+    "plan_target_checks_total",
+    "Meal plans checked against their targets, by target (calories, protein_g, carbs_g, fat_g) and outcome",
+    ("target", "outcome")))
+
+# Concurrency
+UPSTREAM_IN_FLIGHT = registry.register(Gauge(
+    "upstream_in_flight", "Upstream HTTP requests currently in progress", ("upstream",)))
+
+# Caches report their own counters at scrape time
+CACHE_HITS = registry.register(CallbackMetric("cache_hits_total", "Cache hits, by cache", "counter", "cache"))
+CACHE_MISSES = registry.register(CallbackMetric("cache_misses_total", "Cache misses, by cache", "counter", "cache"))
+
+# Identical concurrent calls that ran once vs. joined a call already in flight
+SINGLE_FLIGHT_EXECUTED = registry.register(CallbackMetric(
+    "single_flight_executed_total", "Calls that did the work, by coalescing group", "counter", "flight"))
+SINGLE_FLIGHT_COALESCED = registry.register(CallbackMetric(
+    "single_flight_coalesced_total", "Calls that shared an identical call in flight, by coalescing group",
+    "counter", "flight"))
+
+# LLM plan responses by how they were decoded, and completion tokens not regenerated thanks to repair
+LLM_OUTPUT_DECODES = registry.register(CallbackMetric(
+    "llm_output_decodes_total", "LLM plan responses by decode outcome", "counter", "outcome"))
+LLM_TOKENS_SAVED = registry.register(CallbackMetric(
+    "llm_tokens_saved_total", "Completion tokens a full re-request would have cost", "counter", "source"))
@@ -1,16 +1,28 @@
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
-from app.models.schemas import MealPlan
+from app.db.plan_store import PlanStore, InMemoryPlanStore, SQLitePlanStore, MongoPlanStore
 
-async def init_db():
-    # Create Motor client
-    client = AsyncIOMotorClient(settings.MONGO_URI)
-    
-    # Initialize beanie with the document models
-    await init_beanie(
-        database=client[settings.DB_NAME],
-        document_models=[MealPlan]
-    )
-    
-    return client
+
+def create_plan_store() -> PlanStore:
+    """Build the plan store selected by PLAN_STORE_BACKEND"""
+    backend = settings.PLAN_STORE_BACKEND.lower()
+    if backend == "sqlite":
+        return SQLitePlanStore(
+            path=settings.PLAN_STORE_PATH,
+            batch_size=settings.PLAN_STORE_BATCH_SIZE,
+            flush_interval=settings.PLAN_STORE_FLUSH_INTERVAL_SECONDS,
+            retention_days=settings.PLAN_STORE_RETENTION_DAYS,
+            max_plans=settings.PLAN_STORE_MAX_PLANS,
+        )
+    if backend == "memory":
+        return InMemoryPlanStore(max_plans=settings.PLAN_STORE_MEMORY_MAX_PLANS)
+    if backend == "mongo":
+        return MongoPlanStore(uri=settings.MONGO_URI, db_name=settings.DB_NAME)
+    raise ValueError(f"Unknown PLAN_STORE_BACKEND: {settings.PLAN_STORE_BACKEND}")
+
+
+plan_store = create_plan_store()
+
+
+async def init_db() -> PlanStore:
+    await plan_store.open()
+    return plan_store
@@ -0,0 +1,328 @@
+import asyncio
+import base64
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Type, Union
+from app.models.schemas import MealPlan, WorkoutPlan
+
+logger = logging.getLogger(__name__)
+
+Plan = Union[MealPlan, WorkoutPlan]
+
+PLAN_MODELS: Dict[str, Type[Plan]] = {"meal": MealPlan, "workout": WorkoutPlan}
+
+
+def _sort_key(plan: Plan) -> Tuple[str, str]:
+    # Fixed-width timestamp so keys sort lexically in SQL and in Python
+    return plan.created_at.strftime("%Y-%m-%dT%H:%M:%S.%f"), plan.id
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, plan_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(plan_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class PlanStore(ABC):
+    """Storage backend for generated meal and workout plans.
+
+    ``kind`` is ``"meal"`` or ``"workout"``. Listing is oldest-first with
+    keyset pagination: pass the returned cursor back to get the next page.
+    """
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def save(self, kind: str, plan: Plan) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, kind: str, plan_id: str) -> Optional[Plan]:
+        ...
+
+    @abstractmethod
+    async def list(self, kind: str, limit: int, cursor: Optional[str] = None,
+                   skip: int = 0) -> Tuple[List[Plan], Optional[str]]:
+        """Return up to ``limit`` plans after ``cursor`` and the next cursor"""
+
+    @abstractmethod
+    async def count(self, kind: str) -> int:
+        ...
+
+
+class InMemoryPlanStore(PlanStore):
+    """Bounded in-process store; a local stand-in for the database backends"""
+
+    def __init__(self, max_plans: int):
+        self.max_plans = max_plans
+        self._plans: Dict[str, Dict[str, Plan]] = {kind: {} for kind in PLAN_MODELS}
+        self._keys: Dict[str, List[Tuple[str, str]]] = {kind: [] for kind in PLAN_MODELS}
+
+    async def save(self, kind: str, plan: Plan) -> None:
+        plans, keys = self._plans[kind], self._keys[kind]
+        if plan.id in plans:
+            keys.remove(_sort_key(plans[plan.id]))
+        plans[plan.id] = plan
+        bisect.insort(keys, _sort_key(plan))
+        # Retention: drop the oldest plans beyond the cap
+        while self.max_plans and len(keys) > self.max_plans:
+            _, oldest_id = keys.pop(0)
+            del plans[oldest_id]
+
+    async def get(self, kind: str, plan_id: str) -> Optional[Plan]:
+        return self._plans[kind].get(plan_id)
+
+    async def list(self, kind: str, limit: int, cursor: Optional[str] = None,
+                   skip: int = 0) -> Tuple[List[Plan], Optional[str]]:
+        keys = self._keys[kind]
+        start = bisect.bisect_right(keys, decode_cursor(cursor)) if cursor else skip
+        page = keys[start:start + limit]
+        next_cursor = encode_cursor(page[-1]) if page and start + limit < len(keys) else None
+        return [self._plans[kind][plan_id] for _, plan_id in page], next_cursor
+
+    async def count(self, kind: str) -> int:
+        return len(self._plans[kind])
+
+
+class SQLitePlanStore(PlanStore):
+    """Embedded SQLite store with batched writes and a retention policy.
+
+    Saves are buffered and written with one ``executemany`` when the batch
+    fills or the flush interval passes; reads see buffered plans
+    immediately.
+    """
+
+    def __init__(self, path: str, batch_size: int, flush_interval: float,
+                 retention_days: int, max_plans: int):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.max_plans = max_plans
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Plan] = {}
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    # -- database helpers (run in a worker thread) -------------------------
+
+    def _connect(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " kind TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " created_at TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " PRIMARY KEY (kind, id))"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS plans_kind_created ON plans (kind, created_at, id)")
+        db.commit()
+        self._db = db
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _write_rows(self, rows: List[tuple]) -> None:
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO plans (kind, id, created_at, payload) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    def _apply_retention(self) -> None:
+        with self._db_lock:
+            if self.retention_days:
+                cutoff = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime("%Y-%m-%dT%H:%M:%S.%f")
+                self._db.execute("DELETE FROM plans WHERE created_at < ?", (cutoff,))
+            if self.max_plans:
+                for kind in PLAN_MODELS:
+                    self._db.execute(
+                        "DELETE FROM plans WHERE kind = ? AND (created_at, id) < ("
+                        " SELECT created_at, id FROM plans WHERE kind = ?"
+                        " ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?)",
+                        (kind, kind, self.max_plans - 1),
+                    )
+            self._db.commit()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def open(self) -> None:
+        if self._db is None:
+            # Created here so the lock belongs to the running event loop
+            self._flush_lock = asyncio.Lock()
+            await asyncio.to_thread(self._connect)
+            await asyncio.to_thread(self._apply_retention)
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._db is not None:
+            await self.flush()
+            db, self._db = self._db, None
+            await asyncio.to_thread(db.close)
+
+    async def _flush_periodically(self) -> None:
+        retention_every = max(1, int(3600 / self.flush_interval))
+        ticks = 0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                ticks += 1
+                if ticks % retention_every == 0:
+                    await asyncio.to_thread(self._apply_retention)
+            except Exception as e:
+                logger.exception("Error flushing plan store: %s", e)
+
+    async def flush(self) -> None:
+        """Write all buffered plans in one batch"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            if not self._pending or self._db is None:
+                return
+            batch = dict(self._pending)
+            rows = [
+                (kind, plan.id, _sort_key(plan)[0], plan.model_dump_json())
+                for (kind, _), plan in batch.items()
+            ]
+            await asyncio.to_thread(self._write_rows, rows)
+            # Keep anything re-saved while the batch was being written
+            for key, plan in batch.items():
+                if self._pending.get(key) is plan:
+                    del self._pending[key]
+
+    # -- PlanStore API -----------------------------------------------------
+
+    async def save(self, kind: str, plan: Plan) -> None:
+        await self.open()
+        self._pending[(kind, plan.id)] = plan
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def get(self, kind: str, plan_id: str) -> Optional[Plan]:
+        pending = self._pending.get((kind, plan_id))
+        if pending is not None:
+            return pending
+        await self.open()
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT payload FROM plans WHERE kind = ? AND id = ?", (kind, plan_id)
+        )
+        return PLAN_MODELS[kind].model_validate_json(rows[0][0]) if rows else None
+
+    async def list(self, kind: str, limit: int, cursor: Optional[str] = None,
+                   skip: int = 0) -> Tuple[List[Plan], Optional[str]]:
+        await self.open()
+        await self.flush()
+        if cursor:
+            created_at, plan_id = decode_cursor(cursor)
+            rows = await asyncio.to_thread(
+                self._execute,
+                "SELECT created_at, id, payload FROM plans WHERE kind = ? AND (created_at, id) > (?, ?)"
+                " ORDER BY created_at, id LIMIT ?",
+                (kind, created_at, plan_id, limit + 1),
+            )
+        else:
+            rows = await asyncio.to_thread(
+                self._execute,
+                "SELECT created_at, id, payload FROM plans WHERE kind = ?"
+                " ORDER BY created_at, id LIMIT ? OFFSET ?",
+                (kind, limit + 1, skip),
+            )
+
+        page = rows[:limit]
+        next_cursor = encode_cursor((page[-1][0], page[-1][1])) if len(rows) > limit else None
+        model = PLAN_MODELS[kind]
+        return [model.model_validate_json(payload) for _, _, payload in page], next_cursor
+
+    async def count(self, kind: str) -> int:
+        await self.open()
+        await self.flush()
+        rows = await asyncio.to_thread(self._execute, "SELECT COUNT(*) FROM plans WHERE kind = ?", (kind,))
+        return rows[0][0]
+
+
+class MongoPlanStore(PlanStore):
+    """MongoDB store via Motor (optional dependency: ``pip install motor``)"""
+
+    def __init__(self, uri: str, db_name: str):
+        self.uri = uri
+        self.db_name = db_name
+        self._client = None
+        self._db = None
+
+    async def open(self) -> None:
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+        except ImportError as e:
+            raise RuntimeError("PLAN_STORE_BACKEND=mongo requires the 'motor' package") from e
+
+        self._client = AsyncIOMotorClient(self.uri)
+        self._db = self._client[self.db_name]
+        for kind in PLAN_MODELS:
+            collection = self._db[f"{kind}_plans"]
+            await collection.create_index("id", unique=True)
+            await collection.create_index([("created_at", 1), ("id", 1)])
+
+    async def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def save(self, kind: str, plan: Plan) -> None:
+        document = plan.model_dump(mode="json")
+        document["created_at"] = _sort_key(plan)[0]
+        await self._db[f"{kind}_plans"].replace_one({"id": plan.id}, document, upsert=True)
+
+    async def get(self, kind: str, plan_id: str) -> Optional[Plan]:
+        document = await self._db[f"{kind}_plans"].find_one({"id": plan_id}, {"_id": 0})
+        return PLAN_MODELS[kind].model_validate(document) if document else None
+
+    async def list(self, kind: str, limit: int, cursor: Optional[str] = None,
+                   skip: int = 0) -> Tuple[List[Plan], Optional[str]]:
+        query = {}
+        if cursor:
+            created_at, plan_id = decode_cursor(cursor)
+            query = {"$or": [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "id": {"$gt": plan_id}},
+            ]}
+        find = self._db[f"{kind}_plans"].find(query, {"_id": 0}).sort([("created_at", 1), ("id", 1)])
+        if not cursor and skip:
+            find = find.skip(skip)
+        documents = await find.limit(limit + 1).to_list(length=limit + 1)
+
+        page = documents[:limit]
+        next_cursor = encode_cursor((page[-1]["created_at"], page[-1]["id"])) if len(documents) > limit else None
+        model = PLAN_MODELS[kind]
+        return [model.model_validate(document) for document in page], next_cursor
+
+    async def count(self, kind: str) -> int:
+        return await self._db[f"{kind}_plans"].count_documents({})
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class SharedState:
+    """Small key-value store with expiry, shared by every worker process on the host.
+
+    Backed by a SQLite file in WAL mode, so gunicorn workers see each
+    other's writes (the FatSecret token, plan cache entries, batch job
+    progress). With an empty path it falls back to a process-local dict,
+    which is only correct with a single worker.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._open_lock: Optional[asyncio.Lock] = None
+        self._local: Dict[str, Tuple[float, str]] = {}
+
+    # -- database helpers (run in a worker thread) -------------------------
+
+    def _open_db(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        db.execute("DELETE FROM shared_state WHERE expires_at < ?", (time.time(),))
+        db.commit()
+        self._db = db
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value FROM shared_state WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _disk_get_prefix(self, prefix: str) -> Dict[str, str]:
+        # A key range rather than LIKE, so the primary key index is used
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM shared_state WHERE key >= ? AND key < ? AND expires_at >= ?",
+                (prefix, prefix + "\uffff", time.time()),
+            ).fetchall()
+        return dict(rows)
+
+    def _disk_set(self, key: str, value: str, expires_at: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._db.commit()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def open(self) -> None:
+        """Open the SQLite file; called lazily, safe to call more than once"""
+        if self._db is not None or not self.path:
+            return
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._db is None:
+                await asyncio.to_thread(self._open_db)
+
+    async def close(self) -> None:
+        if self._db is not None:
+            db, self._db = self._db, None
+            await asyncio.to_thread(db.close)
+
+    # -- API ---------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[str]:
+        await self.open()
+        if self._db is not None:
+            return await asyncio.to_thread(self._disk_get, key)
+        entry = self._local.get(key)
+        if entry is None or entry[0] < time.time():
+            self._local.pop(key, None)
+            return None
+        return entry[1]
+
+    async def get_prefix(self, prefix: str) -> Dict[str, str]:
+        """Every unexpired entry whose key starts with ``prefix``"""
+        await self.open()
+        if self._db is not None:
+            return await asyncio.to_thread(self._disk_get_prefix, prefix)
+        now = time.time()
+        return {key: value for key, (expires_at, value) in self._local.items()
+                if key.startswith(prefix) and expires_at >= now}
+
+    async def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        await self.open()
+        expires_at = time.time() + ttl_seconds
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+        else:
+            self._local[key] = (expires_at, value)
+
+
+shared_state = SharedState(settings.SHARED_STATE_PATH)
@@ -0,0 +1,31 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Union
+from app.models.schemas import MealPlan
+from app.models.combined_response import MealPlanWithNutrition
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: Literal["pending", "running", "completed", "failed"] = "pending"
+    duplicate_of: Optional[int] = Field(None, description="Index of the identical profile this item reuses")
+    meal_plan_id: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[Union[MealPlanWithNutrition, MealPlan]] = None
+
+class BatchStats(BaseModel):
+    total: int
+    unique_profiles: int
+    completed: int = 0
+    failed: int = 0
+    unique_foods_resolved: int = 0
+    elapsed_seconds: float = 0.0
+    plans_per_second: float = 0.0
+
+class BatchJob(BaseModel):
+    job_id: str
+    status: Literal["pending", "running", "completed"] = "pending"
+    include_nutrition: bool = False
+    adjust_rdi: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    stats: BatchStats
+    items: List[BatchItemResult]
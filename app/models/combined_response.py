@@ -8,9 +8,13 @@ class FoodNutrition(BaseModel):
     quantity: float
     unit: str
     serving_size: float
-    nutrition: NutritionResponse
+    nutrition: Optional[NutritionResponse] = None
+    # Lookup still running when the request budget ran out; nutrition is None
+    pending: bool = False
 
 class MealPlanWithNutrition(BaseModel):
     meal_plan: MealPlan
     foods_nutrition: List[FoodNutrition]
-    total_nutrition: Optional[NutritionResponse] = None
\ No newline at end of file
+    total_nutrition: Optional[NutritionResponse] = None
+    # False if some items are pending; total_nutrition then covers resolved items only
+    nutrition_complete: bool = True
\ No newline at end of file
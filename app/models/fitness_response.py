@@ -0,0 +1,13 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from app.models.schemas import UserProfile, WorkoutPlan
+from app.models.combined_response import MealPlanWithNutrition
+
+class FitnessPlan(BaseModel):
+    id: str
+    user_profile: UserProfile
+    # Linked to each other through workout_plan_id / meal_plan_id
+    meal_plan: MealPlanWithNutrition
+    workout_plan: WorkoutPlan
+    response_time_seconds: float
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,8 +1,22 @@
-from typing import Optional, List, Dict, Union, Literal
+from typing import Any, Optional, List, Dict, Union, Literal
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+import json
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+MEAL_TYPES = ("BREAKFAST", "LUNCH", "DINNER", "SNACK")
+
+# Units the LLM writes for FoodItem units; anything else counts as a serving
+UNIT_ALIASES = {
+    "g": "g", "gram": "g", "grams": "g",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml",
+    "pcs": "pcs", "pc": "pcs", "piece": "pcs", "pieces": "pcs",
+    "serving": "serving", "servings": "serving",
+}
+
 class UserProfile(BaseModel):
     gender: str = Field(..., description="User's gender", example="male")
     age: int = Field(..., gt=0, lt=120, description="User's age", example=30)
@@ -23,6 +37,43 @@ class FoodItem(BaseModel):
     unit: Literal["g", "ml", "pcs", "serving"] = "serving"
     serving_size: Optional[float] = Field(None, gt=0)
 
+    @classmethod
+    def from_plan_item(cls, raw: Any) -> Optional["FoodItem"]:
+        """Build a FoodItem from a meal plan item; None if the item is unusable.
+
+        Accepts the keys the LLM is prompted for (meal/item/quantity) as well
+        as the text form of stored plans (mealPlanType/name/totalFood).
+        """
+        if not isinstance(raw, dict):
+            return None
+        name = raw.get("item") or raw.get("name")
+        if not isinstance(name, str) or not name.strip():
+            return None
+
+        meal = str(raw.get("meal") or raw.get("mealPlanType") or "SNACK").upper()
+        unit = str(raw.get("unit") or "g").strip().lower()
+        try:
+            quantity = float(raw.get("quantity") or raw.get("totalFood") or 1)
+            return cls(
+                meal=meal if meal in MEAL_TYPES else "SNACK",
+                name=name.strip(),
+                quantity=quantity,
+                unit=UNIT_ALIASES.get(unit, "serving"),
+                serving_size=quantity
+            )
+        except (TypeError, ValueError):
+            return None
+
+    def to_plan_item(self) -> Dict[str, Any]:
+        """The item in the meal_plan_text shape"""
+        return {
+            "mealPlanType": self.meal,
+            "name": self.name,
+            "totalFood": self.quantity,
+            "unit": self.unit,
+            "servingSize": self.serving_size or self.quantity
+        }
+
 class NutrientInfo(BaseModel):
     value: float = Field(..., ge=0)
     unit: Literal["g", "mg", "mcg", "IU", "kcal"] = "g"
@@ -46,6 +97,15 @@ class NutritionResponse(BaseModel):
     vitamin_a: Optional[NutrientInfo] = None
     vitamin_c: Optional[NutrientInfo] = None
 
+class FoodNutrients(BaseModel):
+    """Nutrient content of one food per 100 g, with the weights of its portions"""
+    name: str
+    source: Literal["local", "fatsecret"]
+    per_100g: Dict[str, float]
+    grams_per_piece: Optional[float] = None
+    grams_per_serving: Optional[float] = None
+    grams_per_ml: float = 1.0
+
 class NutritionInfo(BaseModel):
     meal_type: Literal["BREAKFAST", "LUNCH", "DINNER", "SNACK"]
     serving_size: float = Field(1.0, gt=0)
@@ -63,18 +123,68 @@ class DailyMeal(BaseModel):
     dinner: List[MealItem] = Field(default_factory=list)
     snacks: List[MealItem] = Field(default_factory=list)
 
+def parse_meal_items(data: Any) -> List[FoodItem]:
+    """Validate a decoded meal plan array into FoodItems, skipping unusable items"""
+    if not isinstance(data, list):
+        return []
+    items = []
+    for raw in data:
+        item = FoodItem.from_plan_item(raw)
+        if item is None:
+            logger.debug("Skipping unusable meal item: %s", raw)
+            continue
+        items.append(item)
+    return items
+
+class PlanTargets(BaseModel):
+    """Daily targets the plan was generated for (see app.services.targets)"""
+    calories: int
+    protein_g: int
+    carbs_g: int
+    fat_g: int
+    planned_calories: Optional[float] = Field(None, description="Calories of the plan as generated; filled when nutrition is looked up")
+    rescale_factor: Optional[float] = Field(None, description="Factor applied to every portion because the generated plan missed the calorie target")
+    missed_targets: List[str] = Field(default_factory=list, description="Targets (calories, protein_g, carbs_g, fat_g) the final plan is still off by more than the tolerance; filled when nutrition is looked up")
+
 class MealPlan(BaseModel):
     id: str
     user_profile: UserProfile
-    meal_plan_text: str
+    items: List[FoodItem] = Field(default_factory=list, description="Meal plan items, parsed once from the LLM output")
+    meal_plan_text: Optional[str] = Field(None, description="Plan as JSON text; only filled with include_text=true, or with the raw LLM output if it was not valid JSON")
     response_time_seconds: float
-    created_at: datetime = datetime.utcnow()
+    cached: bool = Field(False, description="True if served from the plan cache")
+    targets: Optional[PlanTargets] = None
+    workout_plan_id: Optional[str] = Field(None, description="Workout plan generated together with this plan (see /fitness-plans)")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
 
+    @model_validator(mode="after")
+    def parse_stored_text(self) -> "MealPlan":
+        """Plans stored before ``items`` existed only carry the text form"""
+        if not self.items and self.meal_plan_text:
+            try:
+                self.items = parse_meal_items(json.loads(self.meal_plan_text))
+            except ValueError:
+                return self
+            if self.items:
+                self.meal_plan_text = None
+        return self
+
+    def render_text(self) -> str:
+        if not self.items and self.meal_plan_text is not None:
+            return self.meal_plan_text
+        return json.dumps([item.to_plan_item() for item in self.items], separators=(",", ":"))
+
+    def with_text(self) -> "MealPlan":
+        """Copy with meal_plan_text filled in, for clients that still read it"""
+        if self.meal_plan_text is not None:
+            return self
+        return self.model_copy(update={"meal_plan_text": self.render_text()})
+
 class WorkoutItem(BaseModel):
     name: str
     sets: int
@@ -86,12 +196,65 @@ class WorkoutPlanDay(BaseModel):
     focus: str
     workoutPlan: List[WorkoutItem]
 
+    @classmethod
+    def from_plan_day(cls, raw: Any) -> Optional["WorkoutPlanDay"]:
+        """Build a day from a workout plan item, defaulting missing exercise fields"""
+        if not isinstance(raw, dict):
+            return None
+        exercises = []
+        for exercise in raw.get("workoutPlan") or []:
+            if not isinstance(exercise, dict):
+                continue
+            try:
+                sets = int(float(exercise.get("sets", 3)))
+            except (TypeError, ValueError):
+                sets = 3
+            exercises.append(WorkoutItem(
+                name=str(exercise.get("name", "")),
+                sets=sets,
+                reps=str(exercise.get("reps", "8-12")),
+                rest=str(exercise.get("rest", "60 sec"))
+            ))
+        return cls(day=str(raw.get("day", "")), focus=str(raw.get("focus", "")), workoutPlan=exercises)
+
+def parse_workout_days(data: Any) -> List[WorkoutPlanDay]:
+    """Validate a decoded workout plan array into days, skipping unusable entries"""
+    if not isinstance(data, list):
+        return []
+    return [day for day in map(WorkoutPlanDay.from_plan_day, data) if day is not None]
+
 class WorkoutPlan(BaseModel):
-    id: str = str(uuid.uuid4())
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_profile: UserProfile
-    workout_plan_text: str
+    days: List[WorkoutPlanDay] = Field(default_factory=list, description="Workout days, parsed once from the LLM output")
+    workout_plan_text: Optional[str] = Field(None, description="Plan as JSON text; only filled with include_text=true, or with the raw LLM output if it was not valid JSON")
     response_time_seconds: float
-    created_at: datetime = datetime.utcnow()
+    cached: bool = Field(False, description="True if served from the plan cache")
+    meal_plan_id: Optional[str] = Field(None, description="Meal plan generated together with this plan (see /fitness-plans)")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @model_validator(mode="after")
+    def parse_stored_text(self) -> "WorkoutPlan":
+        """Plans stored before ``days`` existed only carry the text form"""
+        if not self.days and self.workout_plan_text:
+            try:
+                self.days = parse_workout_days(json.loads(self.workout_plan_text))
+            except ValueError:
+                return self
+            if self.days:
+                self.workout_plan_text = None
+        return self
+
+    def render_text(self) -> str:
+        if not self.days and self.workout_plan_text is not None:
+            return self.workout_plan_text
+        return json.dumps([day.model_dump() for day in self.days], separators=(",", ":"))
+
+    def with_text(self) -> "WorkoutPlan":
+        """Copy with workout_plan_text filled in, for clients that still read it"""
+        if self.workout_plan_text is not None:
+            return self
+        return self.model_copy(update={"workout_plan_text": self.render_text()})
 
 class Config:
     json_encoders = {
@@ -0,0 +1,25 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.models.schemas import MealPlan, NutritionResponse, UserProfile
+from app.models.combined_response import FoodNutrition
+
+class DailyMealPlan(BaseModel):
+    day: int = Field(..., description="1-based day of the week")
+    day_name: str
+    meal_plan: MealPlan
+    foods_nutrition: List[FoodNutrition] = []
+    total_nutrition: Optional[NutritionResponse] = None
+
+class WeeklyMealPlan(BaseModel):
+    id: str
+    user_profile: UserProfile
+    days: List[DailyMealPlan]
+    # RDI percentages of the weekly total are against the RDI times the number of days
+    weekly_nutrition: Optional[NutritionResponse] = None
+    average_daily_nutrition: Optional[NutritionResponse] = None
+    unique_foods: int = Field(0, description="Distinct foods looked up once for the whole week")
+    # False if some items are pending; totals then cover resolved items only
+    nutrition_complete: bool = True
+    response_time_seconds: float
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Set
+from fastapi import HTTPException
+from app.core.config import settings
+from app.db.database import plan_store
+from app.db.shared_state import shared_state
+from app.models.schemas import UserProfile
+from app.models.batch_response import BatchItemResult, BatchJob, BatchStats
+from app.services.openAI_services import get_meal_plan
+from app.services.combined_service import get_meal_plan_with_nutrition
+from app.services.targets import compute_targets
+from app.services.upstream_scheduler import BATCH, request_priority
+
+# Recent jobs, oldest first, kept for polling
+batch_jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+_background_tasks: Set[asyncio.Task] = set()
+_published_at: Dict[str, float] = {}
+
+# Progress is copied to shared state at most this often while a job runs
+PUBLISH_INTERVAL_SECONDS = 1.0
+
+
+async def publish_batch_job(job: BatchJob, force: bool = False) -> None:
+    """Copy a job snapshot to shared state so any worker can answer polls for it.
+
+    Progress updates copy the status, counters and each item's status, plan
+    id and error; the full job, with every item's plan, is copied when it
+    is created and when it finishes (``force``), so a large batch's plans
+    are not serialized on the event loop every second.
+    """
+    now = time.monotonic()
+    if not force and now - _published_at.get(job.job_id, 0.0) < PUBLISH_INTERVAL_SECONDS:
+        return
+    _published_at[job.job_id] = now
+    if force:
+        await shared_state.set(f"batch_job:{job.job_id}", job.model_dump_json(),
+                               ttl_seconds=settings.BATCH_JOB_TTL_SECONDS)
+    progress = job.model_dump_json(include={
+        "status": True, "stats": True, "items": {"__all__": {"index", "status", "meal_plan_id", "error"}}
+    })
+    await shared_state.set(f"batch_job:{job.job_id}:progress", progress, ttl_seconds=settings.BATCH_JOB_TTL_SECONDS)
+
+
+async def create_batch_job(profiles: List[UserProfile], include_nutrition: bool, adjust_rdi: bool = False) -> BatchJob:
+    """Register a job for ``profiles``, marking repeats of earlier identical profiles"""
+    if len(profiles) > settings.BATCH_MAX_PROFILES:
+        raise HTTPException(status_code=413,
+                            detail=f"A batch may contain at most {settings.BATCH_MAX_PROFILES} profiles")
+
+    first_index: Dict[str, int] = {}
+    items = []
+    for index, profile in enumerate(profiles):
+        key = profile.model_dump_json()
+        duplicate_of = first_index.setdefault(key, index)
+        items.append(BatchItemResult(index=index, duplicate_of=duplicate_of if duplicate_of != index else None))
+
+    job = BatchJob(
+        job_id=str(uuid.uuid4()),
+        include_nutrition=include_nutrition,
+        adjust_rdi=adjust_rdi,
+        stats=BatchStats(total=len(profiles), unique_profiles=len(first_index)),
+        items=items
+    )
+    batch_jobs[job.job_id] = job
+    while len(batch_jobs) > settings.BATCH_MAX_JOBS:
+        evicted, _ = batch_jobs.popitem(last=False)
+        _published_at.pop(evicted, None)
+    await publish_batch_job(job, force=True)
+    return job
+
+
+async def run_batch_job(job: BatchJob, profiles: List[UserProfile]) -> AsyncIterator[BatchItemResult]:
+    """Generate every unique profile through a bounded worker pool.
+
+    Yields each item (duplicates included) as soon as its result is known.
+    Nutrition lookups are shared across the whole batch, so a food that
+    appears in many plans is resolved once.
+    """
+    # Batch work yields to interactive requests for upstream capacity
+    request_priority.set(BATCH)
+    job.status = "running"
+    start_time = time.time()
+    lookups: Dict[str, asyncio.Future] = {}
+    # Calorie and macro targets for every profile in one pass
+    targets = compute_targets(profiles)
+    queue: asyncio.Queue = asyncio.Queue()
+    finished: asyncio.Queue = asyncio.Queue()
+    duplicates: Dict[int, List[BatchItemResult]] = {}
+    for item in job.items:
+        if item.duplicate_of is None:
+            queue.put_nowait(item)
+        else:
+            duplicates.setdefault(item.duplicate_of, []).append(item)
+
+    async def generate(item: BatchItemResult) -> None:
+        item.status = "running"
+        profile = profiles[item.index]
+        try:
+            if job.include_nutrition:
+                result = await get_meal_plan_with_nutrition(
+                    profile, lookups=lookups, adjust_rdi=job.adjust_rdi, targets=targets[item.index]
+                )
+                meal_plan = result.meal_plan
+            else:
+                result = meal_plan = await get_meal_plan(profile, targets=targets[item.index])
+            await plan_store.save("meal", meal_plan)
+            item.result = result
+            item.meal_plan_id = meal_plan.id
+            item.status = "completed"
+        except Exception as e:
+            item.error = str(e.detail) if isinstance(e, HTTPException) else str(e)
+            item.status = "failed"
+
+        for duplicate in duplicates.get(item.index, []):
+            duplicate.status, duplicate.error = item.status, item.error
+            duplicate.result, duplicate.meal_plan_id = item.result, item.meal_plan_id
+
+        completed = [item, *duplicates.get(item.index, [])]
+        for done in completed:
+            if done.status == "completed":
+                job.stats.completed += 1
+            else:
+                job.stats.failed += 1
+        job.stats.unique_foods_resolved = len(lookups)
+        job.stats.elapsed_seconds = round(time.time() - start_time, 2)
+        if job.stats.elapsed_seconds:
+            job.stats.plans_per_second = round(job.stats.completed / job.stats.elapsed_seconds, 2)
+        for done in completed:
+            finished.put_nowait(done)
+        await publish_batch_job(job)
+
+    async def worker() -> None:
+        while not queue.empty():
+            await generate(queue.get_nowait())
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(settings.BATCH_MAX_WORKERS, queue.qsize()))]
+    try:
+        for _ in range(len(job.items)):
+            yield await finished.get()
+    finally:
+        for task in workers:
+            if not task.done():
+                task.cancel()
+        # Reached early only if the consumer went away (e.g. a closed stream)
+        for item in job.items:
+            if item.status in ("pending", "running"):
+                item.status, item.error = "failed", "Batch was cancelled"
+        job.status = "completed"
+        await publish_batch_job(job, force=True)
+
+
+async def _drain(job: BatchJob, profiles: List[UserProfile]) -> None:
+    async for _ in run_batch_job(job, profiles):
+        pass
+
+
+def start_batch_job(job: BatchJob, profiles: List[UserProfile]) -> None:
+    """Run a job in the background; progress is read back with get_batch_job"""
+    task = asyncio.create_task(_drain(job, profiles))
+    # Hold a reference so the task is not garbage collected mid-run
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def get_batch_job(job_id: str) -> Optional[BatchJob]:
+    """A job started by this worker, or the last snapshot published by another"""
+    job = batch_jobs.get(job_id)
+    if job is not None:
+        return job
+    payload = await shared_state.get(f"batch_job:{job_id}")
+    if not payload:
+        return None
+    job = BatchJob.model_validate_json(payload)
+    progress = await shared_state.get(f"batch_job:{job_id}:progress")
+    if progress:
+        # Plans arrive with the full snapshot when the job finishes
+        update = json.loads(progress)
+        job.status, job.stats = update["status"], BatchStats(**update["stats"])
+        for item, state in zip(job.items, update["items"]):
+            item.status, item.meal_plan_id, item.error = state["status"], state["meal_plan_id"], state["error"]
+    return job
@@ -1,115 +1,331 @@
-import json
 import asyncio
-from typing import Dict, Union, List
-from fastapi import HTTPException
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Collection, Dict, Union, List, Optional, Tuple
 from app.models.schemas import UserProfile, MealPlan, FoodItem, NutritionResponse
 from app.models.combined_response import FoodNutrition, MealPlanWithNutrition
-from app.services.openAI_services import get_meal_plan
-from app.services.nutrition_service import get_food_nutrition, calculate_nutrition_for_foods
+from app.services.openAI_services import get_meal_plan, stream_meal_plan_items
+from app.services.nutrition_service import (
+    aggregate_nutrition,
+    finish_in_background,
+    get_food_nutrients,
+    resolve_foods_nutrition
+)
+from app.services.deadline import remaining
+from app.services.nutrient_db import compute_nutrition
+from app.services.nutrient_vector import NutrientVector
+from app.services.rdi import rdi_for
+from app.services.nutrition_cache import normalize_food_name
+from app.services.plan_cache import plan_cache, serve_cached
+from app.services.targets import MacroTargets, TARGET_NUTRIENTS, fit_portions, macro_targets, missed_targets
+from app.core.metrics import MEAL_ITEMS_SKIPPED, PLAN_TARGET_CHECKS
 
-def get_item_name(item: Dict) -> str:
-    """Get item name from different possible formats"""
-    return item.get("item") or item.get("name", "")
+logger = logging.getLogger(__name__)
 
-def get_meal_type(item: Dict) -> str:
-    """Get meal type from different possible formats"""
-    return item.get("meal") or item.get("mealPlanType", "SNACK")
+def to_responses(vectors: List[Optional[NutrientVector]], rdi: NutrientVector) -> List[Optional[NutritionResponse]]:
+    """Convert internal nutrient vectors to API models with RDI percentages"""
+    return [vector.to_response(rdi) if vector is not None else None for vector in vectors]
 
-def get_quantity(item: Dict) -> float:
-    """Get quantity from different possible formats"""
-    return float(item.get("quantity") or item.get("totalFood", 1.0))
+def build_foods_nutrition(
+    food_items: List[FoodItem],
+    nutrition_results: List[Optional[NutritionResponse]],
+    pending: Collection[int] = ()
+) -> List[FoodNutrition]:
+    """Pair each food item with its nutrition, skipping items without data.
 
-async def get_meal_plan_with_nutrition(user: UserProfile) -> MealPlanWithNutrition:
-    """Generate a meal plan and calculate nutrition information for each food item"""
-    try:
-        # Get the meal plan
-        meal_plan = await get_meal_plan(user)
-        
-        # Parse the meal plan data
-        try:
-            meal_plan_data = json.loads(meal_plan.meal_plan_text)
-            if not isinstance(meal_plan_data, list):
-                raise ValueError("Meal plan data should be a list")
-        except json.JSONDecodeError as e:
-            print(f"Error parsing meal plan JSON: {e}")
-            raise HTTPException(status_code=500, detail="Invalid meal plan format")
-            
-        foods_nutrition: List[FoodNutrition] = []
-        food_items = []
-
-        # Create FoodItems for nutrition calculation
-        for item in meal_plan_data:
-            # Validate required fields
-            if not isinstance(item, dict):
-                print(f"Skipping invalid item: {item}")
-                continue
-            
-            item_name = get_item_name(item)
-            if not item_name:
-                print(f"Skipping item without name: {item}")
-                continue
+    Items at the ``pending`` indexes are kept, marked pending, without nutrition.
+    """
+    foods_nutrition: List[FoodNutrition] = []
+    for index, (item, nutrition_data) in enumerate(zip(food_items, nutrition_results)):
+        if index in pending:
+            foods_nutrition.append(FoodNutrition(
+                food_name=item.name,
+                meal_type=item.meal,
+                quantity=item.quantity,
+                unit=item.unit,
+                serving_size=item.serving_size,
+                pending=True
+            ))
+            continue
+        if not nutrition_data:
+            logger.debug("No nutrition data found for %s", item.name)
+            MEAL_ITEMS_SKIPPED.inc(reason="no_nutrition")
+            continue
             
-            try:
-                quantity = get_quantity(item)
-                food_item = FoodItem(
-                    meal=get_meal_type(item),
-                    name=item_name.strip(),
-                    quantity=quantity,
-                    unit=item.get("unit", "g").lower(),
-                    serving_size=quantity
-                )
-                food_items.append(food_item)
-                print(f"Successfully created food item: {food_item}")
-            except (ValueError, AttributeError) as e:
-                print(f"Error creating food item: {e}, item: {item}")
-                continue
+        try:
+            food_nutrition = FoodNutrition(
+                food_name=item.name,
+                meal_type=item.meal,
+                quantity=item.quantity,
+                unit=item.unit,
+                serving_size=item.serving_size,
+                nutrition=nutrition_data
+            )
+            foods_nutrition.append(food_nutrition)
+        except (ValueError, AttributeError) as e:
+            logger.warning("Error creating food nutrition object: %s, item: %s", e, item)
+            MEAL_ITEMS_SKIPPED.inc(reason="invalid")
+            continue
+    return foods_nutrition
+
+def fit_to_targets(
+    meal_plan: MealPlan,
+    nutrition_results: List[Optional[NutrientVector]]
+) -> Tuple[MealPlan, List[Optional[NutrientVector]]]:
+    """Check the plan against its calorie and macro targets, rescaling portions locally on a calorie miss.
+
+    Call only with every item's nutrition resolved; returns the plan and
+    nutrition to report, with ``targets`` recording what was planned and
+    which targets the final plan still misses.
+    """
+    if meal_plan.targets is None or not meal_plan.items:
+        return meal_plan, nutrition_results
+    items, nutrition_results, planned, factor = fit_portions(
+        meal_plan.items, nutrition_results, meal_plan.targets.calories
+    )
+    if planned <= 0:
+        PLAN_TARGET_CHECKS.inc(target="calories", outcome="unknown")
+        return meal_plan, nutrition_results
+    if factor is not None:
+        logger.debug("Rescaled meal plan %s by %.3f: %.0f kcal planned, %d targeted",
+                     meal_plan.id, factor, planned, meal_plan.targets.calories)
+    missed = missed_targets(nutrition_results, meal_plan.targets)
+    for target in TARGET_NUTRIENTS:
+        if target in missed:
+            outcome = "missed"
+        elif target == "calories" and factor is not None:
+            outcome = "rescaled"
+        else:
+            outcome = "on_target"
+        PLAN_TARGET_CHECKS.inc(target=target, outcome=outcome)
+    targets = meal_plan.targets.model_copy(update={
+        "planned_calories": round(planned, 1),
+        "rescale_factor": factor,
+        "missed_targets": missed,
+    })
+    return meal_plan.model_copy(update={"items": items, "targets": targets}), nutrition_results
+
+async def get_meal_plan_with_nutrition(
+    user: UserProfile,
+    use_cache: bool = False,
+    pipeline: bool = False,
+    lookups: Optional[Dict[str, asyncio.Future]] = None,
+    adjust_rdi: Optional[bool] = None,
+    targets: Optional[MacroTargets] = None
+) -> MealPlanWithNutrition:
+    """Generate a meal plan and calculate nutrition information for each food item.
+
+    ``lookups`` shares nutrition lookups with other plans (see resolve_foods_nutrition).
+    ``adjust_rdi`` reports RDI percentages against the user's calorie target.
+    ``targets`` may be precomputed for a batch (see compute_targets); a plan
+    that misses its calorie target has its portions rescaled.
+    Under a request budget, items not resolved by the deadline are returned
+    as pending while their lookups finish in the background.
+    """
+    if lookups is None:
+        lookups = {}
+    if pipeline:
+        cached_plan = await plan_cache.get("meal", user) if use_cache else None
+        if cached_plan is None:
+            return await get_meal_plan_with_nutrition_pipelined(user, use_cache=use_cache, adjust_rdi=adjust_rdi)
+        meal_plan = serve_cached(cached_plan, user, str(uuid.uuid4()), 0.0)
+    else:
+        # Get the meal plan
+        meal_plan = await get_meal_plan(user, use_cache=use_cache, targets=targets)
+
+    try:
+        # Items were validated when the plan was parsed
+        food_items = meal_plan.items
 
         if not food_items:
-            print("No valid food items found in meal plan")
+            logger.warning("No valid food items found in meal plan %s", meal_plan.id)
             return MealPlanWithNutrition(
                 meal_plan=meal_plan,
                 foods_nutrition=[],
                 total_nutrition=None
             )
 
-        print(f"Processing {len(food_items)} food items")
-        # Process all food items concurrently
-        nutrition_results = await asyncio.gather(*[get_food_nutrition(item) for item in food_items])
+        logger.debug("Processing %d food items", len(food_items))
+        # Process all food items concurrently, looking up repeated foods once
+        nutrition_results = await resolve_foods_nutrition(food_items, lookups)
+        pending = {
+            index for index, item in enumerate(food_items)
+            if not lookups[normalize_food_name(item.name)].done()
+        }
+        if pending:
+            logger.info("Request budget ran out with %d of %d items pending", len(pending), len(food_items))
+        else:
+            meal_plan, nutrition_results = fit_to_targets(meal_plan, nutrition_results)
+            food_items = meal_plan.items
         
         # Create FoodNutrition objects for each item
-        for item, nutrition_data in zip(food_items, nutrition_results):
-            if not nutrition_data:
-                print(f"No nutrition data found for {item.name}")
-                continue
-                
-            try:
-                food_nutrition = FoodNutrition(
-                    food_name=item.name,
-                    meal_type=item.meal,
-                    quantity=item.quantity,
-                    unit=item.unit,
-                    serving_size=item.serving_size,
-                    nutrition=nutrition_data
-                )
-                foods_nutrition.append(food_nutrition)
-                print(f"Added nutrition data for {item.name}")
-            except (ValueError, AttributeError) as e:
-                print(f"Error creating food nutrition object: {e}, item: {item}")
-                continue
+        rdi = rdi_for(user, adjust_rdi)
+        foods_nutrition = build_foods_nutrition(food_items, to_responses(nutrition_results, rdi), pending)
         
-        # Calculate total nutrition for all foods
-        total_nutrition = await calculate_nutrition_for_foods(food_items) if food_items else None
+        # Sum the results we already have instead of fetching them again
+        total_nutrition = aggregate_nutrition(nutrition_results)
         
         return MealPlanWithNutrition(
             meal_plan=meal_plan,
             foods_nutrition=foods_nutrition,
-            total_nutrition=total_nutrition
+            total_nutrition=total_nutrition.to_response(rdi) if total_nutrition is not None else None,
+            nutrition_complete=not pending
         )
         
     except Exception as e:
-        print(f"Error processing meal plan nutrition: {str(e)}")
+        logger.exception("Error processing meal plan nutrition: %s", e)
         return MealPlanWithNutrition(
             meal_plan=meal_plan,
             foods_nutrition=[],
             total_nutrition=None
-        )
\ No newline at end of file
+        )
+
+async def get_meal_plan_with_nutrition_pipelined(
+    user: UserProfile,
+    use_cache: bool = False,
+    adjust_rdi: Optional[bool] = None
+) -> MealPlanWithNutrition:
+    """Generate a meal plan with nutrition, overlapping LLM generation and lookups.
+
+    Each item is sent to the nutrition resolver as soon as it is parsed from
+    the streamed completion, so end-to-end latency approaches
+    max(LLM time, slowest lookup) rather than their sum.
+    """
+    items: List[FoodItem] = []
+    results: Dict[int, Optional[NutritionResponse]] = {}
+    async for event in stream_meal_plan_with_nutrition(user, include_nutrition=True, adjust_rdi=adjust_rdi):
+        if event["event"] == "item":
+            items.append(event["item"])
+        elif event["event"] == "nutrition":
+            results[event["index"]] = event["nutrition"]
+        elif event["event"] == "done":
+            meal_plan = event["meal_plan"]
+            total_nutrition = event["total_nutrition"]
+            pending = event["pending"]
+
+    nutrition_results = [results.get(index) for index in range(len(items))]
+
+    if use_cache:
+        await plan_cache.put("meal", user, meal_plan)
+
+    if not pending:
+        vectors = [NutrientVector.from_response(result) if result is not None else None for result in nutrition_results]
+        meal_plan, vectors = fit_to_targets(meal_plan, vectors)
+        if meal_plan.targets is not None and meal_plan.targets.rescale_factor is not None:
+            rdi = rdi_for(user, adjust_rdi)
+            items = meal_plan.items
+            nutrition_results = to_responses(vectors, rdi)
+            total = aggregate_nutrition(vectors)
+            total_nutrition = total.to_response(rdi) if total is not None else None
+
+    return MealPlanWithNutrition(
+        meal_plan=meal_plan,
+        foods_nutrition=build_foods_nutrition(items, nutrition_results, set(pending)),
+        total_nutrition=total_nutrition,
+        nutrition_complete=not pending
+    )
+
+async def stream_meal_plan_with_nutrition(
+    user: UserProfile,
+    include_nutrition: bool = False,
+    adjust_rdi: Optional[bool] = None
+) -> AsyncIterator[Dict]:
+    """Stream meal plan events as the LLM produces items.
+
+    Yields ``item`` events as soon as each item is parsed, ``nutrition``
+    events as each lookup finishes (lookups start the moment their item
+    arrives), and a final ``done`` event carrying the assembled MealPlan,
+    total nutrition and the indexes of items still ``pending`` when the
+    request budget ran out (their lookups finish in the background).
+    """
+    start_time = time.time()
+    rdi = rdi_for(user, adjust_rdi)
+    queue: asyncio.Queue = asyncio.Queue()
+    producer_done = object()
+    items: List[FoodItem] = []
+    nutrition_results: Dict[int, Optional[NutrientVector]] = {}
+    lookups: Dict[str, asyncio.Future] = {}
+    emitters: List[asyncio.Task] = []
+
+    async def emit_nutrition(index: int, food_item: FoodItem, lookup: asyncio.Future) -> None:
+        try:
+            # Shielded: cancelling the emitter must not cancel a lookup it shares
+            nutrition = compute_nutrition([await asyncio.shield(lookup)], [food_item])[0]
+        except Exception as e:
+            logger.warning("Error getting nutrition for item %d: %s", index, e)
+            nutrition = None
+        nutrition_results[index] = nutrition
+        queue.put_nowait({
+            "event": "nutrition",
+            "index": index,
+            "nutrition": nutrition.to_response(rdi) if nutrition is not None else None
+        })
+
+    async def produce() -> None:
+        try:
+            async for food_item in stream_meal_plan_items(user):
+                index = len(items)
+                items.append(food_item)
+                queue.put_nowait({"event": "item", "index": index, "item": food_item})
+                if not include_nutrition:
+                    continue
+                # Identical foods in one plan share a single lookup, scaled per item
+                key = normalize_food_name(food_item.name)
+                if key not in lookups:
+                    lookups[key] = asyncio.ensure_future(get_food_nutrients(food_item.name))
+                emitters.append(asyncio.create_task(emit_nutrition(index, food_item, lookups[key])))
+        finally:
+            queue.put_nowait(producer_done)
+
+    producer = asyncio.create_task(produce())
+    timed_out = False
+    try:
+        finished = False
+        emitted = 0
+        while not finished or emitted < len(emitters):
+            timeout = remaining() if finished and queue.empty() else None
+            if timeout is None:
+                event = await queue.get()
+            else:
+                # The plan is complete; wait for lookups only until the deadline
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    break
+            if event is producer_done:
+                finished = True
+                continue
+            if event["event"] == "nutrition":
+                emitted += 1
+            yield event
+
+        # Surface LLM errors (the producer has finished by now)
+        await producer
+
+        meal_plan = MealPlan(
+            id=str(uuid.uuid4()),
+            user_profile=user,
+            items=items,
+            response_time_seconds=round(time.time() - start_time, 2),
+            targets=macro_targets(user).to_model()
+        )
+        total_nutrition = None
+        if include_nutrition:
+            total = aggregate_nutrition([nutrition_results[index] for index in sorted(nutrition_results)])
+            total_nutrition = total.to_response(rdi) if total is not None else None
+        yield {
+            "event": "done",
+            "meal_plan": meal_plan,
+            "total_nutrition": total_nutrition,
+            "pending": [index for index in range(len(items)) if index not in nutrition_results] if include_nutrition else []
+        }
+    finally:
+        # The client may disconnect mid-stream; stop outstanding work. Lookups
+        # cut off by the deadline still run to completion to warm the cache.
+        if timed_out:
+            finish_in_background(lookup for lookup in lookups.values() if not lookup.done())
+        for task in [producer, *emitters, *([] if timed_out else lookups.values())]:
+            if not task.done():
+                task.cancel()
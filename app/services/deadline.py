@@ -0,0 +1,36 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import HTTPException
+
+# Monotonic time by which the current request should respond; set once per
+# request and read by the LLM client and nutrition lookups
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def start_budget(seconds: Optional[float]) -> None:
+    """Give the current request ``seconds`` to respond (None or 0: no budget)"""
+    request_deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the request budget, or None without a budget"""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def upstream_timeout(limit: float) -> float:
+    """``limit`` capped to what is left of the request budget"""
+    left = remaining()
+    if left is None:
+        return limit
+    if left <= 0:
+        raise HTTPException(status_code=504, detail="Request budget exhausted")
+    return min(limit, left)
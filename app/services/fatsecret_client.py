@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import time
+import aiohttp
+from typing import Dict, Optional
+from fastapi import HTTPException
+from app.core.config import settings
+from app.db.shared_state import shared_state
+from app.core.metrics import (
+    FATSECRET_REQUEST_SECONDS,
+    FATSECRET_TOKEN_REFRESH_SECONDS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_IN_FLIGHT
+)
+from app.services.upstream_scheduler import RetryableUpstreamError, fatsecret_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Shared-state key for the OAuth token, so every worker reuses one token
+TOKEN_KEY = "fatsecret:access_token"
+
+
+class FatSecretClient:
+    """FatSecret REST client that owns one pooled session and the OAuth token"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._access_token: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.token_requests = 0
+
+    async def start(self) -> None:
+        """Open the shared session; called once on application startup"""
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(limit_per_host=settings.FAT_SECRET_MAX_CONNECTIONS_PER_HOST)
+        timeout = aiohttp.ClientTimeout(total=settings.FAT_SECRET_TIMEOUT_SECONDS)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self) -> None:
+        """Close the shared session; called once on application shutdown"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Lazily start so scripts that skip the app lifecycle still work
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    # -- OAuth token -------------------------------------------------------
+
+    async def get_access_token(self) -> str:
+        """Get a valid access token, sharing one refresh between all callers"""
+        now = time.monotonic()
+        if self._access_token and now < self._expires_at:
+            if now >= self._expires_at - settings.FAT_SECRET_TOKEN_REFRESH_MARGIN_SECONDS:
+                # Close to expiry: renew in the background, keep using the current token
+                self._start_refresh()
+            return self._access_token
+
+        # Shield so a cancelled caller does not cancel the refresh other callers wait on
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_token())
+            # Background refreshes may have no awaiter; retrieve their errors here
+            self._refresh_task.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+        return self._refresh_task
+
+    async def _refresh_token(self) -> str:
+        # Another worker may already have a fresh token
+        shared = await shared_state.get(TOKEN_KEY)
+        if shared is not None:
+            token_info = json.loads(shared)
+            remaining = token_info["expires_at"] - time.time()
+            if remaining > settings.FAT_SECRET_TOKEN_REFRESH_MARGIN_SECONDS:
+                return self._use_token(token_info["access_token"], remaining)
+
+        auth_data = {
+            'grant_type': 'client_credentials',
+            'client_id': settings.FAT_SECRET_CLIENT_ID,
+            'client_secret': settings.FAT_SECRET_CLIENT_SECRET,
+            'scope': 'basic'
+        }
+
+        session = await self._get_session()
+        self.token_requests += 1
+        try:
+            with UPSTREAM_IN_FLIGHT.track(upstream="fatsecret"), FATSECRET_TOKEN_REFRESH_SECONDS.time():
+                async with session.post(settings.FAT_SECRET_AUTH_URL, data=auth_data) as response:
+                    if response.status != 200:
+                        UPSTREAM_ERRORS.inc(upstream="fatsecret_auth", status=str(response.status))
+                        raise HTTPException(status_code=500, detail="Failed to authenticate with FatSecret API")
+                    token_info = await response.json(content_type=None)
+        except HTTPException:
+            raise
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(upstream="fatsecret_auth", status="0")
+            logger.error("Error getting access token: %s", e)
+            raise HTTPException(status_code=500, detail="Failed to authenticate with FatSecret API")
+
+        expires_in = token_info["expires_in"]
+        await shared_state.set(
+            TOKEN_KEY,
+            json.dumps({"access_token": token_info["access_token"], "expires_at": time.time() + expires_in}),
+            ttl_seconds=expires_in,
+        )
+        return self._use_token(token_info["access_token"], expires_in)
+
+    def _use_token(self, access_token: str, expires_in: float) -> str:
+        self._access_token = access_token
+        self._expires_at = time.monotonic() + expires_in
+        return access_token
+
+    # -- REST methods ------------------------------------------------------
+
+    async def _get(self, params: Dict[str, str]) -> Optional[Dict]:
+        """GET ``server.api`` through the scheduler (concurrency cap, rate limit, retries)"""
+        return await fatsecret_scheduler.run(lambda: self._get_once(params))
+
+    async def _get_once(self, params: Dict[str, str]) -> Optional[Dict]:
+        token = await self.get_access_token()
+        session = await self._get_session()
+        headers = {'Authorization': f'Bearer {token}'}
+        try:
+            with UPSTREAM_IN_FLIGHT.track(upstream="fatsecret"), FATSECRET_REQUEST_SECONDS.time(method=params['method']):
+                async with session.get(settings.FAT_SECRET_BASEURL, params=params, headers=headers) as response:
+                    if response.status != 200:
+                        UPSTREAM_ERRORS.inc(upstream="fatsecret", status=str(response.status))
+                    if response.status == 429 or response.status >= 500:
+                        retry_after = response.headers.get('Retry-After')
+                        raise RetryableUpstreamError(
+                            response.status,
+                            f"FatSecret {params['method']} failed: {response.status}",
+                            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+                        )
+                    if response.status != 200:
+                        logger.warning("FatSecret %s failed: %s", params['method'], response.status)
+                        return None
+                    return await response.json(content_type=None)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            UPSTREAM_ERRORS.inc(upstream="fatsecret", status="0")
+            raise RetryableUpstreamError(0, f"FatSecret {params['method']} failed: {e!r}")
+
+    async def search_foods(self, expression: str) -> Optional[Dict]:
+        """Call foods.search for a free-text food name"""
+        return await self._get({
+            'method': 'foods.search',
+            'search_expression': expression,
+            'format': 'json'
+        })
+
+    async def get_food(self, food_id: str) -> Optional[Dict]:
+        """Call food.get.v2 for a FatSecret food id"""
+        return await self._get({
+            'method': 'food.get.v2',
+            'food_id': food_id,
+            'format': 'json'
+        })
+
+
+fatsecret_client = FatSecretClient()
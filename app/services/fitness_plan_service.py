@@ -0,0 +1,45 @@
+import asyncio
+import time
+import uuid
+from typing import Optional
+from app.models.fitness_response import FitnessPlan
+from app.models.schemas import UserProfile
+from app.services.combined_service import get_meal_plan_with_nutrition
+from app.services.openAI_services import get_workout_plan
+
+
+async def get_fitness_plan(
+    user: UserProfile,
+    use_cache: bool = False,
+    pipeline: bool = False,
+    adjust_rdi: Optional[bool] = None
+) -> FitnessPlan:
+    """Generate a meal plan with nutrition and a workout plan concurrently.
+
+    The two LLM calls overlap, so wall time is that of the slower plan
+    (usually the meal plan with its lookups) rather than their sum. Each
+    plan keeps its own prompt, token budget and cache. The plans are linked
+    through ``workout_plan_id`` and ``meal_plan_id``. If either fails, the
+    other is cancelled.
+    """
+    start_time = time.time()
+    meal_task = asyncio.ensure_future(
+        get_meal_plan_with_nutrition(user, use_cache=use_cache, pipeline=pipeline, adjust_rdi=adjust_rdi))
+    workout_task = asyncio.ensure_future(get_workout_plan(user, use_cache=use_cache))
+    try:
+        meal, workout_plan = await asyncio.gather(meal_task, workout_task)
+    except BaseException:
+        meal_task.cancel()
+        workout_task.cancel()
+        raise
+
+    # Copies, so plans held by the plan cache stay unlinked
+    meal_plan = meal.meal_plan.model_copy(update={"workout_plan_id": workout_plan.id})
+    workout_plan = workout_plan.model_copy(update={"meal_plan_id": meal_plan.id})
+    return FitnessPlan(
+        id=str(uuid.uuid4()),
+        user_profile=user,
+        meal_plan=meal.model_copy(update={"meal_plan": meal_plan}),
+        workout_plan=workout_plan,
+        response_time_seconds=round(time.time() - start_time, 2)
+    )
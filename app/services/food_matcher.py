@@ -0,0 +1,369 @@
+import asyncio
+import csv
+import logging
+import math
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.services.nutrition_cache import normalize_food_name
+
+logger = logging.getLogger(__name__)
+
+
+# Preparation and descriptor words a query may add without naming a different food
+DESCRIPTOR_WORDS = frozenset({
+    "baked", "boiled", "grilled", "roast", "roasted", "steamed", "poached", "scrambled", "cooked",
+    "raw", "fresh", "plain", "natural", "organic", "homemade", "unsweetened",
+    "skinless", "boneless", "lean", "sliced", "chopped", "diced", "mashed",
+    "hard", "soft", "small", "medium", "large", "of", "a",
+})
+
+
+class FoodMatch(NamedTuple):
+    food_id: str
+    name: str
+    score: float
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Character trigrams of a normalized name, padded so word edges count"""
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """Dice coefficient of the two names' trigram sets (1.0 means identical)"""
+    grams_a, grams_b = trigrams(normalize_food_name(a)), trigrams(normalize_food_name(b))
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def covers(name: str, query: str) -> bool:
+    """True if every word of ``query``, descriptors aside, appears in ``name``.
+
+    Trigram scores alone accept a longer query that contains a shorter
+    name ("chocolate milk" scores 0.8 against "chocolate"); this rejects
+    matches that drop a word of the query.
+    """
+    words = set(normalize_food_name(name).split())
+    return all(word in words for word in normalize_food_name(query).split() if word not in DESCRIPTOR_WORDS)
+
+
+class FoodNameIndex:
+    """Trigram inverted index from free-text food names to food ids.
+
+    Postings are kept in CSR form (``_offsets`` into one ``_postings``
+    array) so a lookup is a handful of NumPy slices and one
+    ``np.unique``. Names added after the last ``compact`` sit in a small
+    dict-of-lists and are merged on the next compaction.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._gram_columns: Dict[str, int] = {}
+        self._sizes = array("H")  # trigram count per entry
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.empty(0, dtype=np.int32)
+        self._pending: Dict[int, List[int]] = {}
+        self._pending_count = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _insert(self, name: str, food_id: str) -> None:
+        normalized = normalize_food_name(name)
+        if not normalized or normalized in self._exact:
+            return
+        entry = len(self.ids)
+        self.ids.append(food_id)
+        self.names.append(name)
+        self._exact[normalized] = entry
+        grams = trigrams(normalized)
+        self._sizes.append(min(len(grams), 0xFFFF))
+        for gram in grams:
+            column = self._gram_columns.setdefault(gram, len(self._gram_columns))
+            self._pending.setdefault(column, []).append(entry)
+        self._pending_count += len(grams)
+
+    def add(self, name: str, food_id: str) -> None:
+        """Index ``name``; a name that is already indexed keeps its first id"""
+        self._insert(name, food_id)
+        # Keep the unmerged tail small relative to the index
+        if self._pending_count > max(4096, len(self._postings) // 8):
+            self.compact()
+
+    def build(self, entries: Iterable[Tuple[str, str]]) -> None:
+        """Bulk-add ``(name, food_id)`` pairs and compact once at the end"""
+        for name, food_id in entries:
+            self._insert(name, food_id)
+        self.compact()
+
+    def compact(self) -> None:
+        """Merge pending postings into the CSR arrays"""
+        if not self._pending:
+            return
+        columns = len(self._gram_columns)
+        counts = np.diff(self._offsets)
+        counts = np.concatenate([counts, np.zeros(columns - len(counts), dtype=np.int64)])
+        pending_counts = np.zeros(columns, dtype=np.int64)
+        for column, entries in self._pending.items():
+            pending_counts[column] = len(entries)
+
+        offsets = np.zeros(columns + 1, dtype=np.int64)
+        np.cumsum(counts + pending_counts, out=offsets[1:])
+        postings = np.empty(offsets[-1], dtype=np.int32)
+        old_offsets = self._offsets
+        for column in range(len(old_offsets) - 1):
+            start, end = old_offsets[column], old_offsets[column + 1]
+            postings[offsets[column]:offsets[column] + end - start] = self._postings[start:end]
+        for column, entries in self._pending.items():
+            start = offsets[column] + counts[column]
+            postings[start:start + len(entries)] = entries
+
+        self._offsets, self._postings = offsets, postings
+        self._pending = {}
+        self._pending_count = 0
+
+    def _posting(self, column: int) -> np.ndarray:
+        """Sorted entry ids containing trigram ``column``"""
+        built = self._postings[self._offsets[column]:self._offsets[column + 1]] \
+            if column < len(self._offsets) - 1 else self._postings[:0]
+        pending = self._pending.get(column)
+        if not pending:
+            return built
+        # Pending entries were added after the build, so order is preserved
+        return np.concatenate([built, np.asarray(pending, dtype=np.int32)])
+
+    def search(self, name: str, limit: int = 5, min_score: float = 0.0) -> List[FoodMatch]:
+        """Best-scoring entries for ``name``, highest Dice score first.
+
+        Shared trigrams are counted with one ``np.bincount`` over the
+        query's postings. With ``min_score``, when the query's rarest
+        trigrams have short postings, only entries containing one of them
+        are scored (no other entry can reach the score).
+        """
+        normalized = normalize_food_name(name)
+        exact = self._exact.get(normalized)
+        if exact is not None:
+            return [FoodMatch(self.ids[exact], self.names[exact], 1.0)]
+
+        grams = trigrams(normalized) if normalized else set()
+        postings = sorted(
+            (self._posting(self._gram_columns[gram]) for gram in grams if gram in self._gram_columns),
+            key=len,
+        )
+        if not postings:
+            return []
+
+        total = sum(len(posting) for posting in postings)
+        probe = len(postings)
+        if min_score > 0:
+            # Dice >= t needs an overlap of at least t * |q| / (2 - t) trigrams, so
+            # a match must contain one of the (|q| - overlap + 1) rarest ones
+            min_overlap = math.ceil(min_score * len(grams) / (2 - min_score))
+            probe = len(postings) - min_overlap + 1
+            if probe <= 0:
+                return []
+
+        # Binary search costs roughly candidates x postings; counting costs the total
+        if sum(len(posting) for posting in postings[:probe]) * len(postings) < total:
+            # Few candidates: count their other trigrams by binary search
+            candidates = np.unique(np.concatenate(postings[:probe]))
+            shared = np.zeros(len(candidates), dtype=np.int64)
+            for posting in postings:
+                positions = np.searchsorted(posting, candidates).clip(max=len(posting) - 1)
+                shared += posting[positions] == candidates
+        else:
+            counts = np.bincount(np.concatenate(postings), minlength=len(self.ids))
+            candidates = np.flatnonzero(counts)
+            shared = counts[candidates]
+
+        sizes = np.frombuffer(self._sizes, dtype=np.uint16)[candidates]
+        scores = 2 * shared / (len(grams) + sizes)
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            FoodMatch(self.ids[candidates[i]], self.names[candidates[i]], round(float(scores[i]), 4))
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+    def match(self, name: str, min_score: float, whole_words: bool = False) -> Optional[FoodMatch]:
+        """The best entry for ``name`` if it scores at least ``min_score``.
+
+        With ``whole_words``, the entry must also contain every word of
+        ``name`` (see ``covers``).
+        """
+        if not whole_words:
+            matches = self.search(name, limit=1, min_score=min_score)
+            return matches[0] if matches else None
+        return next((match for match in self.search(name, limit=5, min_score=min_score)
+                     if covers(match.name, name)), None)
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index arrays (excluding the name strings)"""
+        return self._offsets.nbytes + self._postings.nbytes + self._sizes.itemsize * len(self._sizes)
+
+
+class FoodMatcher:
+    """Resolves LLM food names to FatSecret food ids without a search call.
+
+    Two sources are consulted: a learned alias table (every name a search
+    has resolved, persisted to SQLite) and a trigram index of FatSecret
+    food names seen in search results or loaded from a catalog export.
+    Only confident matches are used; anything else falls back to
+    ``foods.search``.
+    """
+
+    def __init__(self, alias_path: Optional[str], catalog_path: Optional[str], min_score: float):
+        self.alias_path = alias_path
+        self.catalog_path = catalog_path
+        self.min_score = min_score
+        self.index = FoodNameIndex()
+        self.aliases: Dict[str, FoodMatch] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._opened = False
+        self.counters = {"alias_hits": 0, "index_hits": 0, "misses": 0, "disk_alias_hits": 0, "learned": 0}
+
+    # -- disk --------------------------------------------------------------
+
+    def _open_db(self) -> List[tuple]:
+        directory = os.path.dirname(self.alias_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.alias_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS food_aliases ("
+            " alias TEXT PRIMARY KEY,"
+            " food_id TEXT NOT NULL,"
+            " food_name TEXT NOT NULL)"
+        )
+        db.commit()
+        self._db = db
+        return db.execute("SELECT alias, food_id, food_name FROM food_aliases").fetchall()
+
+    def _load_catalog(self) -> List[Tuple[str, str]]:
+        with open(self.catalog_path, newline="", encoding="utf-8") as f:
+            return [(row["food_name"], row["food_id"]) for row in csv.DictReader(f)]
+
+    def _disk_get(self, alias: str) -> Optional[tuple]:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT food_id, food_name FROM food_aliases WHERE alias = ?", (alias,)
+            ).fetchone()
+
+    def _disk_set(self, alias: str, match: FoodMatch) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO food_aliases (alias, food_id, food_name) VALUES (?, ?, ?)",
+                (alias, match.food_id, match.name),
+            )
+            self._db.commit()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def open(self) -> None:
+        """Load learned aliases and the optional catalog; safe to call more than once"""
+        if self._opened:
+            return
+        self._opened = True
+        if self.catalog_path:
+            self.index.build(await asyncio.to_thread(self._load_catalog))
+        if self.alias_path:
+            rows = await asyncio.to_thread(self._open_db)
+            for alias, food_id, food_name in rows:
+                self.aliases[alias] = FoodMatch(food_id, food_name, 1.0)
+                self.index.add(food_name, food_id)
+        logger.info("Food matcher ready: %d aliases, %d indexed names", len(self.aliases), len(self.index))
+
+    async def close(self) -> None:
+        if self._db is not None:
+            db, self._db = self._db, None
+            await asyncio.to_thread(db.close)
+        self._opened = False
+
+    # -- matching ----------------------------------------------------------
+
+    def resolve(self, name: str) -> Optional[FoodMatch]:
+        """A confident food id for ``name``, or None if a search is needed"""
+        alias = self.aliases.get(normalize_food_name(name))
+        if alias is not None:
+            self.counters["alias_hits"] += 1
+            return alias
+        match = self.index.match(name, self.min_score, whole_words=True)
+        if match is not None:
+            self.counters["index_hits"] += 1
+            return match
+        self.counters["misses"] += 1
+        return None
+
+    async def load_alias(self, name: str) -> Optional[FoodMatch]:
+        """An alias for ``name`` learned by another worker since this one loaded, or None"""
+        if self._db is None:
+            return None
+        alias = normalize_food_name(name)
+        row = await asyncio.to_thread(self._disk_get, alias)
+        if row is None:
+            return None
+        match = FoodMatch(row[0], row[1], 1.0)
+        self.aliases[alias] = match
+        self.index.add(match.name, match.food_id)
+        self.counters["disk_alias_hits"] += 1
+        return match
+
+    def choose(self, name: str, foods: List[Dict]) -> Dict:
+        """Pick the search result closest to ``name``, preferring generic foods over brands"""
+        def rank(food: Dict) -> float:
+            generic = 0.1 if food.get("food_type", "Generic") == "Generic" else 0.0
+            return similarity(name, food.get("food_name", "")) + generic
+
+        # max() keeps the first of equal ranks, i.e. FatSecret's own order
+        return max(foods, key=rank)
+
+    async def learn(self, name: str, food_id: str, food_name: str) -> None:
+        """Remember that ``name`` resolved to ``food_id``, and index it for similar names.
+
+        Only chosen foods are indexed: indexing every search result would let
+        a later name match a branded product the search would not have chosen.
+        """
+        alias = normalize_food_name(name)
+        match = FoodMatch(str(food_id), food_name, 1.0)
+        if self.aliases.get(alias) == match:
+            return
+        self.aliases[alias] = match
+        self.index.add(food_name, str(food_id))
+        self.counters["learned"] += 1
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, alias, match)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.counters["alias_hits"] + self.counters["index_hits"] + self.counters["misses"]
+        hits = self.counters["alias_hits"] + self.counters["index_hits"]
+        return {
+            **self.counters,
+            "aliases": len(self.aliases),
+            "indexed_names": len(self.index),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+food_matcher = FoodMatcher(
+    alias_path=settings.FOOD_ALIAS_PATH,
+    catalog_path=settings.FOOD_CATALOG_PATH,
+    min_score=settings.FOOD_MATCH_MIN_SCORE,
+)
+CACHE_HITS.add_source(lambda: {"food_matcher": food_matcher.counters["alias_hits"] + food_matcher.counters["index_hits"]})
+CACHE_MISSES.add_source(lambda: {"food_matcher": food_matcher.counters["misses"]})
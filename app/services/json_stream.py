@@ -0,0 +1,112 @@
+import json
+import re
+from typing import Any, List
+
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Drop commas before a closing brace or bracket, a common LLM JSON slip"""
+    return _TRAILING_COMMA.sub(r"\1", text)
+
+
+def _loads_lenient(text: str) -> Any:
+    """``json.loads``, retried without trailing commas; raises ValueError if still invalid"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return json.loads(strip_trailing_commas(text))
+
+
+class JSONArrayStreamParser:
+    """Incrementally parse the elements of a top-level JSON array.
+
+    Text is fed in arbitrary chunks (e.g. streamed LLM deltas) and each
+    element is returned as soon as its closing brace/bracket arrives. Any
+    text before the opening ``[`` (such as a code fence) is ignored.
+    Trailing commas inside an element are tolerated. An element that is
+    still not valid JSON raises ValueError, or with ``skip_invalid`` is
+    dropped and counted in ``skipped``.
+    """
+
+    def __init__(self, skip_invalid: bool = False):
+        self.skip_invalid = skip_invalid
+        self.skipped = 0
+        self._buffer: List[str] = []
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing ``]`` of the array has been seen"""
+        return self._finished
+
+    @property
+    def partial(self) -> str:
+        """Text of the element currently being received, if any"""
+        return "".join(self._element)
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume ``chunk`` and return every element completed by it"""
+        completed = []
+        for char in chunk:
+            if self._finished:
+                break
+
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                continue
+
+            if self._in_string:
+                self._element.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0:
+                # Between elements: skip separators, stop at the closing bracket
+                if char == "]":
+                    self._finished = True
+                elif char in "{[":
+                    self._depth = 1
+                    self._element.append(char)
+                elif char == '"':
+                    self._in_string = True
+                    self._element.append(char)
+                elif not char.isspace() and char != ",":
+                    # Scalar element; collected until the next separator
+                    self._element.append(char)
+                if self._element and self._depth == 0 and not self._in_string and char in ",]":
+                    self._complete(completed)
+                continue
+
+            self._element.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete(completed)
+
+        return completed
+
+    def _complete(self, completed: List[Any]) -> None:
+        text = "".join(self._element).strip()
+        self._element = []
+        try:
+            completed.append(_loads_lenient(text))
+        except ValueError:
+            if not self.skip_invalid:
+                raise
+            self.skipped += 1
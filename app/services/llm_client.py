@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import aiohttp
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, UPSTREAM_ERRORS, UPSTREAM_IN_FLIGHT
+from app.services.deadline import expired, upstream_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """Async chat-completions client backed by one long-lived connection pool"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Open the shared session; called once on application startup"""
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=settings.LLM_MAX_CONNECTIONS,
+            limit_per_host=settings.LLM_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=settings.LLM_KEEPALIVE_SECONDS,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=settings.LLM_TIMEOUT_SECONDS,
+            connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={
+                "Authorization": f"Bearer {settings.API_KEY}",
+                "Content-Type": "application/json",
+            },
+        )
+
+    async def close(self) -> None:
+        """Close the shared session; called once on application shutdown"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("LLM client is not started")
+        return self._session
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.8,
+        max_tokens: int = 1024,
+        kind: str = "other",
+    ) -> Dict:
+        """Send a chat-completions request and return the decoded JSON body; ``kind`` labels its token usage"""
+        # Lazily start so scripts that skip the app lifecycle still work
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        data = {
+            "model": settings.MODEL,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+
+        with UPSTREAM_IN_FLIGHT.track(upstream="llm"), LLM_REQUEST_SECONDS.time(mode="complete"):
+            try:
+                async with self.session.post(settings.API_URL, json=data, timeout=self._request_timeout()) as response:
+                    if response.status != 200:
+                        await self._raise_for_status(response)
+                    result = await response.json(content_type=None)
+                    self._record_usage(kind, result.get("usage"))
+                    return result
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                UPSTREAM_ERRORS.inc(upstream="llm", status="0")
+                if expired():
+                    raise HTTPException(status_code=504, detail="LLM call exceeded the request budget")
+                raise
+
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.8,
+        max_tokens: int = 1024,
+        kind: str = "other",
+    ) -> AsyncIterator[str]:
+        """Send a streaming chat-completions request and yield content deltas; ``kind`` labels its token usage"""
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        data = {
+            "model": settings.MODEL,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            # A final chunk with empty choices carries the usage
+            "stream_options": {"include_usage": True},
+        }
+
+        with UPSTREAM_IN_FLIGHT.track(upstream="llm"), LLM_REQUEST_SECONDS.time(mode="stream"):
+            try:
+                async with self.session.post(settings.API_URL, json=data, timeout=self._request_timeout()) as response:
+                    if response.status != 200:
+                        await self._raise_for_status(response)
+
+                    # Server-sent events: one "data: {...}" line per chunk
+                    async for raw_line in response.content:
+                        line = raw_line.decode("utf-8").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[len("data:"):].strip()
+                        if payload == "[DONE]":
+                            break
+                        chunk = json.loads(payload)
+                        if chunk.get("usage"):
+                            self._record_usage(kind, chunk["usage"])
+                        choices = chunk.get("choices") or [{}]
+                        content = choices[0].get("delta", {}).get("content")
+                        if content:
+                            yield content
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                UPSTREAM_ERRORS.inc(upstream="llm", status="0")
+                if expired():
+                    raise HTTPException(status_code=504, detail="LLM call exceeded the request budget")
+                raise
+
+    @staticmethod
+    def _record_usage(kind: str, usage: Optional[Dict]) -> None:
+        if not usage:
+            return
+        prompt = usage.get("prompt_tokens") or 0
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        completion = usage.get("completion_tokens") or 0
+        LLM_TOKENS.observe(prompt, kind=kind, type="prompt")
+        LLM_TOKENS.observe(cached, kind=kind, type="cached_prompt")
+        LLM_TOKENS.observe(completion, kind=kind, type="completion")
+        logger.debug("LLM %s call used %d prompt tokens (%d cached), %d completion tokens",
+                     kind, prompt, cached, completion)
+
+    @staticmethod
+    def _request_timeout() -> aiohttp.ClientTimeout:
+        # The session timeout, cut short by the request budget (see app.services.deadline)
+        return aiohttp.ClientTimeout(
+            total=upstream_timeout(settings.LLM_TIMEOUT_SECONDS),
+            connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+        )
+
+    @staticmethod
+    async def _raise_for_status(response: aiohttp.ClientResponse) -> None:
+        UPSTREAM_ERRORS.inc(upstream="llm", status=str(response.status))
+        try:
+            error = await response.json(content_type=None)
+        except ValueError:
+            error = await response.text()
+        raise HTTPException(status_code=response.status,
+                            detail=f"OpenAI API error: {error}")
+
+
+llm_client = LLMClient()
@@ -0,0 +1,167 @@
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from app.core.metrics import LLM_OUTPUT_DECODES, LLM_TOKENS_SAVED
+from app.models.schemas import MEAL_TYPES
+from app.services.json_stream import JSONArrayStreamParser, strip_trailing_commas
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*(.*?)(?:```|$)", re.DOTALL)
+
+# Keys that mark a plan element, so a lone element is not mistaken for a wrapper
+ELEMENT_KEYS = {
+    "meal": {"meal", "item", "mealPlanType"},
+    "workout": {"day", "focus", "workoutPlan"},
+}
+
+CONTINUE_PROMPT = (
+    "Your previous response was cut off. Continue the JSON array exactly where it stops: "
+    "output only the remaining objects and the closing ], with no repeated objects and no other text."
+)
+
+
+class Repair(NamedTuple):
+    elements: Optional[List[Any]]  # None if nothing usable was found
+    outcome: str  # clean, repaired, truncated or failed
+    prefix: str = ""  # the complete elements re-serialized as an open array, to continue from
+    kept: str = ""  # the part of the response the elements came from
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def _unwrap(data: Any, kind: str) -> Optional[List[Any]]:
+    """The plan array inside a decoded response, or None"""
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        return None
+    if ELEMENT_KEYS[kind] & set(data):
+        return [data]
+    if kind == "meal":
+        # {"BREAKFAST": [{...}], "LUNCH": [...]}: the meal is the key
+        meals = {key: value for key, value in data.items() if str(key).upper() in MEAL_TYPES}
+        if meals and all(isinstance(value, list) for value in meals.values()):
+            return [dict(item, meal=str(meal).upper()) for meal, items in meals.items()
+                    for item in items if isinstance(item, dict)]
+    for value in data.values():
+        if isinstance(value, list):
+            return value
+    for value in data.values():
+        unwrapped = _unwrap(value, kind) if isinstance(value, dict) else None
+        if unwrapped:
+            return unwrapped
+    return None
+
+
+def _salvage(text: str) -> Tuple[List[Any], bool, int]:
+    """Complete elements of the first JSON array in ``text``.
+
+    Returns the elements, whether the array was closed, and the length of
+    ``text`` they were read from (anything after the array is ignored).
+    """
+    parser = JSONArrayStreamParser()
+    elements: List[Any] = []
+    position = end = 0
+    # Elements end at a closing brace or bracket; feeding up to each one
+    # keeps everything before a malformed element
+    for chunk in re.split(r"(?<=[}\]])", text):
+        try:
+            completed = parser.feed(chunk)
+        except ValueError:
+            break
+        position += len(chunk)
+        if completed or parser.finished:
+            elements.extend(completed)
+            end = position
+        if parser.finished:
+            break
+    return elements, parser.finished, end
+
+
+def repair_json_array(text: str, kind: str) -> Repair:
+    """Decode an LLM plan response, tolerating the usual ways it goes wrong.
+
+    Handles code fences and prose around the JSON, trailing commas, the
+    array wrapped in an object, and output truncated mid-array (the
+    complete elements are kept; ``outcome`` is ``truncated``). A response
+    with no array elements to keep is ``failed``.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        pass
+    else:
+        elements = _unwrap(data, kind)
+        if elements is not None:
+            return Repair(elements, "clean" if isinstance(data, list) else "repaired", kept=text)
+
+    cleaned = _strip_fences(text)
+    starts = [index for index in (cleaned.find("["), cleaned.find("{")) if index >= 0]
+    if not starts:
+        return Repair(None, "failed")
+    cleaned = strip_trailing_commas(cleaned[min(starts):].strip())
+    end = max(cleaned.rfind("]"), cleaned.rfind("}"))
+    try:
+        elements = _unwrap(json.loads(cleaned[:end + 1]), kind)
+        if elements is not None:
+            return Repair(elements, "repaired", kept=cleaned[:end + 1])
+    except ValueError:
+        pass
+
+    # A complete array followed by prose, or one cut off mid-element
+    elements, closed, end = _salvage(cleaned)
+    if closed:
+        return Repair(elements, "repaired", kept=cleaned[:end])
+    if not elements:
+        return Repair(None, "failed")
+    prefix = "[" + ",".join(json.dumps(element, separators=(",", ":")) for element in elements)
+    return Repair(elements, "truncated", prefix, kept=cleaned[:end])
+
+
+def join_continuation(prefix: str, continuation: str) -> str:
+    """Append a continuation to the open array it continues"""
+    tail = _strip_fences(continuation).strip()
+    if tail.startswith("["):
+        tail = tail[1:].lstrip()
+    tail = tail.lstrip(",").lstrip()
+    if not tail or tail.startswith("]"):
+        return prefix + tail
+    return prefix + ("," if prefix != "[" else "") + tail
+
+
+class RepairStats:
+    """Outcome and token counters for decoded LLM plan responses"""
+
+    def __init__(self):
+        self.counters = {
+            "clean": 0,
+            "repaired": 0,
+            "continued": 0,
+            "salvaged": 0,
+            "failed": 0,
+            "continuation_requests": 0,
+            "tokens_saved": 0,
+        }
+
+    def record(self, outcome: str, tokens_saved: int = 0) -> None:
+        self.counters[outcome] += 1
+        self.counters["tokens_saved"] += max(0, tokens_saved)
+
+    def stats(self) -> Dict[str, Any]:
+        outcomes = ("clean", "repaired", "continued", "salvaged", "failed")
+        total = sum(self.counters[outcome] for outcome in outcomes)
+        usable = total - self.counters["failed"]
+        return {
+            **self.counters,
+            "success_rate": round(usable / total, 4) if total else None,
+            "repair_rate": round((usable - self.counters["clean"]) / total, 4) if total else None,
+        }
+
+
+repair_stats = RepairStats()
+LLM_OUTPUT_DECODES.add_source(lambda: {
+    outcome: repair_stats.counters[outcome] for outcome in ("clean", "repaired", "continued", "salvaged", "failed")
+})
+LLM_TOKENS_SAVED.add_source(lambda: {"output_repair": repair_stats.counters["tokens_saved"]})
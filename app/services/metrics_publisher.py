@@ -0,0 +1,45 @@
+import asyncio
+import json
+import logging
+import os
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# One snapshot per worker process, keyed by pid
+KEY_PREFIX = "metrics:worker:"
+
+
+async def publish_metrics() -> None:
+    """Write this worker's metric values to shared state"""
+    await shared_state.set(
+        KEY_PREFIX + str(os.getpid()),
+        json.dumps(registry.snapshot()),
+        ttl_seconds=settings.METRICS_WORKER_TTL_SECONDS,
+    )
+
+
+async def render_all_workers() -> str:
+    """Metrics summed over every worker that published recently.
+
+    The worker serving the scrape publishes first, so its own values are
+    current; the others' are at most METRICS_PUBLISH_INTERVAL_SECONDS old.
+    Without a shared state file only this worker is reported.
+    """
+    if not settings.SHARED_STATE_PATH:
+        return registry.render()
+    await publish_metrics()
+    snapshots = await shared_state.get_prefix(KEY_PREFIX)
+    return registry.render_merged(json.loads(snapshot) for snapshot in snapshots.values())
+
+
+async def publish_periodically() -> None:
+    """Publish every METRICS_PUBLISH_INTERVAL_SECONDS until cancelled"""
+    while True:
+        await asyncio.sleep(settings.METRICS_PUBLISH_INTERVAL_SECONDS)
+        try:
+            await publish_metrics()
+        except Exception as e:
+            logger.warning("Publishing metrics failed: %s", e)
@@ -0,0 +1,164 @@
+import csv
+import logging
+import os
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.models.schemas import FoodItem, FoodNutrients
+from app.services.food_matcher import FoodNameIndex
+from app.services.nutrient_vector import NUTRIENT_FIELDS, NutrientVector
+
+logger = logging.getLogger(__name__)
+
+# Portion columns: grams per piece, grams per serving, grams per ml
+PORTION_FIELDS: List[str] = ["grams_per_piece", "grams_per_serving", "grams_per_ml"]
+
+BUNDLED_FOODS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "foods.csv")
+
+
+def _to_float(value: Optional[str]) -> float:
+    return float(value) if value not in (None, "") else np.nan
+
+
+class NutrientDatabase:
+    """Local nutrient table held as NumPy columns.
+
+    ``values`` is an (n_foods, n_nutrients) matrix of amounts per 100 g
+    (NaN where unknown) and ``portions`` holds each food's piece weight,
+    serving weight and density. Names and aliases map to row numbers
+    through a trigram index, so near-miss names ("grilled chicken breasts,
+    skinless") still find their row, while a name with an extra food word
+    ("chocolate milk" vs. "chocolate") does not.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.food_ids = np.empty(0, dtype=object)
+        self.names = np.empty(0, dtype=object)
+        self.values = np.empty((0, len(NUTRIENT_FIELDS)))
+        self.portions = np.empty((0, len(PORTION_FIELDS)))
+        self.name_index = FoodNameIndex()
+        self.loaded = False
+        self._records: Dict[int, FoodNutrients] = {}
+        self.counters = {"hits": 0, "misses": 0}
+
+    def load(self) -> None:
+        """Read the CSV into memory; columns missing from the file are NaN"""
+        with open(self.path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+        self.food_ids = np.array([row["food_id"] for row in rows], dtype=object)
+        self.names = np.array([row["name"] for row in rows], dtype=object)
+        self.values = np.array(
+            [[_to_float(row.get(field)) for field in NUTRIENT_FIELDS] for row in rows],
+            dtype=np.float64,
+        ).reshape(len(rows), len(NUTRIENT_FIELDS))
+        self.portions = np.array(
+            [[_to_float(row.get(field)) for field in PORTION_FIELDS] for row in rows],
+            dtype=np.float64,
+        ).reshape(len(rows), len(PORTION_FIELDS))
+
+        # The first food to claim a name keeps it
+        self.name_index = FoodNameIndex()
+        self.name_index.build(
+            (name, str(row_number))
+            for row_number, row in enumerate(rows)
+            for name in [row["name"], *(row.get("aliases") or "").split("|")]
+            if name.strip()
+        )
+        self._records = {}
+        self.loaded = True
+        logger.info("Loaded %d foods into the local nutrient database", len(rows))
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Row number for a food name or alias (or a close enough match), or None"""
+        self._ensure_loaded()
+        match = self.name_index.match(name, settings.FOOD_MATCH_MIN_SCORE, whole_words=True)
+        return int(match.food_id) if match is not None else None
+
+    def get(self, name: str) -> Optional[FoodNutrients]:
+        """Per-100 g nutrients for ``name``, or None when the food is not in the table"""
+        row = self.lookup(name)
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+
+        self.counters["hits"] += 1
+        record = self._records.get(row)
+        if record is None:
+            piece, serving, density = self.portions[row]
+            record = FoodNutrients(
+                name=self.names[row],
+                source="local",
+                per_100g={
+                    field: float(value)
+                    for field, value in zip(NUTRIENT_FIELDS, self.values[row])
+                    if not np.isnan(value)
+                },
+                grams_per_piece=None if np.isnan(piece) else float(piece),
+                grams_per_serving=None if np.isnan(serving) else float(serving),
+                grams_per_ml=1.0 if np.isnan(density) else float(density),
+            )
+            self._records[row] = record
+        return record
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "foods": len(self),
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+def portion_grams(nutrients: FoodNutrients, item: FoodItem) -> float:
+    """Weight in grams of ``item.quantity`` of this food in ``item.unit``"""
+    if item.unit == "g":
+        return item.quantity
+    if item.unit == "ml":
+        return item.quantity * nutrients.grams_per_ml
+    if item.unit == "pcs":
+        per_unit = nutrients.grams_per_piece or nutrients.grams_per_serving
+    else:
+        per_unit = nutrients.grams_per_serving or nutrients.grams_per_piece
+    # With no known portion weight, one unit is the 100 g reference amount
+    return item.quantity * (per_unit or 100.0)
+
+
+def compute_nutrition(
+    nutrients: Sequence[Optional[FoodNutrients]],
+    food_items: Sequence[FoodItem]
+) -> List[Optional[NutrientVector]]:
+    """Scale each food's per-100 g nutrients to its item's quantity.
+
+    All resolved items are computed together as one (items x nutrients)
+    matrix multiplied by the per-item weights; unresolved items map to None.
+    """
+    results: List[Optional[NutrientVector]] = [None] * len(food_items)
+    resolved = [index for index, record in enumerate(nutrients) if record is not None]
+    if not resolved:
+        return results
+
+    matrix = np.array(
+        [[nutrients[index].per_100g.get(field, np.nan) for field in NUTRIENT_FIELDS] for index in resolved],
+        dtype=np.float64,
+    )
+    grams = np.array([portion_grams(nutrients[index], food_items[index]) for index in resolved])
+    scaled = matrix * (grams / 100.0)[:, np.newaxis]
+
+    for index, vector in zip(resolved, NutrientVector.rows(scaled)):
+        results[index] = vector
+    return results
+
+
+nutrient_db = NutrientDatabase(settings.NUTRIENT_DB_PATH or BUNDLED_FOODS_PATH)
+CACHE_HITS.add_source(lambda: {"local_db": nutrient_db.counters["hits"]})
+CACHE_MISSES.add_source(lambda: {"local_db": nutrient_db.counters["misses"]})
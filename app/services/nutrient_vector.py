@@ -0,0 +1,135 @@
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from app.models.schemas import NutrientInfo, NutritionResponse
+
+# Every NutritionResponse field with its unit, in vector order
+NUTRIENT_UNITS: Dict[str, str] = {
+    "calories": "kcal",
+    "protein": "g",
+    "carbs": "g",
+    "fat": "g",
+    "saturated_fat": "g",
+    "monounsaturated_fat": "g",
+    "polyunsaturated_fat": "g",
+    "sugar": "g",
+    "fiber": "g",
+    "cholesterol": "mg",
+    "sodium": "mg",
+    "potassium": "mg",
+    "calcium": "mg",
+    "iron": "mg",
+    "vitamin_a": "mcg",
+    "vitamin_c": "mg",
+}
+NUTRIENT_FIELDS: List[str] = list(NUTRIENT_UNITS)
+NUTRIENT_INDEX: Dict[str, int] = {field: index for index, field in enumerate(NUTRIENT_FIELDS)}
+WIDTH = len(NUTRIENT_FIELDS)
+
+# NutritionResponse requires these; unknown values are reported as 0
+REQUIRED_NUTRIENTS = {"calories", "protein", "carbs", "fat", "saturated_fat"}
+
+_NAN = float("nan")
+_MISSING = array("d", [_NAN] * WIDTH)
+
+
+class NutrientVector:
+    """Nutrient amounts in NUTRIENT_FIELDS order, NaN where unknown.
+
+    The internal currency for nutrition math: one ``array('d')`` per food
+    instead of a NutritionResponse with sixteen NutrientInfo models.
+    Convert with ``to_response`` only when returning from the API.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Optional[array] = None):
+        self.values = values if values is not None else array("d", _MISSING)
+
+    @classmethod
+    def from_mapping(cls, amounts: Dict[str, float]) -> "NutrientVector":
+        values = array("d", _MISSING)
+        for field, amount in amounts.items():
+            index = NUTRIENT_INDEX.get(field)
+            if index is not None:
+                values[index] = amount
+        return cls(values)
+
+    @classmethod
+    def from_response(cls, nutrition: NutritionResponse) -> "NutrientVector":
+        values = array("d", _MISSING)
+        for index, field in enumerate(NUTRIENT_FIELDS):
+            info = getattr(nutrition, field)
+            if info is not None:
+                values[index] = info.value
+        return cls(values)
+
+    @classmethod
+    def rows(cls, matrix: np.ndarray) -> List["NutrientVector"]:
+        """Split an (n, WIDTH) float matrix into vectors with one copy"""
+        flat = array("d")
+        flat.frombytes(np.ascontiguousarray(matrix, dtype=np.float64).tobytes())
+        return [cls(flat[start:start + WIDTH]) for start in range(0, len(flat), WIDTH)]
+
+    @classmethod
+    def total(cls, vectors: Iterable["NutrientVector"]) -> Optional["NutrientVector"]:
+        """Column-wise sum; a nutrient stays missing only if every vector lacks it"""
+        flat = array("d")
+        for vector in vectors:
+            flat.extend(vector.values)
+        if not flat:
+            return None
+        matrix = np.frombuffer(flat, dtype=np.float64).reshape(-1, WIDTH)
+        missing = np.isnan(matrix).all(axis=0)
+        totals = np.where(missing, np.nan, np.nansum(matrix, axis=0))
+        values = array("d")
+        values.frombytes(totals.tobytes())
+        return cls(values)
+
+    def __getitem__(self, field: str) -> float:
+        return self.values[NUTRIENT_INDEX[field]]
+
+    def __add__(self, other: "NutrientVector") -> "NutrientVector":
+        return NutrientVector(array("d", [
+            b if math.isnan(a) else a if math.isnan(b) else a + b
+            for a, b in zip(self.values, other.values)
+        ]))
+
+    def scaled(self, factor: float) -> "NutrientVector":
+        return NutrientVector(array("d", [value * factor for value in self.values]))
+
+    def percent_of(self, reference: "NutrientVector") -> "NutrientVector":
+        """Each amount as a percentage of ``reference`` (NaN where either is unknown or 0)"""
+        values = np.frombuffer(self.values, dtype=np.float64)
+        references = np.frombuffer(reference.values, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percents = np.where(references > 0, values / references * 100, np.nan)
+        result = array("d")
+        result.frombytes(percents.tobytes())
+        return NutrientVector(result)
+
+    def to_response(self, rdi: Optional["NutrientVector"] = None) -> NutritionResponse:
+        """Build the API model; required nutrients default to 0, others are omitted.
+
+        With ``rdi``, each nutrient that has a reference gets ``rdi_percent``.
+        """
+        percents = self.percent_of(rdi).values if rdi is not None else _MISSING
+        nutrition = {}
+        for field, value, percent in zip(NUTRIENT_FIELDS, self.values, percents):
+            if math.isnan(value):
+                if field not in REQUIRED_NUTRIENTS:
+                    continue
+                value = 0.0
+            nutrition[field] = NutrientInfo(
+                value=round(value, 2),
+                unit=NUTRIENT_UNITS[field],
+                rdi_percent=None if math.isnan(percent) else round(percent, 1)
+            )
+        return NutritionResponse(**nutrition)
+
+    def __repr__(self) -> str:
+        amounts = ", ".join(
+            f"{field}={value:g}" for field, value in zip(NUTRIENT_FIELDS, self.values) if not math.isnan(value)
+        )
+        return f"NutrientVector({amounts})"
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.models.schemas import FoodNutrients
+
+_NON_WORD = re.compile(r"[^a-z0-9\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+# Singulars ending in "ie", whose plurals must not become "...y" ("cookies")
+_IE_SINGULARS = frozenset({"brownie", "calorie", "cookie", "hoagie", "pie", "smoothie", "veggie"})
+
+
+def _singularize(word: str) -> str:
+    """Strip simple English plural endings ("eggs", "berries", "cookies", "tomatoes")"""
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and word[:-1] in _IE_SINGULARS:
+        return word[:-1]
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_food_name(name: str) -> str:
+    """Normalize a free-text food name into a cache key"""
+    cleaned = _NON_WORD.sub(" ", name.lower())
+    words = _WHITESPACE.split(cleaned.strip())
+    return " ".join(_singularize(word) for word in words if word)
+
+
+class NutritionCache:
+    """Two-tier cache of per-100 g nutrients for foods resolved via FatSecret.
+
+    The first tier is an in-process LRU with a TTL; the second is a SQLite
+    file so resolved foods survive restarts. Both are keyed by
+    ``normalize_food_name``.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int, disk_ttl_seconds: int, db_path: Optional[str]):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, FoodNutrients]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "writes": 0,
+        }
+
+    # -- disk tier ---------------------------------------------------------
+
+    def _open_db(self) -> None:
+        if not self.db_path:
+            return
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS food_nutrients ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        db.execute("DELETE FROM food_nutrients WHERE expires_at < ?", (time.time(),))
+        db.commit()
+        self._db = db
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT expires_at, payload FROM food_nutrients WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return row
+
+    def _disk_get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[float, str]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ",".join("?" for _ in keys)
+        with self._db_lock:
+            rows = self._db.execute(
+                f"SELECT key, expires_at, payload FROM food_nutrients "
+                f"WHERE key IN ({placeholders}) AND expires_at >= ?",
+                (*keys, time.time()),
+            ).fetchall()
+        return {key: (expires_at, payload) for key, expires_at, payload in rows}
+
+    def _disk_set(self, key: str, payload: str) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO food_nutrients (key, payload, expires_at) VALUES (?, ?, ?)",
+                (key, payload, time.time() + self.disk_ttl_seconds),
+            )
+            self._db.commit()
+
+    # -- memory tier -------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[FoodNutrients]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._memory[key]
+            self.counters["expirations"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: FoodNutrients, disk_expires_at: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds
+        if disk_expires_at is not None:
+            # A promoted entry expires no later than its disk copy
+            ttl = min(ttl, disk_expires_at - time.time())
+        self._memory[key] = (time.monotonic() + ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    # -- public API --------------------------------------------------------
+
+    async def open(self) -> None:
+        """Open the on-disk store; safe to call more than once"""
+        if self._db is None:
+            await asyncio.to_thread(self._open_db)
+
+    async def close(self) -> None:
+        if self._db is not None:
+            db, self._db = self._db, None
+            await asyncio.to_thread(db.close)
+
+    async def get(self, name: str) -> Optional[FoodNutrients]:
+        key = normalize_food_name(name)
+        value = self._memory_get(key)
+        if value is not None:
+            self.counters["memory_hits"] += 1
+            return value
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row is not None:
+                value = FoodNutrients.model_validate_json(row[1])
+                self._memory_set(key, value, disk_expires_at=row[0])
+                self.counters["disk_hits"] += 1
+                return value
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, name: str, value: FoodNutrients) -> None:
+        key = normalize_food_name(name)
+        self._memory_set(key, value)
+        self.counters["writes"] += 1
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value.model_dump_json())
+
+    async def load_from_disk(self, names: Iterable[str]) -> Dict[str, FoodNutrients]:
+        """Promote any on-disk entries for ``names`` into memory in one query"""
+        keys = {normalize_food_name(name) for name in names}
+        if self._db is None or not keys:
+            return {}
+        rows = await asyncio.to_thread(self._disk_get_many, keys)
+        loaded = {}
+        for key, (expires_at, payload) in rows.items():
+            value = FoodNutrients.model_validate_json(payload)
+            self._memory_set(key, value, disk_expires_at=expires_at)
+            loaded[key] = value
+        return loaded
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "size": len(self._memory),
+            "max_size": self.max_size,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+nutrition_cache = NutritionCache(
+    max_size=settings.NUTRITION_CACHE_SIZE,
+    ttl_seconds=settings.NUTRITION_CACHE_TTL_SECONDS,
+    disk_ttl_seconds=settings.NUTRITION_CACHE_DISK_TTL_SECONDS,
+    db_path=settings.NUTRITION_CACHE_PATH,
+)
+CACHE_HITS.add_source(lambda: {"nutrition": nutrition_cache.counters["memory_hits"] + nutrition_cache.counters["disk_hits"]})
+CACHE_MISSES.add_source(lambda: {"nutrition": nutrition_cache.counters["misses"]})
@@ -1,153 +1,276 @@
 import asyncio
-import aiohttp
-from typing import List, Dict, Optional
+import logging
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 from fastapi import HTTPException
-from datetime import datetime, timedelta
 from app.core.config import settings
-from app.models.schemas import FoodItem, NutrientInfo, NutritionResponse
+from app.core.metrics import SINGLE_FLIGHT_COALESCED, SINGLE_FLIGHT_EXECUTED
+from app.models.schemas import FoodItem, FoodNutrients, NutritionResponse
+from app.services.nutrition_cache import nutrition_cache, normalize_food_name
+from app.services.nutrient_db import nutrient_db, compute_nutrition
+from app.services.nutrient_vector import NutrientVector
+from app.services.rdi import STANDARD_RDI
+from app.services.fatsecret_client import fatsecret_client
+from app.services.food_matcher import food_matcher
+from app.services.deadline import remaining
+from app.services.single_flight import SingleFlight
+from app.services.upstream_scheduler import BATCH, request_priority
 
-# Token cache
-token_data = {
-    "access_token": None,
-    "expires_at": None
-}
+logger = logging.getLogger(__name__)
+
+# Grams per FatSecret metric serving unit
+METRIC_SERVING_GRAMS = {'g': 1.0, 'ml': 1.0, 'oz': 28.3495}
+
+# Concurrent identical work shares one execution: FatSecret lookups by
+# normalized food name, /calculate-nutrition by canonical request body
+nutrient_lookups = SingleFlight("food_nutrients")
+nutrition_calculations = SingleFlight("calculate_nutrition")
+
+# Lookups that outlived their request's deadline; held so they are not
+# garbage collected before they finish and fill the nutrition cache
+_background_lookups: Set[asyncio.Future] = set()
 
 async def get_access_token() -> str:
     """Get a valid access token for the FatSecret API"""
-    global token_data
-    
-    current_time = datetime.now()
-    
-    # Check if we have a valid token
-    if token_data["access_token"] and token_data["expires_at"] and current_time < token_data["expires_at"]:
-        return token_data["access_token"]
-    
-    # Request new token
-    auth_data = {
-        'grant_type': 'client_credentials',
-        'client_id': settings.FAT_SECRET_CLIENT_ID,
-        'client_secret': settings.FAT_SECRET_CLIENT_SECRET,
-        'scope': 'basic'
-    }
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(settings.FAT_SECRET_AUTH_URL, data=auth_data) as response:
-                if response.status != 200:
-                    raise HTTPException(status_code=500, detail="Failed to authenticate with FatSecret API")
-                token_info = await response.json()
-                
-                # Save token with expiration time
-                token_data["access_token"] = token_info["access_token"]
-                token_data["expires_at"] = current_time + timedelta(seconds=token_info["expires_in"] - 300)
-                
-                return token_data["access_token"]
-        except Exception as e:
-            print(f"Error getting access token: {e}")
-            raise HTTPException(status_code=500, detail="Failed to authenticate with FatSecret API")
-
-async def get_food_nutrition(item: FoodItem) -> Optional[Dict]:
-    """Get nutrition data for a food item from FatSecret API"""
-    token = await get_access_token()
-    
-    async with aiohttp.ClientSession() as session:
-        # First, search for the food
-        try:
-            # Search for food
-            search_params = {
-                'method': 'foods.search',
-                'search_expression': item.name,
-                'format': 'json'
-            }
-            headers = {'Authorization': f'Bearer {token}'}
-            
-            async with session.get(settings.FAT_SECRET_BASEURL, params=search_params, headers=headers) as response:
-                if response.status != 200:
-                    print(f"Error searching for food {item.name}: {response.status}")
-                    return None
-                    
-                search_data = await response.json()
-                if 'foods' not in search_data or 'food' not in search_data['foods']:
-                    print(f"No food found for {item.name}")
-                    return None
-                
-                # Get the first matching food
-                foods = search_data['foods']['food']
-                food_id = foods[0]['food_id'] if isinstance(foods, list) else foods['food_id']
-                
-                # Get detailed nutrition data
-                detail_params = {
-                    'method': 'food.get.v2',
-                    'food_id': food_id,
-                    'format': 'json'
-                }
-                
-                async with session.get(settings.FAT_SECRET_BASEURL, params=detail_params, headers=headers) as detail_response:
-                    if detail_response.status != 200:
-                        print(f"Error getting nutrition data for {item.name}: {detail_response.status}")
-                        return None
-                        
-                    food_data = await detail_response.json()
-                    if 'food' not in food_data or 'servings' not in food_data['food']:
-                        print(f"No serving data for {item.name}")
-                        return None
-                    
-                    servings = food_data['food']['servings']
-                    serving = servings['serving'][0] if isinstance(servings['serving'], list) else servings['serving']
-                    
-                    # Create nutrition response
-                    nutrition = {}
-                    nutrient_mapping = {
-                        'calories': ('calories', 'kcal'),
-                        'protein': ('protein', 'g'),
-                        'carbohydrate': ('carbs', 'g'),
-                        'fat': ('fat', 'g'),
-                        'saturated_fat': ('saturated_fat', 'g'),
-                        'sugar': ('sugar', 'g'),
-                        'fiber': ('fiber', 'g'),
-                        'cholesterol': ('cholesterol', 'mg'),
-                        'sodium': ('sodium', 'mg'),
-                        'potassium': ('potassium', 'mg')
-                    }
-                    
-                    for api_field, (output_field, unit) in nutrient_mapping.items():
-                        try:
-                            value = float(serving.get(api_field, 0))
-                            nutrition[output_field] = NutrientInfo(
-                                value=value,
-                                unit=unit
-                            )
-                        except (ValueError, TypeError):
-                            nutrition[output_field] = NutrientInfo(value=0, unit=unit)
-                    
-                    return NutritionResponse(**nutrition)
-                    
-        except Exception as e:
-            print(f"Error processing nutrition data for {item.name}: {e}")
+    return await fatsecret_client.get_access_token()
+
+async def get_food_nutrients(name: str) -> Optional[FoodNutrients]:
+    """Per-100 g nutrients for a food: the local table first, then the cache, then FatSecret"""
+    if settings.NUTRIENT_DB_ENABLED:
+        local = nutrient_db.get(name)
+        if local is not None:
+            return local
+
+    cached = await nutrition_cache.get(name)
+    if cached is not None:
+        return cached
+
+    async def fetch_and_cache() -> Optional[FoodNutrients]:
+        nutrients = await fetch_food_nutrients(name)
+        if nutrients is not None:
+            await nutrition_cache.set(name, nutrients)
+        return nutrients
+
+    return await nutrient_lookups.do(normalize_food_name(name), fetch_and_cache)
+
+async def get_food_nutrition(item: FoodItem) -> Optional[NutritionResponse]:
+    """Get nutrition data for a food item, scaled to its quantity and unit"""
+    nutrients = await get_food_nutrients(item.name)
+    vector = compute_nutrition([nutrients], [item])[0]
+    return vector.to_response(STANDARD_RDI) if vector is not None else None
+
+async def warm_nutrition_cache(food_names: List[str]) -> None:
+    """Preload the cache with common foods, fetching any that are not on disk"""
+    # Warming is background work; let interactive lookups go first
+    request_priority.set(BATCH)
+    await nutrition_cache.open()
+    if settings.NUTRIENT_DB_ENABLED:
+        # Foods in the local table never reach FatSecret
+        food_names = [name for name in food_names if nutrient_db.lookup(name) is None]
+    loaded = await nutrition_cache.load_from_disk(food_names)
+    missing = {normalize_food_name(name): name for name in food_names}
+    for key in loaded:
+        missing.pop(key, None)
+
+    results = await asyncio.gather(
+        *[get_food_nutrients(name) for name in missing.values()],
+        return_exceptions=True
+    )
+    warmed = sum(1 for result in results if isinstance(result, FoodNutrients))
+    logger.info("Nutrition cache warmed: %d from disk, %d of %d fetched", len(loaded), warmed, len(missing))
+
+def serving_grams(serving: Dict) -> Optional[float]:
+    """Metric weight of a FatSecret serving in grams (ml counted as grams)"""
+    try:
+        amount = float(serving.get('metric_serving_amount') or 0)
+    except (TypeError, ValueError):
+        return None
+    factor = METRIC_SERVING_GRAMS.get(str(serving.get('metric_serving_unit', '')).lower())
+    if not amount or factor is None:
+        return None
+    return amount * factor
+
+async def fetch_food_nutrients(name: str) -> Optional[FoodNutrients]:
+    """Get per-100 g nutrients for a food from FatSecret API"""
+    # Authentication failures propagate; everything else degrades to None
+    await fatsecret_client.get_access_token()
+
+    try:
+        # Confident name matches go straight to food.get.v2
+        await food_matcher.open()
+        match = food_matcher.resolve(name) or await food_matcher.load_alias(name)
+        if match is not None:
+            food_id = match.food_id
+        else:
+            # Otherwise search for the food
+            search_data = await fatsecret_client.search_foods(name)
+            if search_data is None:
+                logger.warning("Error searching for food %s", name)
+                return None
+            if 'foods' not in search_data or 'food' not in search_data['foods']:
+                logger.info("No food found for %s", name)
+                return None
+
+            # Pick the closest match rather than blindly taking the first result
+            foods = search_data['foods']['food']
+            if not isinstance(foods, list):
+                foods = [foods]
+            food = food_matcher.choose(name, foods)
+            food_id = str(food['food_id'])
+            await food_matcher.learn(name, food_id, food.get('food_name', name))
+
+        # Get detailed nutrition data
+        food_data = await fatsecret_client.get_food(food_id)
+        if food_data is None:
+            logger.warning("Error getting nutrition data for %s", name)
             return None
+        if 'food' not in food_data or 'servings' not in food_data['food']:
+            logger.info("No serving data for %s", name)
+            return None
+
+        servings = food_data['food']['servings']['serving']
+        if not isinstance(servings, list):
+            servings = [servings]
+
+        # Normalize from the first serving with a metric weight; the first
+        # serving is FatSecret's default portion
+        default_serving = servings[0]
+        reference = next((serving for serving in servings if serving_grams(serving)), default_serving)
+        reference_grams = serving_grams(reference)
+        # Without any metric weight, treat the serving as the 100 g reference amount
+        scale = 100.0 / reference_grams if reference_grams else 1.0
+
+        per_100g = {}
+        nutrient_mapping = {
+            'calories': 'calories',
+            'protein': 'protein',
+            'carbohydrate': 'carbs',
+            'fat': 'fat',
+            'saturated_fat': 'saturated_fat',
+            'sugar': 'sugar',
+            'fiber': 'fiber',
+            'cholesterol': 'cholesterol',
+            'sodium': 'sodium',
+            'potassium': 'potassium'
+        }
+
+        for api_field, output_field in nutrient_mapping.items():
+            try:
+                per_100g[output_field] = float(reference.get(api_field, 0)) * scale
+            except (ValueError, TypeError):
+                per_100g[output_field] = 0.0
+
+        default_grams = serving_grams(default_serving)
+        grams_per_piece = None
+        if default_grams and default_serving.get('measurement_description', '').lower() not in ('g', 'ml', 'oz', 'serving'):
+            # e.g. "1 medium" or "2 slices": weigh a single unit
+            try:
+                grams_per_piece = default_grams / (float(default_serving.get('number_of_units') or 1) or 1)
+            except (ValueError, TypeError):
+                grams_per_piece = default_grams
+
+        return FoodNutrients(
+            name=name,
+            source="fatsecret",
+            per_100g=per_100g,
+            grams_per_piece=grams_per_piece,
+            grams_per_serving=default_grams
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error processing nutrition data for %s: %s", name, e)
+        return None
+
+async def resolve_foods_nutrition(
+    food_items: List[FoodItem],
+    lookups: Optional[Dict[str, asyncio.Future]] = None
+) -> List[Optional[NutrientVector]]:
+    """Look up nutrition for each item, resolving repeated food names only once.
+
+    Lookups yield per-100 g nutrients, so the same food eaten in different
+    amounts shares one lookup and is scaled per item afterwards. Pass a
+    shared ``lookups`` dict to extend the deduplication beyond one call
+    (e.g. across every plan in a batch). A lookup that failed (e.g. an
+    upstream auth error) is started again rather than failing every later
+    plan with that food. Under a request budget, items whose lookup is
+    still running at the deadline come back as None; their futures in
+    ``lookups`` are not done.
+    """
+    if lookups is None:
+        lookups = {}
+    for item in food_items:
+        key = normalize_food_name(item.name)
+        if key not in lookups or _failed(lookups[key]):
+            lookups[key] = asyncio.ensure_future(get_food_nutrients(item.name))
+
+    keys = [normalize_food_name(item.name) for item in food_items]
+    await wait_for_lookups(lookups[key] for key in set(keys))
+    # Lookups still running at the deadline count as unresolved for now
+    return compute_nutrition(
+        [lookups[key].result() if lookups[key].done() else None for key in keys], food_items
+    )
+
+def _failed(lookup: asyncio.Future) -> bool:
+    return lookup.done() and (lookup.cancelled() or lookup.exception() is not None)
+
+async def wait_for_lookups(lookups: Iterable[asyncio.Future]) -> None:
+    """Wait for lookups until the request deadline, or for all of them without a budget.
+
+    Lookups still running at the deadline are left to finish in the
+    background, so the next request for the same foods hits the cache.
+    """
+    lookups = set(lookups)
+    timeout = remaining()
+    if timeout is None:
+        await asyncio.gather(*lookups)
+        return
+    if not lookups:
+        return
+    done, pending = await asyncio.wait(lookups, timeout=timeout)
+    for lookup in done:
+        # Raise the first error as gather would
+        lookup.result()
+    finish_in_background(pending)
+
+def finish_in_background(lookups: Iterable[asyncio.Future]) -> None:
+    """Keep lookups running after the request that started them has returned"""
+    for lookup in lookups:
+        _background_lookups.add(lookup)
+        lookup.add_done_callback(_background_done)
+
+def _background_done(lookup: asyncio.Future) -> None:
+    _background_lookups.discard(lookup)
+    if not lookup.cancelled() and lookup.exception() is not None:
+        logger.debug("Background nutrition lookup failed: %s", lookup.exception())
+
+def aggregate_nutrition(nutrition_data_list: List[Optional[NutrientVector]]) -> Optional[NutrientVector]:
+    """Sum already-fetched nutrition data; returns None if nothing was resolved"""
+    return NutrientVector.total(data for data in nutrition_data_list if data is not None)
+
+def nutrition_request_key(food_items: List[FoodItem]) -> Tuple:
+    """Canonical form of a nutrition request: totals ignore item order and meal"""
+    return tuple(sorted((normalize_food_name(item.name), item.quantity, item.unit) for item in food_items))
 
 async def calculate_nutrition_for_foods(food_items: List[FoodItem]) -> NutritionResponse:
-    """Get nutrition data for multiple food items concurrently"""
-    # Process all food items concurrently
-    tasks = [get_food_nutrition(item) for item in food_items]
-    nutrition_data_list = await asyncio.gather(*tasks)
-    
-    # Filter out None results
-    nutrition_data_list = [data for data in nutrition_data_list if data is not None]
+    """Get nutrition data for multiple food items, sharing the work of identical concurrent requests"""
+    return await nutrition_calculations.do(
+        nutrition_request_key(food_items), lambda: _calculate_nutrition(food_items)
+    )
+
+async def _calculate_nutrition(food_items: List[FoodItem]) -> NutritionResponse:
+    nutrition_data_list = await resolve_foods_nutrition(food_items)
+    total_nutrition = aggregate_nutrition(nutrition_data_list)
     
-    if not nutrition_data_list:
+    if total_nutrition is None:
         raise HTTPException(
             status_code=404,
             detail="Could not find nutritional information for any of the provided foods"
         )
     
-    # Combine nutrition data
-    total_nutrition = {}
-    for nutrient in ['calories', 'protein', 'carbs', 'fat', 'saturated_fat', 
-                    'sugar', 'fiber', 'cholesterol', 'sodium', 'potassium']:
-        total = sum(getattr(data, nutrient).value for data in nutrition_data_list if hasattr(data, nutrient))
-        unit = next((getattr(data, nutrient).unit for data in nutrition_data_list 
-                    if hasattr(data, nutrient)), 'g')
-        total_nutrition[nutrient] = NutrientInfo(value=round(total, 2), unit=unit)
-    
-    return NutritionResponse(**total_nutrition)
+    return total_nutrition.to_response(STANDARD_RDI)
+
+
+for _flight in (nutrient_lookups, nutrition_calculations):
+    SINGLE_FLIGHT_EXECUTED.add_source(lambda flight=_flight: {flight.name: flight.counters["executed"]})
+    SINGLE_FLIGHT_COALESCED.add_source(lambda flight=_flight: {flight.name: flight.counters["coalesced"]})
@@ -1,164 +1,156 @@
+import asyncio
 import time
-import json
-import requests
+import logging
 import uuid
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+import aiohttp
 from fastapi import HTTPException
 from app.core.config import settings
-from app.models.schemas import UserProfile, MealPlan,WorkoutItem,WorkoutPlanDay,WorkoutPlan
-
-def generate_meal_plan_prompt(user: UserProfile) -> str:
-    return f"""
-You are a professional nutritionist AI. Based on the UserProfile below, output a daily meal plan in strict JSON format.
-
-User Profile:
-- Gender: {user.gender}
-- Age: {user.age}
-- Height: {user.height} cm
-- Current Weight: {user.weight} kg
-- Target Weight: {user.desiredWeight} kg
-- Weekly Weight Goal: {user.weeklyWeightLossGoal} kg
-- Training: {user.trainingDay} days/week at {user.workoutLocation}
-- Diet Type: {user.dietType.upper()}
-- Goals: {user.reachingGoals}, {user.accomplish}
-
-Requirements:
-1. ALL FOOD ITEMS MUST BE HALAL.
-2. Provide four meal categories: BREAKFAST, LUNCH, DINNER, SNACK.
-3. For each meal, list 3–5 items.
-4. Use **exactly** this JSON schema for each item:
-
-{{
-  "meal": "BREAKFAST" | "LUNCH" | "DINNER" | "SNACK",
-  "item": "Food Name",
-  "quantity": number,
-  "unit": "g" | "ml" | "pcs"
-}}
-
-— **quantity** is the total weight/volume/count per serving.  
-— **unit** must be **g** for solids, **ml** for liquids, or **pcs** for discrete items.  
-
-5. Return a single JSON array of these objects—no extra text or fields.
-"""
-
-
-def generate_workout_plan_prompt(user: UserProfile) -> str:
-    # Determine split type based on training days
-    split_type = ""
-    if user.trainingDay == 6:
-        split_type = "Push (chest/shoulders/triceps), Pull (back/biceps), Legs split, repeating twice weekly"
-    elif user.trainingDay == 5:
-        split_type = "Push, Pull, Legs, Upper, Lower split"
-    elif user.trainingDay == 4:
-        split_type = "Upper, Lower split, repeating twice weekly"
-    elif user.trainingDay == 3:
-        split_type = "Upper, Lower, Full Body split"
+from app.models.schemas import UserProfile, MealPlan, FoodItem, WorkoutPlan, parse_meal_items, parse_workout_days
+from app.services.llm_client import llm_client
+from app.services.plan_cache import plan_cache, serve_cached
+from app.services.targets import MacroTargets, macro_targets
+from app.services.json_stream import JSONArrayStreamParser
+from app.services.llm_repair import CONTINUE_PROMPT, join_continuation, repair_json_array, repair_stats
+from app.services.prompts import (
+    estimate_tokens, meal_plan_max_tokens, meal_plan_messages, workout_plan_max_tokens, workout_plan_messages
+)
+from app.core.metrics import MEAL_ITEMS_SKIPPED, PLAN_PARSE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+async def stream_meal_plan_items(user: UserProfile) -> AsyncIterator[FoodItem]:
+    """Yield validated meal items as soon as each one is complete in the LLM stream"""
+    # One malformed element should cost that item, not the whole stream
+    parser = JSONArrayStreamParser(skip_invalid=True)
+    async for delta in llm_client.stream_chat_completion(meal_plan_messages(user), temperature=0.8,
+                                                         max_tokens=meal_plan_max_tokens(), kind="meal"):
+        skipped = parser.skipped
+        items = parser.feed(delta)
+        if parser.skipped > skipped:
+            logger.warning("Skipping %d malformed meal item(s) in the stream", parser.skipped - skipped)
+            MEAL_ITEMS_SKIPPED.inc(parser.skipped - skipped, reason="malformed")
+        for item in items:
+            food_item = FoodItem.from_plan_item(item)
+            if food_item is None:
+                logger.debug("Skipping unusable meal item: %s", item)
+                MEAL_ITEMS_SKIPPED.inc(reason="invalid")
+                continue
+            yield food_item
+        if parser.finished:
+            break
+
+
+def _completion_tokens(result: Dict, content: str) -> int:
+    # Local estimate when the API reports no usage
+    return (result.get("usage") or {}).get("completion_tokens") or estimate_tokens(content)
+
+
+def _kept_tokens(result: Dict, content: str, kept: str) -> int:
+    """Completion tokens for the part of ``content`` that was kept"""
+    if not content:
+        return 0
+    return round(_completion_tokens(result, content) * min(len(kept), len(content)) / len(content))
+
+
+async def decode_plan_response(kind: str, messages: List[Dict[str, str]], result: Dict,
+                               max_tokens: int) -> Optional[List[Any]]:
+    """Decode a plan completion into its JSON array elements, repairing it if needed.
+
+    Malformed output (fences, trailing commas, wrapped arrays) is repaired
+    locally. Output cut off mid-array is completed by asking the model for
+    only the missing tail; if that fails too, the complete elements are
+    kept. Returns None if nothing usable was found. Either way the caller
+    avoids re-requesting the whole plan.
+    """
+    content = result["choices"][0]["message"]["content"]
+    with PLAN_PARSE_SECONDS.time(kind=kind):
+        repair = repair_json_array(content, kind)
+    if repair.outcome in ("clean", "failed"):
+        repair_stats.record(repair.outcome)
+        if repair.outcome == "failed":
+            logger.warning("%s plan response is not valid JSON", kind.capitalize())
+        return repair.elements
+    if repair.outcome == "repaired":
+        repair_stats.record("repaired", _kept_tokens(result, content, repair.kept))
+        return repair.elements
+
+    # Truncated: ask for the rest rather than the whole plan again
+    if settings.LLM_CONTINUATION_ENABLED:
+        repair_stats.counters["continuation_requests"] += 1
+        try:
+            continuation = await llm_client.chat_completion(
+                [*messages, {"role": "assistant", "content": repair.prefix}, {"role": "user", "content": CONTINUE_PROMPT}],
+                temperature=0.2,
+                max_tokens=max_tokens,
+                kind="continuation",
+            )
+            tail = continuation["choices"][0]["message"]["content"]
+            with PLAN_PARSE_SECONDS.time(kind=kind):
+                completed = repair_json_array(join_continuation(repair.prefix, tail), kind)
+            if completed.outcome in ("clean", "repaired"):
+                repair_stats.record("continued", _kept_tokens(result, content, repair.kept))
+                return completed.elements
+            logger.warning("Continuation of truncated %s plan did not complete it", kind)
+        except (HTTPException, KeyError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Continuation of truncated %s plan failed: %s", kind, e)
+
+    if repair.elements:
+        repair_stats.record("salvaged", _kept_tokens(result, content, repair.kept))
     else:
-        split_type = "Full Body workouts"
-
-    return f"""
-You are a professional workout AI. Based on the following user profile, generate a detailed workout plan.
-
-User Profile:
-- Gender: {user.gender}
-- Age: {user.age}
-- Height: {user.height}cm
-- Current Weight: {user.weight}kg
-- Target Weight: {user.desiredWeight}kg
-- Weekly Weight Goal: {user.weeklyWeightLossGoal}kg
-- Training: {user.trainingDay} days/week
-- Diet Type: {user.dietType.upper()}
-- Goals: {user.reachingGoals}, {user.accomplish}
-
-Instructions:
-- Create a {user.trainingDay}-day workout plan using a {split_type}.
-- Each muscle group should be trained twice per week.
-- For each day (Day 1, Day 2, ... up to Day {user.trainingDay}), include 5-8 exercises.
-- For each day, return a JSON object with EXACTLY the following format:
-{{
-  "day": "Day 1",
-  "focus": "Upper Body", // The focus of this day's workout
-  "workoutPlan": [
-    {{
-      "name": "Exercise Name",
-      "sets": number,
-      "reps": string, // Can be a range like "8-12" or fixed like "10"
-      "rest": string, // Example: "60-90 sec between sets, 2 min after exercise"
-    }},
-    ... (5-8 exercises)
-  ]
-}}
-- Return the full response as a list of JSON objects (not narrative text).
-- Do NOT include any additional fields.
-- Ensure the workout plan is safe, effective, and appropriate for the user's profile and goals.
-"""
-
-async def get_meal_plan(user: UserProfile):
-    headers = {
-        "Authorization": f"Bearer {settings.API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": settings.MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a professional nutritionist AI. You must respond with valid JSON data only, no other text. Your response must be a JSON array containing objects with ONLY the fields: meal, item, quantity, and unit."},
-            {"role": "user", "content": generate_meal_plan_prompt(user)}
-        ],
-        "temperature": 0.8, 
-        "max_tokens": 1024
-    }
-
+        repair_stats.record("failed")
+    return repair.elements
+
+
+async def get_meal_plan(
+    user: UserProfile,
+    use_cache: bool = False,
+    variety: Optional[str] = None,
+    targets: Optional[MacroTargets] = None
+):
+    """Generate a one-day meal plan; ``targets`` may be precomputed (see compute_targets)"""
+    if targets is None:
+        targets = macro_targets(user)
+    # Cached plans were generated without variety constraints
+    use_cache = use_cache and not variety
+    if use_cache:
+        start_time = time.time()
+        cached_plan = await plan_cache.get("meal", user)
+        if cached_plan is not None:
+            return serve_cached(cached_plan, user, str(uuid.uuid4()), round(time.time() - start_time, 4))
+
+    messages = meal_plan_messages(user, variety, targets)
+    max_tokens = meal_plan_max_tokens()
     start_time = time.time()
-    response = requests.post(settings.API_URL, headers=headers, json=data)
-    end_time = time.time()
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, 
-                          detail=f"OpenAI API error: {response.json()}")
+    result = await llm_client.chat_completion(messages, temperature=0.8, max_tokens=max_tokens, kind="meal")
 
-    result = response.json()
-    elapsed_time = round(end_time - start_time, 2)    
-    
     try:
         response_content = result["choices"][0]["message"]["content"]
         
-        # Parse the response content to ensure it only has the required fields
-        try:
-            meal_data = json.loads(response_content)
-            
-            # Clean the data - keep only the required fields
-            cleaned_data = []
-            for item in meal_data:
-                # Skip items without a name
-                if not item.get("item"):
-                    print(f"Skipping item without name: {item}")
-                    continue
-                    
-                cleaned_item = {
-                    "mealPlanType": item.get("meal", "SNACK"),  # Get meal type
-                    "name": item.get("item").strip(),  # Get food name and remove whitespace
-                    "totalFood": float(item.get("quantity", 1)),  # Get quantity as totalFood
-                    "unit": item.get("unit", "g").lower(),  # Get unit and normalize
-                    "servingSize": float(item.get("quantity", 1))  # Use same quantity for serving size
-                }
-                cleaned_data.append(cleaned_item)
-            
-            # Convert back to JSON string
-            clean_response_content = json.dumps(cleaned_data, indent=2)
-            
-            # Create meal plan with cleaned data (without MongoDB)
+        # Parse once into validated items; the text form is rendered only on request
+        meal_data = await decode_plan_response("meal", messages, result, max_tokens=max_tokens)
+        elapsed_time = round(time.time() - start_time, 2)
+        if meal_data is not None:
+            items = parse_meal_items(meal_data)
+            if len(items) < len(meal_data):
+                MEAL_ITEMS_SKIPPED.inc(len(meal_data) - len(items), reason="invalid")
+
             meal_plan = MealPlan(
                 id=str(uuid.uuid4()),
                 user_profile=user,
-                meal_plan_text=clean_response_content,
-                response_time_seconds=elapsed_time
+                items=items,
+                response_time_seconds=elapsed_time,
+                targets=targets.to_model()
             )
+            if use_cache:
+                await plan_cache.put("meal", user, meal_plan)
             
             return meal_plan
             
-        except json.JSONDecodeError:
-            # If parsing fails, return the original response
+        else:
+            # Nothing could be salvaged; return the original response
             meal_plan = MealPlan(
                 id=str(uuid.uuid4()),
                 user_profile=user,
@@ -175,67 +167,35 @@ async def get_meal_plan(user: UserProfile):
         )
     
 
-async def get_workout_plan(user: UserProfile):
-    headers = {
-        "Authorization": f"Bearer {settings.API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": settings.MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a professional workout planner AI. You must respond with valid JSON data only, no other text. Your response must be a JSON array containing objects with ONLY the fields: day, focus, and workoutPlan (which is a list of objects with name, sets, reps, and rest fields)."},
-            {"role": "user", "content": generate_workout_plan_prompt(user)}
-        ],
-        "temperature": 0.8, 
-        "max_tokens": 2048  # Increased token limit to handle larger responses
-    }
+async def get_workout_plan(user: UserProfile, use_cache: bool = False):
+    if use_cache:
+        start_time = time.time()
+        cached_plan = await plan_cache.get("workout", user)
+        if cached_plan is not None:
+            return serve_cached(cached_plan, user, str(uuid.uuid4()), round(time.time() - start_time, 4))
 
+    messages = workout_plan_messages(user)
+    # Sized from the number of training days, so 6-day plans are not cut off
+    max_tokens = workout_plan_max_tokens(user.trainingDay)
     start_time = time.time()
-    response = requests.post(settings.API_URL, headers=headers, json=data)
-    end_time = time.time()
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, 
-                          detail=f"OpenAI API error: {response.json()}")
+    result = await llm_client.chat_completion(messages, temperature=0.8, max_tokens=max_tokens, kind="workout")
 
-    result = response.json()
-    elapsed_time = round(end_time - start_time, 2)    
-    
     try:
         response_content = result["choices"][0]["message"]["content"]
-        try:
-            workout_data = json.loads(response_content)
-            
-            # Clean the data to ensure it has the required fields
-            cleaned_data = []
-            for day_data in workout_data:
-                cleaned_workout_plan = []
-                for exercise in day_data.get("workoutPlan", []):
-                    cleaned_exercise = {
-                        "name": exercise.get("name", ""),
-                        "sets": exercise.get("sets", 3),
-                        "reps": exercise.get("reps", "8-12"),
-                        "rest": exercise.get("rest", "60 sec")
-                    }
-                    cleaned_workout_plan.append(cleaned_exercise)
-                
-                cleaned_day = {
-                    "day": day_data.get("day", ""),
-                    "focus": day_data.get("focus", ""),
-                    "workoutPlan": cleaned_workout_plan
-                }
-                cleaned_data.append(cleaned_day)
-            
-            clean_response_content = json.dumps(cleaned_data, indent=2)
+        workout_data = await decode_plan_response("workout", messages, result, max_tokens=max_tokens)
+        elapsed_time = round(time.time() - start_time, 2)
+        if workout_data is not None:
+            days = parse_workout_days(workout_data)
             workout_plan = WorkoutPlan(
                 id=str(uuid.uuid4()),
                 user_profile=user,
-                workout_plan_text=clean_response_content,
+                days=days,
                 response_time_seconds=elapsed_time
             )
+            if use_cache:
+                await plan_cache.put("workout", user, workout_plan)
             return workout_plan
-        except json.JSONDecodeError:
+        else:
             workout_plan = WorkoutPlan(
                 id=str(uuid.uuid4()),
                 user_profile=user,
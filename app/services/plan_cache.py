@@ -0,0 +1,147 @@
+import json
+import random
+import time
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, TypeVar, Union
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.db.shared_state import shared_state
+from app.models.schemas import UserProfile, MealPlan, WorkoutPlan
+from app.services.targets import macro_targets
+
+Plan = TypeVar("Plan", MealPlan, WorkoutPlan)
+
+_PLAN_LISTS = {"meal": TypeAdapter(List[MealPlan]), "workout": TypeAdapter(List[WorkoutPlan])}
+
+
+def _band(value: float, width: float) -> int:
+    return int(value // width)
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def profile_fingerprint(kind: str, user: UserProfile) -> Tuple:
+    """Canonical, bucketed key for profiles that should share cached plans.
+
+    Meal plans are generated for the profile's calorie and macro targets,
+    which depend on height and weight goals too, so they are also keyed by
+    a band of the calorie target.
+    """
+    calorie_band = _band(macro_targets(user).calories, settings.PLAN_CACHE_CALORIE_BAND_KCAL) if kind == "meal" else None
+    return (
+        kind,
+        calorie_band,
+        _band(user.age, settings.PLAN_CACHE_AGE_BAND_YEARS),
+        _band(user.weight, settings.PLAN_CACHE_WEIGHT_BAND_KG),
+        _clean(user.gender),
+        _clean(user.dietType),
+        user.trainingDay,
+        _clean(user.workoutLocation),
+        _clean(user.reachingGoals),
+        _clean(user.accomplish),
+    )
+
+
+class PlanCache:
+    """LRU/TTL cache holding up to ``variants_per_key`` plans per fingerprint.
+
+    Until a fingerprint has its full set of variants every request is
+    generated fresh (and added), so users still see variety; after that a
+    random variant is served. Variants are also kept in shared state, so a
+    worker process adopts variants generated by the others.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int, variants_per_key: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.variants_per_key = variants_per_key
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Union[MealPlan, WorkoutPlan]]]]" = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    async def get(self, kind: str, user: UserProfile) -> Optional[Union[MealPlan, WorkoutPlan]]:
+        key = profile_fingerprint(kind, user)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is None or len(entry[1]) < self.variants_per_key:
+            shared = await self._load_shared(kind, key)
+            if len(shared) < self.variants_per_key:
+                self.counters["misses"] += 1
+                return None
+            entry = (time.monotonic() + self.ttl_seconds, shared)
+            self._entries[key] = entry
+            self._evict()
+
+        self._entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return random.choice(entry[1])
+
+    async def put(self, kind: str, user: UserProfile, plan: Union[MealPlan, WorkoutPlan]) -> None:
+        key = profile_fingerprint(kind, user)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            entry = (time.monotonic() + self.ttl_seconds, [])
+            self._entries[key] = entry
+        if len(entry[1]) < self.variants_per_key:
+            entry[1].append(plan)
+        self._entries.move_to_end(key)
+        self._evict()
+        await self._store_shared(kind, key, entry[1])
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    @staticmethod
+    def _shared_key(key: Tuple) -> str:
+        return "plan_cache:" + json.dumps(key)
+
+    async def _load_shared(self, kind: str, key: Tuple) -> List[Union[MealPlan, WorkoutPlan]]:
+        payload = await shared_state.get(self._shared_key(key))
+        return _PLAN_LISTS[kind].validate_json(payload) if payload else []
+
+    async def _store_shared(self, kind: str, key: Tuple, plans: List[Union[MealPlan, WorkoutPlan]]) -> None:
+        """Merge this worker's variants into the shared entry"""
+        merged = await self._load_shared(kind, key)
+        known = {plan.id for plan in merged}
+        merged.extend(plan for plan in plans if plan.id not in known)
+        merged = merged[:self.variants_per_key]
+        await shared_state.set(
+            self._shared_key(key),
+            _PLAN_LISTS[kind].dump_json(merged).decode(),
+            ttl_seconds=self.ttl_seconds,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "size": len(self._entries), "max_size": self.max_size}
+
+
+def serve_cached(plan: Plan, user: UserProfile, plan_id: str, elapsed_time: float) -> Plan:
+    """Copy a cached plan for a new request, flagged as cached"""
+    update = {
+        "id": plan_id,
+        "user_profile": user,
+        "cached": True,
+        "response_time_seconds": elapsed_time,
+        "created_at": datetime.utcnow(),
+    }
+    if isinstance(plan, MealPlan):
+        # Profiles sharing a cache key still have their own targets
+        update["targets"] = macro_targets(user).to_model()
+    return plan.model_copy(update=update)
+
+
+plan_cache = PlanCache(
+    max_size=settings.PLAN_CACHE_SIZE,
+    ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+    variants_per_key=settings.PLAN_CACHE_VARIANTS_PER_KEY,
+)
+CACHE_HITS.add_source(lambda: {"plan": plan_cache.counters["hits"]})
+CACHE_MISSES.add_source(lambda: {"plan": plan_cache.counters["misses"]})
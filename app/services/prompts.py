@@ -0,0 +1,226 @@
+import json
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.models.schemas import MEAL_TYPES, UserProfile
+from app.services.targets import MacroTargets, macro_targets
+
+try:
+    import tiktoken
+except ImportError:  # optional: a regex estimate is used instead
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# -- Static prefixes ---------------------------------------------------------
+# Everything that does not depend on the user lives in the system message,
+# built once at import. Requests for the same plan kind then share an
+# identical prefix, which provider-side prompt caching can reuse; the
+# per-user details follow in a short user message.
+
+MEAL_PLAN_SYSTEM_PROMPT = f"""You are a professional nutritionist AI. You must respond with valid JSON data only, no other text. Your response must be a JSON array containing objects with ONLY the fields: meal, item, quantity, and unit.
+
+Based on the user profile and daily targets in the user message, output a daily meal plan in strict JSON format.
+
+Requirements:
+1. ALL FOOD ITEMS MUST BE HALAL.
+2. Provide four meal categories: BREAKFAST, LUNCH, DINNER, SNACK.
+3. For each meal, list 3–5 items.
+4. Use **exactly** this JSON schema for each item:
+
+{{
+  "meal": "BREAKFAST" | "LUNCH" | "DINNER" | "SNACK",
+  "item": "Food Name",
+  "quantity": number,
+  "unit": "g" | "ml" | "pcs"
+}}
+
+— **quantity** is the total weight/volume/count per serving.
+— **unit** must be **g** for solids, **ml** for liquids, or **pcs** for discrete items.
+
+5. Return a single JSON array of these objects—no extra text or fields.
+6. The day's totals must be within {round(settings.PLAN_CALORIE_TOLERANCE * 100)}% of each daily target.
+"""
+
+WORKOUT_PLAN_SYSTEM_PROMPT = """You are a professional workout planner AI. You must respond with valid JSON data only, no other text. Your response must be a JSON array containing objects with ONLY the fields: day, focus, and workoutPlan (which is a list of objects with name, sets, reps, and rest fields).
+
+Based on the user profile in the user message, generate a detailed workout plan with the number of days and the split it asks for.
+
+Instructions:
+- Each muscle group should be trained twice per week.
+- For each day (Day 1, Day 2, ... up to the last day), include 5-8 exercises.
+- For each day, return a JSON object with EXACTLY the following format:
+{
+  "day": "Day 1",
+  "focus": "Upper Body", // The focus of this day's workout
+  "workoutPlan": [
+    {
+      "name": "Exercise Name",
+      "sets": number,
+      "reps": string, // Can be a range like "8-12" or fixed like "10"
+      "rest": string, // Example: "60-90 sec between sets, 2 min after exercise"
+    },
+    ... (5-8 exercises)
+  ]
+}
+- Return the full response as a list of JSON objects (not narrative text).
+- Do NOT include any additional fields.
+- Ensure the workout plan is safe, effective, and appropriate for the user's profile and goals.
+"""
+
+# -- Per-request templates ---------------------------------------------------
+
+_PROFILE_TEMPLATE = """User Profile:
+- Gender: {gender}
+- Age: {age}
+- Height: {height} cm
+- Current Weight: {weight} kg
+- Target Weight: {desired_weight} kg
+- Weekly Weight Goal: {weekly_goal} kg
+- Training: {training_days} days/week at {location}
+- Diet Type: {diet}
+- Goals: {goals}, {accomplish}
+"""
+
+_TARGETS_TEMPLATE = """
+Daily Targets:
+- Calories: {calories} kcal
+- Protein: {protein_g} g
+- Carbohydrates: {carbs_g} g
+- Fat: {fat_g} g
+"""
+
+_WORKOUT_TEMPLATE = "\nCreate a {days}-day workout plan using a {split}.\n"
+
+# Workout split by training days per week
+WORKOUT_SPLITS = {
+    6: "Push (chest/shoulders/triceps), Pull (back/biceps), Legs split, repeating twice weekly",
+    5: "Push, Pull, Legs, Upper, Lower split",
+    4: "Upper, Lower split, repeating twice weekly",
+    3: "Upper, Lower, Full Body split",
+}
+DEFAULT_WORKOUT_SPLIT = "Full Body workouts"
+
+
+def workout_split(training_days: int) -> str:
+    return WORKOUT_SPLITS.get(training_days, DEFAULT_WORKOUT_SPLIT)
+
+
+def _profile_block(user: UserProfile) -> str:
+    return _PROFILE_TEMPLATE.format(
+        gender=user.gender,
+        age=user.age,
+        height=user.height,
+        weight=user.weight,
+        desired_weight=user.desiredWeight,
+        weekly_goal=user.weeklyWeightLossGoal,
+        training_days=user.trainingDay,
+        location=user.workoutLocation,
+        diet=user.dietType.upper(),
+        goals=user.reachingGoals,
+        accomplish=user.accomplish,
+    )
+
+
+def generate_meal_plan_prompt(
+    user: UserProfile,
+    variety: Optional[str] = None,
+    targets: Optional[MacroTargets] = None
+) -> str:
+    """User message for one day of meals; ``variety`` adds a requirement used to vary days of a weekly plan"""
+    if targets is None:
+        targets = macro_targets(user)
+    prompt = _profile_block(user) + _TARGETS_TEMPLATE.format(**targets._asdict())
+    if variety:
+        prompt += f"\nAlso: {variety}\n"
+    return prompt
+
+
+def generate_workout_plan_prompt(user: UserProfile) -> str:
+    """User message for a workout plan"""
+    return _profile_block(user) + _WORKOUT_TEMPLATE.format(days=user.trainingDay, split=workout_split(user.trainingDay))
+
+
+def meal_plan_messages(
+    user: UserProfile,
+    variety: Optional[str] = None,
+    targets: Optional[MacroTargets] = None
+) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": MEAL_PLAN_SYSTEM_PROMPT},
+        {"role": "user", "content": generate_meal_plan_prompt(user, variety, targets)}
+    ]
+
+
+def workout_plan_messages(user: UserProfile) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": WORKOUT_PLAN_SYSTEM_PROMPT},
+        {"role": "user", "content": generate_workout_plan_prompt(user)}
+    ]
+
+# -- Output budgets ----------------------------------------------------------
+
+_WORD_OR_SYMBOL = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    """The tokenizer for MODEL, loaded on first use; None if tiktoken is unavailable.
+
+    tiktoken downloads its BPE files the first time, so this must not run
+    at import: without network access the app would fail to start.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(settings.MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("tiktoken encoding unavailable, estimating tokens instead: %s", e)
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of ``text``: exact with tiktoken, else one per word or symbol (slightly high for JSON)"""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_WORD_OR_SYMBOL.findall(text))
+
+
+# Largest output the prompts ask for
+MAX_ITEMS_PER_MEAL = 5
+MAX_EXERCISES_PER_DAY = 8
+
+# Representative output elements, pretty-printed as models often do
+_MEAL_ITEM = json.dumps(
+    {"meal": "BREAKFAST", "item": "Greek yogurt with honey and walnuts", "quantity": 150, "unit": "g"}, indent=2)
+_EXERCISE = json.dumps(
+    {"name": "Incline Dumbbell Bench Press", "sets": 4, "reps": "8-12",
+     "rest": "60-90 sec between sets, 2 min after exercise"}, indent=2)
+_DAY = json.dumps({"day": "Day 1", "focus": "Push (chest/shoulders/triceps)", "workoutPlan": []}, indent=2)
+
+
+@lru_cache(maxsize=None)
+def _element_tokens(element: str) -> int:
+    return estimate_tokens(element)
+
+
+def _budget(expected_tokens: int) -> int:
+    sized = math.ceil(expected_tokens * settings.LLM_OUTPUT_TOKEN_HEADROOM)
+    return max(settings.LLM_MIN_OUTPUT_TOKENS, min(sized, settings.LLM_MAX_OUTPUT_TOKENS))
+
+
+def meal_plan_max_tokens(meals: int = len(MEAL_TYPES), items_per_meal: int = MAX_ITEMS_PER_MEAL) -> int:
+    """max_tokens for a day of meals, sized from the largest plan the prompt allows"""
+    return _budget(meals * items_per_meal * _element_tokens(_MEAL_ITEM))
+
+
+def workout_plan_max_tokens(days: int, exercises_per_day: int = MAX_EXERCISES_PER_DAY) -> int:
+    """max_tokens for a workout plan of ``days`` days"""
+    return _budget(max(days, 1) * (_element_tokens(_DAY) + exercises_per_day * _element_tokens(_EXERCISE)))
@@ -0,0 +1,40 @@
+from array import array
+from typing import Dict, Optional
+from app.core.config import settings
+from app.models.schemas import UserProfile
+from app.services.nutrient_vector import NUTRIENT_FIELDS, NUTRIENT_INDEX, NutrientVector
+from app.services.targets import calorie_target
+
+# RDIs that follow energy intake; vitamins, minerals and limits do not
+ENERGY_SCALED_NUTRIENTS = {"calories", "protein", "carbs", "fat", "saturated_fat", "sugar", "fiber"}
+
+
+def build_rdi_vector(rdi_values: Dict[str, float]) -> NutrientVector:
+    """Index-aligned RDI vector; nutrients without an RDI stay NaN"""
+    unknown = set(rdi_values) - set(NUTRIENT_INDEX)
+    if unknown:
+        raise ValueError(f"RDI_VALUES keys are not NutritionResponse fields: {sorted(unknown)}")
+    return NutrientVector.from_mapping(rdi_values)
+
+
+# Built once at import so every response divides by a ready-made vector
+STANDARD_RDI = build_rdi_vector(settings.RDI_VALUES)
+_ENERGY_SCALED = [field in ENERGY_SCALED_NUTRIENTS for field in NUTRIENT_FIELDS]
+
+
+def profile_rdi(user: UserProfile) -> NutrientVector:
+    """Standard RDIs with the energy-based ones scaled to the user's calorie target"""
+    ratio = calorie_target(user) / settings.RDI_REFERENCE_CALORIES
+    return NutrientVector(array("d", [
+        value * ratio if scaled else value
+        for value, scaled in zip(STANDARD_RDI.values, _ENERGY_SCALED)
+    ]))
+
+
+def rdi_for(user: Optional[UserProfile], adjust_rdi: Optional[bool] = None) -> NutrientVector:
+    """The RDI vector to report against; ``adjust_rdi`` defaults to RDI_PROFILE_ADJUSTED"""
+    if adjust_rdi is None:
+        adjust_rdi = settings.RDI_PROFILE_ADJUSTED
+    if adjust_rdi and user is not None:
+        return profile_rdi(user)
+    return STANDARD_RDI
@@ -0,0 +1,75 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from app.services.upstream_scheduler import current_priority, promote, shared_priority
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "priority", "waiters")
+
+    def __init__(self, fn: Callable[[], Awaitable[Any]]):
+        # Started with a shared priority that later callers can raise
+        self.priority = [current_priority()]
+        context = contextvars.copy_context()
+        context.run(shared_priority.set, self.priority)
+        self.task = context.run(asyncio.ensure_future, fn())
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task. Nothing is remembered once it
+    finishes, so errors are not cached: every waiter sees the exception
+    and the next call starts afresh. A cancelled caller only stops waiting;
+    the work itself is cancelled once no caller is waiting for it. The work
+    runs at the highest upstream priority among its callers, so an
+    interactive request joining a batch-started call does not wait behind
+    the batch.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.counters = {"executed": 0, "coalesced": 0, "errors": 0, "cancelled": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(fn)
+            self._calls[key] = call
+            self.counters["executed"] += 1
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+        else:
+            self.counters["coalesced"] += 1
+            promote(call.task, call.priority, current_priority())
+
+        call.waiters += 1
+        try:
+            # Shield so one cancelled caller does not cancel the others' result
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if call.task.cancelled():
+            self.counters["cancelled"] += 1
+        elif call.task.exception() is not None:
+            self.counters["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.counters["executed"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "in_flight": len(self._calls),
+            "coalesced_ratio": round(self.counters["coalesced"] / total, 4) if total else 0.0,
+        }
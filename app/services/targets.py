@@ -0,0 +1,148 @@
+import math
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+from app.models.schemas import FoodItem, PlanTargets, UserProfile
+from app.services.nutrient_vector import NutrientVector
+
+# kcal stored in one kilogram of body fat
+KCAL_PER_KG = 7700
+
+# Activity multiplier by training days per week
+ACTIVITY_FACTORS = {0: 1.2, 1: 1.375, 2: 1.375, 3: 1.55, 4: 1.55, 5: 1.55, 6: 1.725, 7: 1.725}
+
+# Lowest daily target we will suggest
+MIN_CALORIES = {"male": 1500, "female": 1200}
+
+# Mifflin-St Jeor constant by gender; the midpoint when unspecified
+BMR_OFFSETS = {"male": 5, "female": -161}
+DEFAULT_BMR_OFFSET = -78
+
+# Protein grams per kg of body weight while losing, keeping or gaining weight
+PROTEIN_G_PER_KG = {-1: 1.8, 0: 1.4, 1: 1.6}
+# Share of calories from fat; carbohydrates make up the rest
+FAT_CALORIE_SHARE = 0.28
+KCAL_PER_GRAM = {"protein": 4, "carbs": 4, "fat": 9}
+
+# PlanTargets fields and the nutrient totals checked against them
+TARGET_NUTRIENTS = {"calories": "calories", "protein_g": "protein", "carbs_g": "carbs", "fat_g": "fat"}
+
+# Portions are rounded to these steps after rescaling
+PORTION_STEPS = {"g": 5.0, "ml": 5.0, "pcs": 0.5, "serving": 0.5}
+
+
+class MacroTargets(NamedTuple):
+    calories: int
+    protein_g: int
+    carbs_g: int
+    fat_g: int
+
+    def to_model(self) -> PlanTargets:
+        return PlanTargets(**self._asdict())
+
+
+def basal_metabolic_rate(user: UserProfile) -> float:
+    """Mifflin-St Jeor BMR in kcal/day"""
+    base = 10 * user.weight + 6.25 * user.height - 5 * user.age
+    return base + BMR_OFFSETS.get(user.gender.lower(), DEFAULT_BMR_OFFSET)
+
+
+def compute_targets(users: Sequence[UserProfile]) -> List[MacroTargets]:
+    """Daily calorie and macro targets for many profiles in one vectorized pass.
+
+    Calories are maintenance (TDEE) adjusted toward the desired weight by
+    the weekly goal, never below MIN_CALORIES. Protein follows body weight,
+    fat a fixed share of calories, and carbohydrates the remainder.
+    """
+    if not users:
+        return []
+    genders = [user.gender.lower() for user in users]
+    weight = np.array([user.weight for user in users], dtype=np.float64)
+    height = np.array([user.height for user in users], dtype=np.float64)
+    age = np.array([user.age for user in users], dtype=np.float64)
+    desired = np.array([user.desiredWeight for user in users], dtype=np.float64)
+    weekly_goal = np.array([user.weeklyWeightLossGoal for user in users], dtype=np.float64)
+    activity = np.array([ACTIVITY_FACTORS.get(user.trainingDay, 1.2) for user in users])
+    offset = np.array([BMR_OFFSETS.get(gender, DEFAULT_BMR_OFFSET) for gender in genders], dtype=np.float64)
+    floor = np.array([MIN_CALORIES.get(gender, min(MIN_CALORIES.values())) for gender in genders], dtype=np.float64)
+
+    bmr = 10 * weight + 6.25 * height - 5 * age + offset
+    direction = np.sign(desired - weight)
+    tdee = bmr * activity + direction * weekly_goal * KCAL_PER_KG / 7
+    calories = np.round(np.maximum(tdee, floor))
+
+    protein_per_kg = np.select([direction < 0, direction > 0], [PROTEIN_G_PER_KG[-1], PROTEIN_G_PER_KG[1]], PROTEIN_G_PER_KG[0])
+    protein = np.round(weight * protein_per_kg)
+    fat = np.round(calories * FAT_CALORIE_SHARE / KCAL_PER_GRAM["fat"])
+    carbs = np.maximum(
+        np.round((calories - protein * KCAL_PER_GRAM["protein"] - fat * KCAL_PER_GRAM["fat"]) / KCAL_PER_GRAM["carbs"]), 0
+    )
+
+    return [
+        MacroTargets(int(row[0]), int(row[1]), int(row[2]), int(row[3]))
+        for row in np.column_stack((calories, protein, carbs, fat)).tolist()
+    ]
+
+
+def macro_targets(user: UserProfile) -> MacroTargets:
+    return compute_targets([user])[0]
+
+
+def calorie_target(user: UserProfile) -> int:
+    """Daily calorie target: maintenance (TDEE) adjusted toward the desired weight"""
+    return macro_targets(user).calories
+
+
+def _round_portion(quantity: float, unit: str) -> float:
+    step = PORTION_STEPS.get(unit, 0.5)
+    return max(step, round(quantity / step) * step)
+
+
+def fit_portions(
+    items: List[FoodItem],
+    nutrition: List[Optional[NutrientVector]],
+    target_calories: int
+) -> Tuple[List[FoodItem], List[Optional[NutrientVector]], float, Optional[float]]:
+    """Rescale every portion when the plan's calories miss the target.
+
+    Returns the items and their nutrition (rescaled, or unchanged within
+    PLAN_CALORIE_TOLERANCE), the calories as planned, and the factor
+    applied (None if nothing was rescaled). Portions are rounded to
+    PORTION_STEPS and each item's nutrition is scaled by its actual change.
+    """
+    planned = sum(vector["calories"] for vector in nutrition
+                  if vector is not None and not math.isnan(vector["calories"]))
+    if planned <= 0:
+        return items, nutrition, planned, None
+    factor = target_calories / planned
+    if abs(factor - 1) <= settings.PLAN_CALORIE_TOLERANCE:
+        return items, nutrition, planned, None
+    factor = min(max(factor, settings.PLAN_RESCALE_MIN_FACTOR), settings.PLAN_RESCALE_MAX_FACTOR)
+
+    scaled_items: List[FoodItem] = []
+    scaled_nutrition: List[Optional[NutrientVector]] = []
+    for item, vector in zip(items, nutrition):
+        quantity = _round_portion(item.quantity * factor, item.unit)
+        change = quantity / item.quantity
+        scaled_items.append(item.model_copy(update={
+            "quantity": quantity,
+            "serving_size": item.serving_size * change if item.serving_size is not None else None,
+        }))
+        scaled_nutrition.append(vector.scaled(change) if vector is not None else None)
+    return scaled_items, scaled_nutrition, planned, round(factor, 3)
+
+
+def missed_targets(nutrition: List[Optional[NutrientVector]], targets: PlanTargets) -> List[str]:
+    """Targets (calories, protein_g, carbs_g, fat_g) the plan's totals miss by more than PLAN_CALORIE_TOLERANCE.
+
+    Rescaling fixes the calorie total but keeps the plan's macro ratios,
+    so macros can still miss; those are reported rather than corrected.
+    """
+    total = NutrientVector.total(vector for vector in nutrition if vector is not None)
+    missed = []
+    for target, nutrient in TARGET_NUTRIENTS.items():
+        goal = getattr(targets, target)
+        amount = total[nutrient] if total is not None else math.nan
+        if goal > 0 and not math.isnan(amount) and abs(amount / goal - 1) > settings.PLAN_CALORIE_TOLERANCE:
+            missed.append(target)
+    return missed
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Lower value runs first
+INTERACTIVE = 0
+BATCH = 1
+
+# Callers doing background/bulk work set this to BATCH so interactive
+# requests are admitted ahead of them
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+# Set for work shared by several callers (see SingleFlight): a one-element
+# list holding the highest priority among them. Copies of a context share
+# the list, so raising it reaches the work and any tasks it started.
+shared_priority: ContextVar[Optional[List[int]]] = ContextVar("shared_priority", default=None)
+
+_schedulers: List["UpstreamScheduler"] = []
+
+
+def current_priority() -> int:
+    """This task's priority, raised by any caller sharing its work"""
+    priority = request_priority.get()
+    shared = shared_priority.get()
+    return min(priority, shared[0]) if shared is not None else priority
+
+
+def promote(task: asyncio.Task, shared: List[int], priority: int) -> None:
+    """Run ``task``'s upstream calls at ``priority`` from now on, if that is higher.
+
+    ``shared`` is the ``shared_priority`` list the task was started with.
+    Used when an interactive caller starts waiting on work that a batch
+    caller started, including a call already queued for admission.
+    """
+    if priority >= shared[0]:
+        return
+    shared[0] = priority
+    for scheduler in _schedulers:
+        scheduler._promote(task, priority)
+
+
+class RetryableUpstreamError(Exception):
+    """Raised for upstream responses worth retrying (429, 5xx, connection errors)"""
+
+    def __init__(self, status: int, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(message or f"Upstream returned {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class UpstreamScheduler:
+    """Admission control for calls to one upstream API.
+
+    Calls are admitted by priority under a global concurrency cap, each
+    admitted call takes a token from a token bucket, and retryable failures
+    are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, rate_per_second: float, burst: int,
+                 max_retries: int, backoff_base: float, backoff_max: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._active = 0
+        # (priority, arrival order, waiter, task waiting)
+        self._waiters: List[Tuple[int, int, asyncio.Future, Optional[asyncio.Task]]] = []
+        self._sequence = itertools.count()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+
+        self.counters = {
+            "admitted": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+        }
+        self._wait_totals = {INTERACTIVE: 0.0, BATCH: 0.0}
+        self._wait_counts = {INTERACTIVE: 0, BATCH: 0}
+        self._wait_max = 0.0
+        _schedulers.append(self)
+
+    # -- concurrency slots -------------------------------------------------
+
+    async def _acquire(self, priority: int) -> None:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter, asyncio.current_task()))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us just as we were cancelled
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        while self._waiters:
+            _, _, waiter, _ = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+                return
+
+    def _promote(self, task: asyncio.Task, priority: int) -> None:
+        promoted = False
+        for index, (queued, sequence, waiter, owner) in enumerate(self._waiters):
+            if owner is task and priority < queued:
+                self._waiters[index] = (priority, sequence, waiter, owner)
+                promoted = True
+        if promoted:
+            heapq.heapify(self._waiters)
+
+    # -- token bucket ------------------------------------------------------
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate_per_second)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+    # -- public API --------------------------------------------------------
+
+    def _backoff(self, attempt: int, error: RetryableUpstreamError) -> float:
+        # Full jitter keeps retries from a burst from landing together
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if error.retry_after is not None:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    async def run(self, call: Callable[[], Awaitable[T]], priority: Optional[int] = None) -> T:
+        """Run ``call`` once admitted, retrying on ``RetryableUpstreamError``"""
+        for attempt in range(self.max_retries + 1):
+            # Read per attempt: the caller may have been promoted meanwhile
+            current = current_priority() if priority is None else priority
+            queued_at = time.monotonic()
+            await self._acquire(current)
+            try:
+                await self._take_token()
+                self._record_wait(current, time.monotonic() - queued_at)
+                self.counters["admitted"] += 1
+                return await call()
+            except RetryableUpstreamError as e:
+                if e.status == 429:
+                    self.counters["rate_limited"] += 1
+                if attempt == self.max_retries:
+                    self.counters["failures"] += 1
+                    raise
+                self.counters["retries"] += 1
+                delay = self._backoff(attempt, e)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def _record_wait(self, priority: int, waited: float) -> None:
+        self._wait_totals[priority] = self._wait_totals.get(priority, 0.0) + waited
+        self._wait_counts[priority] = self._wait_counts.get(priority, 0) + 1
+        self._wait_max = max(self._wait_max, waited)
+
+    def stats(self) -> Dict[str, float]:
+        def average(priority: int) -> float:
+            count = self._wait_counts.get(priority, 0)
+            return round(self._wait_totals.get(priority, 0.0) / count, 4) if count else 0.0
+
+        return {
+            **self.counters,
+            "in_flight": self._active,
+            "queue_depth": sum(1 for _, _, waiter, _ in self._waiters if not waiter.done()),
+            "max_concurrency": self.max_concurrency,
+            "avg_wait_seconds_interactive": average(INTERACTIVE),
+            "avg_wait_seconds_batch": average(BATCH),
+            "max_wait_seconds": round(self._wait_max, 4),
+        }
+
+
+fatsecret_scheduler = UpstreamScheduler(
+    name="fatsecret",
+    max_concurrency=settings.FAT_SECRET_MAX_CONCURRENCY,
+    rate_per_second=settings.FAT_SECRET_RATE_LIMIT_PER_SECOND,
+    burst=settings.FAT_SECRET_RATE_LIMIT_BURST,
+    max_retries=settings.UPSTREAM_MAX_RETRIES,
+    backoff_base=settings.UPSTREAM_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.UPSTREAM_BACKOFF_MAX_SECONDS,
+)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.models.schemas import UserProfile
+from app.models.weekly_response import DailyMealPlan, WeeklyMealPlan
+from app.services.combined_service import build_foods_nutrition, fit_to_targets, to_responses
+from app.services.nutrition_cache import normalize_food_name
+from app.services.nutrition_service import (
+    aggregate_nutrition,
+    finish_in_background,
+    get_food_nutrients,
+    resolve_foods_nutrition
+)
+from app.services.nutrient_vector import NutrientVector
+from app.services.openAI_services import get_meal_plan
+from app.services.rdi import rdi_for
+from app.services.targets import macro_targets
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Main protein and carbohydrate for each day of the week. Days are generated
+# concurrently, so instead of reading each other's output every day is told
+# its own theme and the themes of the other days.
+VARIETY_ROTATION = [
+    ("chicken", "oats"),
+    ("salmon", "brown rice"),
+    ("beef", "whole-wheat pasta"),
+    ("eggs", "quinoa"),
+    ("lentils and chickpeas", "sweet potato"),
+    ("turkey", "bulgur"),
+    ("white fish", "couscous"),
+]
+PLANT_ROTATION = [
+    ("tofu", "oats"),
+    ("lentils", "brown rice"),
+    ("chickpeas", "quinoa"),
+    ("black beans", "whole-wheat pasta"),
+    ("tempeh", "sweet potato"),
+    ("edamame", "bulgur"),
+    ("kidney beans", "couscous"),
+]
+PLANT_DIETS = ("vegan", "vegetarian", "plant")
+
+
+def variety_constraints(user: UserProfile, days: int) -> List[str]:
+    """One prompt requirement per day that steers it away from the other days' main foods"""
+    diet = user.dietType.lower()
+    rotation = PLANT_ROTATION if any(word in diet for word in PLANT_DIETS) else VARIETY_ROTATION
+    themes = [rotation[day % len(rotation)] for day in range(days)]
+
+    constraints = []
+    for day, (protein, carb) in enumerate(themes):
+        constraint = (
+            f"This is {DAY_NAMES[day]} of a {days}-day plan: build LUNCH and DINNER around {protein} "
+            f"and use {carb} as the main carbohydrate."
+        )
+        others = [other for index, (other, _) in enumerate(themes) if index != day and other != protein]
+        if others:
+            constraint += f" Other days are built around {', '.join(others)}; do not use those as today's main protein."
+        constraints.append(constraint)
+    return constraints
+
+
+async def get_weekly_meal_plan(
+    user: UserProfile,
+    days: int = 7,
+    include_nutrition: bool = True,
+    adjust_rdi: Optional[bool] = None
+) -> WeeklyMealPlan:
+    """Generate ``days`` daily meal plans concurrently, with one nutrition pass for the week.
+
+    Days run in parallel up to WEEKLY_PLAN_MAX_PARALLEL_DAYS, so wall time
+    is close to a single-day plan. Each day's lookups start as soon as that
+    day is generated, and a food that appears on several days is looked up
+    once. Nutrition follows the request budget like single-day plans, and
+    each day is held to the profile's calorie target.
+    """
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(settings.WEEKLY_PLAN_MAX_PARALLEL_DAYS)
+    lookups: Dict[str, asyncio.Future] = {}
+    # Every day has the same targets
+    targets = macro_targets(user)
+
+    async def plan_day(variety: str):
+        async with semaphore:
+            meal_plan = await get_meal_plan(user, variety=variety, targets=targets)
+        if include_nutrition:
+            for item in meal_plan.items:
+                key = normalize_food_name(item.name)
+                if key not in lookups:
+                    lookups[key] = asyncio.ensure_future(get_food_nutrients(item.name))
+        return meal_plan
+
+    day_tasks = [asyncio.ensure_future(plan_day(variety)) for variety in variety_constraints(user, days)]
+    try:
+        meal_plans = await asyncio.gather(*day_tasks)
+    except Exception:
+        # One failed day fails the week; stop spending LLM calls on the others
+        for task in day_tasks:
+            task.cancel()
+        # Lookups already started for the other days still fill the cache
+        finish_in_background(lookup for lookup in lookups.values() if not lookup.done())
+        raise
+
+    daily = [
+        DailyMealPlan(day=index + 1, day_name=DAY_NAMES[index], meal_plan=meal_plan)
+        for index, meal_plan in enumerate(meal_plans)
+    ]
+    weekly = WeeklyMealPlan(
+        id=str(uuid.uuid4()),
+        user_profile=user,
+        days=daily,
+        unique_foods=len(lookups),
+        response_time_seconds=0.0
+    )
+    if include_nutrition:
+        try:
+            await add_weekly_nutrition(weekly, lookups, rdi_for(user, adjust_rdi))
+        except Exception as e:
+            logger.exception("Error processing weekly plan nutrition: %s", e)
+
+    weekly.response_time_seconds = round(time.time() - start_time, 2)
+    return weekly
+
+
+async def add_weekly_nutrition(weekly: WeeklyMealPlan, lookups: Dict[str, asyncio.Future], rdi: NutrientVector) -> None:
+    """Fill per-day and weekly nutrition from the week's shared lookups"""
+    results = await asyncio.gather(*[resolve_foods_nutrition(day.meal_plan.items, lookups) for day in weekly.days])
+
+    day_totals = []
+    for day, nutrition_results in zip(weekly.days, results):
+        items = day.meal_plan.items
+        pending = {index for index, item in enumerate(items) if not lookups[normalize_food_name(item.name)].done()}
+        if not pending:
+            day.meal_plan, nutrition_results = fit_to_targets(day.meal_plan, nutrition_results)
+            items = day.meal_plan.items
+        day.foods_nutrition = build_foods_nutrition(items, to_responses(nutrition_results, rdi), pending)
+        total = aggregate_nutrition(nutrition_results)
+        day.total_nutrition = total.to_response(rdi) if total is not None else None
+        if total is not None:
+            day_totals.append(total)
+        weekly.nutrition_complete = weekly.nutrition_complete and not pending
+
+    week_total = NutrientVector.total(day_totals)
+    if week_total is not None:
+        days = len(weekly.days)
+        weekly.weekly_nutrition = week_total.to_response(rdi.scaled(days))
+        weekly.average_daily_nutrition = week_total.scaled(1 / days).to_response(rdi)
+    if not weekly.nutrition_complete:
+        logger.info("Request budget ran out with weekly plan %s nutrition incomplete", weekly.id)
@@ -0,0 +1,78 @@
+"""Load test: N concurrent POST /meal-plans against a mocked LLM.
+
+With a non-blocking LLM client the wall-clock time for N concurrent
+requests should be close to the latency of a single call.
+
+    python -m benchmarks.concurrent_meal_plans --concurrency 20 --latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import aiohttp
+
+from benchmarks.mock_servers import create_llm_app, serve_in_thread
+
+PROFILE = {
+    "gender": "male",
+    "age": 30,
+    "height": 175,
+    "weight": 80.5,
+    "desiredWeight": 75.0,
+    "weeklyWeightLossGoal": 0.5,
+    "trainingDay": 3,
+    "workoutLocation": "gym",
+    "dietType": "balanced",
+    "reachingGoals": "weight_loss",
+    "accomplish": "healthy lifestyle",
+}
+
+
+async def main(concurrency: int, latency: float, port: int) -> None:
+    mock_url = serve_in_thread(create_llm_app(latency))
+    os.environ.setdefault("API_KEY", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+    os.environ["API_URL"] = f"{mock_url}/v1/chat/completions"
+
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"http://127.0.0.1:{port}/api/v1/meal-plans"
+    async with aiohttp.ClientSession() as session:
+        async def one_call():
+            async with session.post(url, json=PROFILE) as response:
+                await response.read()
+                return response.status
+
+        start = time.perf_counter()
+        await one_call()
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*[one_call() for _ in range(concurrency)])
+        total = time.perf_counter() - start
+
+    server.should_exit = True
+    await server_task
+
+    print(f"single call:              {single:.2f}s")
+    print(f"{concurrency} concurrent calls:     {total:.2f}s")
+    print(f"serial equivalent:        {single * concurrency:.2f}s")
+    print(f"speed-up vs serial:       {single * concurrency / total:.1f}x")
+    print(f"non-200 responses:        {sum(1 for s in statuses if s != 200)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.latency, args.port))
@@ -0,0 +1,103 @@
+"""Benchmark the pooled FatSecret client against per-call sessions.
+
+The legacy path reproduces the original behavior: a new aiohttp session
+(and therefore TCP connection) per lookup and an unlocked token cache, so
+a burst that arrives with no valid token fires one token request each.
+
+    python -m benchmarks.fatsecret_client --lookups 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import aiohttp
+
+from benchmarks.mock_servers import create_fatsecret_app, start_server
+
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+# Count a token request on every run instead of reusing one from an earlier run
+os.environ.setdefault("SHARED_STATE_PATH", "")
+
+from app.core.config import settings  # noqa: E402
+from app.services.fatsecret_client import FatSecretClient  # noqa: E402
+from app.services.upstream_scheduler import fatsecret_scheduler  # noqa: E402
+
+
+async def legacy_lookups(base_url: str, names, concurrency: int) -> None:
+    token_data = {"access_token": None}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get_token():
+        if token_data["access_token"]:
+            return token_data["access_token"]
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{base_url}/connect/token", data={}) as response:
+                token_data["access_token"] = (await response.json())["access_token"]
+                return token_data["access_token"]
+
+    async def lookup(name):
+        async with semaphore:
+            token = await get_token()
+            headers = {"Authorization": f"Bearer {token}"}
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{base_url}/rest/server.api", headers=headers,
+                                       params={"method": "foods.search", "search_expression": name}) as r:
+                    food_id = (await r.json())["foods"]["food"][0]["food_id"]
+                async with session.get(f"{base_url}/rest/server.api", headers=headers,
+                                       params={"method": "food.get.v2", "food_id": food_id}) as r:
+                    await r.json()
+
+    await asyncio.gather(*[lookup(name) for name in names])
+
+
+async def client_lookups(names, concurrency: int) -> None:
+    client = FatSecretClient()
+    await client.start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(name):
+        async with semaphore:
+            search = await client.search_foods(name)
+            await client.get_food(search["foods"]["food"][0]["food_id"])
+
+    try:
+        await asyncio.gather(*[lookup(name) for name in names])
+    finally:
+        await client.close()
+
+
+async def run(label, app, coro_factory):
+    runner, base_url = await start_server(app)
+    settings.FAT_SECRET_BASEURL = f"{base_url}/rest/server.api"
+    settings.FAT_SECRET_AUTH_URL = f"{base_url}/connect/token"
+
+    start = time.perf_counter()
+    await coro_factory(base_url)
+    elapsed = time.perf_counter() - start
+    stats = app["stats"]
+    await runner.cleanup()
+    print(f"{label:<8} {elapsed:7.2f}s  token requests: {stats['token_requests']:4d}  "
+          f"tcp connections: {len(stats['connections']):4d}")
+
+
+async def main(lookups: int, concurrency: int, latency: float) -> None:
+    # Measure connection reuse only; the legacy path has no rate limit either
+    fatsecret_scheduler.max_concurrency = concurrency
+    fatsecret_scheduler.rate_per_second = fatsecret_scheduler.burst = 1_000_000
+    names = [f"food {i}" for i in range(lookups)]
+    await run("legacy", create_fatsecret_app(latency=latency),
+              lambda base_url: legacy_lookups(base_url, names, concurrency))
+    await run("pooled", create_fatsecret_app(latency=latency),
+              lambda base_url: client_lookups(names, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.lookups, args.concurrency, args.latency))
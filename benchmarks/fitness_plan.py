@@ -0,0 +1,80 @@
+"""Two calls (/meal-plans then /workout-plans) vs one /fitness-plans call.
+
+Clients used to request the meal plan with nutrition and then the
+workout plan, paying for two LLM round trips back to back. /fitness-plans
+runs both generations concurrently.
+
+    python -m benchmarks.fitness_plan --latency 2.0 --fatsecret-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import aiohttp
+
+from benchmarks.concurrent_meal_plans import PROFILE
+from benchmarks.mock_servers import create_fatsecret_app, create_llm_app, serve_in_thread
+
+
+async def main(latency: float, fatsecret_latency: float, runs: int, port: int) -> None:
+    llm_url = serve_in_thread(create_llm_app(latency))
+    fatsecret_url = serve_in_thread(create_fatsecret_app(latency=fatsecret_latency))
+    os.environ.setdefault("API_KEY", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+    os.environ["API_URL"] = f"{llm_url}/v1/chat/completions"
+    os.environ["FAT_SECRET_BASEURL"] = f"{fatsecret_url}/rest/server.api"
+    os.environ["FAT_SECRET_AUTH_URL"] = f"{fatsecret_url}/connect/token"
+    # Every run should pay for its generations and lookups
+    os.environ["NUTRITION_CACHE_PATH"] = ""
+    os.environ["NUTRITION_CACHE_TTL_SECONDS"] = "0"
+    os.environ["PLAN_CACHE_ENABLED"] = "false"
+
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}/api/v1"
+    timings = {"two calls": [], "combined": []}
+    async with aiohttp.ClientSession() as session:
+        for _ in range(runs):
+            start = time.perf_counter()
+            async with session.post(f"{base_url}/meal-plans", json=PROFILE, params={"include_nutrition": "true"}) as response:
+                meal = await response.json()
+            async with session.post(f"{base_url}/workout-plans", json=PROFILE) as response:
+                workout = await response.json()
+            timings["two calls"].append(time.perf_counter() - start)
+            assert meal["foods_nutrition"] and workout["days"], (meal, workout)
+
+            start = time.perf_counter()
+            async with session.post(f"{base_url}/fitness-plans", json=PROFILE) as response:
+                combined = await response.json()
+            timings["combined"].append(time.perf_counter() - start)
+            assert combined["meal_plan"]["foods_nutrition"] and combined["workout_plan"]["days"], combined
+
+        # Both plans are stored and point at each other
+        async with session.get(f"{base_url}/workout-plans/{combined['workout_plan']['id']}") as response:
+            stored = await response.json()
+        assert stored["meal_plan_id"] == combined["meal_plan"]["meal_plan"]["id"], stored
+
+    server.should_exit = True
+    await server_task
+
+    print(f"mock LLM {latency:.2f}s, mock FatSecret {fatsecret_latency:.2f}s per call, {runs} runs")
+    for label, values in timings.items():
+        print(f"{label:<9} mean {sum(values) / len(values):.2f}s  min {min(values):.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--fatsecret-latency", type=float, default=0.3)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.fatsecret_latency, args.runs, args.port))
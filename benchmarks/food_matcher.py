@@ -0,0 +1,116 @@
+"""Benchmark the trigram food-name index at catalog scale.
+
+Builds an index over synthetic FatSecret-style names and reports build
+time, index memory and lookup latency for exact names, reworded names
+(plural/punctuation/word order) and names with typos.
+
+    python -m benchmarks.food_matcher --names 100000 --queries 2000
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+
+from app.services.food_matcher import FoodNameIndex  # noqa: E402
+
+FOODS = [
+    "chicken breast", "chicken thigh", "turkey breast", "ground beef", "salmon fillet", "tuna", "cod",
+    "shrimp", "tofu", "egg", "egg white", "white rice", "brown rice", "basmati rice", "quinoa", "oats",
+    "pasta", "bread", "tortilla", "sweet potato", "potato", "banana", "apple", "orange", "strawberries",
+    "blueberries", "mango", "grapes", "avocado", "broccoli", "spinach", "carrot", "tomato", "cucumber",
+    "lettuce", "bell pepper", "onion", "green beans", "peas", "lentils", "chickpeas", "black beans",
+    "hummus", "greek yogurt", "milk", "cottage cheese", "cheddar cheese", "almonds", "walnuts",
+    "peanut butter", "olive oil", "honey", "granola", "dark chocolate", "orange juice",
+]
+STYLES = ["", "grilled", "baked", "roasted", "steamed", "raw", "boiled", "fried", "smoked", "organic",
+          "low fat", "whole", "sliced", "diced", "canned", "frozen", "fresh", "lightly salted"]
+BRANDS = ["", "Acme", "Farmhouse", "Golden Valley", "Green Leaf", "Harvest Moon", "Sunrise", "Blue Ridge",
+          "Kirkland", "Trader's", "Pure Gold", "Nature's Best"]
+EXTRAS = ["", "with skin", "no salt added", "in water", "in olive oil", "family size", "snack pack",
+          "original", "light", "unsweetened", "extra firm", "seasoned"]
+
+
+def catalog(size: int, rng: random.Random):
+    seen = set()
+    while len(seen) < size:
+        parts = [rng.choice(BRANDS), rng.choice(STYLES), rng.choice(FOODS), rng.choice(EXTRAS)]
+        name = " ".join(part for part in parts if part)
+        if len(seen) >= len(FOODS) * len(STYLES) * len(BRANDS) * len(EXTRAS) // 2:
+            name = f"{name} {len(seen)}"
+        seen.add(name)
+    return [(name, str(food_id)) for food_id, name in enumerate(sorted(seen))]
+
+
+def typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + name[i + 1:]
+
+
+def reword(name: str) -> str:
+    words = name.split()
+    return ", ".join(reversed(words)) + "s"
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def time_queries(index: FoodNameIndex, queries, expected) -> dict:
+    latencies = []
+    correct = 0
+    for query, food_id in zip(queries, expected):
+        start = time.perf_counter()
+        match = index.match(query, 0.8)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        correct += match is not None and match.food_id == food_id
+    return {"p50_us": percentile(latencies, 0.5), "p99_us": percentile(latencies, 0.99),
+            "matched": correct / len(queries)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    entries = catalog(args.names, rng)
+
+    start = time.perf_counter()
+    index = FoodNameIndex()
+    index.build(entries)
+    build_seconds = time.perf_counter() - start
+
+    # Tracing slows the build down, so memory is measured on a second build
+    tracemalloc.start()
+    traced = FoodNameIndex()
+    traced.build(entries)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    sampled = rng.sample(entries, args.queries)
+    sample = [name for name, _ in sampled]
+    expected = [food_id for _, food_id in sampled]
+    print(f"names indexed:     {len(index)}")
+    print(f"build time:        {build_seconds:.2f}s")
+    print(f"index memory:      {current / 1e6:.1f} MB total ({index.memory_bytes() / 1e6:.1f} MB postings), "
+          f"{peak / 1e6:.1f} MB peak during build")
+    for label, queries in [
+        ("exact", sample),
+        ("reworded", [reword(name) for name in sample]),
+        ("typo", [typo(name, rng) for name in sample]),
+    ]:
+        timings = time_queries(index, queries, expected)
+        print(f"{label + ' lookup:':<19}p50 {timings['p50_us']:.0f}us  p99 {timings['p99_us']:.0f}us  "
+              f"correct {timings['matched']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
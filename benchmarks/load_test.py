@@ -0,0 +1,211 @@
+"""Offline load test of the main endpoints against mock LLM and FatSecret servers.
+
+Each scenario sends ``--requests`` requests with ``--concurrency`` in
+flight and reports throughput and p50/p95/p99 latency. Save a run as a
+baseline, then compare later runs against it (exit status 1 on a
+regression beyond ``--tolerance``):
+
+    python -m benchmarks.load_test --save-baseline benchmarks/results/baseline.json
+    python -m benchmarks.load_test --compare benchmarks/results/baseline.json
+
+Upstream behaviour is configurable, e.g. a long-tailed LLM that fails 2%
+of calls and larger FatSecret payloads:
+
+    python -m benchmarks.load_test --llm-latency lognormal:1.0,0.4 --llm-error-rate 0.02 \\
+        --fatsecret-latency uniform:0.05,0.3 --search-results 20 --meal-items 30
+
+Caches that would hide upstream cost (plan cache, nutrition cache, learned
+food aliases) are disabled, so every request does the full work.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from benchmarks.concurrent_meal_plans import PROFILE
+from benchmarks.mock_servers import (
+    SAMPLE_MEAL_PLAN,
+    create_fatsecret_app,
+    create_llm_app,
+    serve_in_thread,
+)
+
+FOOD_ITEMS = [
+    {"meal": item["meal"], "name": item["item"], "quantity": item["quantity"], "unit": item["unit"]}
+    for item in SAMPLE_MEAL_PLAN
+]
+
+# name: (path, query params, JSON body)
+SCENARIOS = {
+    "meal_plan": ("/meal-plans", {}, PROFILE),
+    "meal_plan_nutrition": ("/meal-plans", {"include_nutrition": "true"}, PROFILE),
+    "workout_plan": ("/workout-plans", {}, PROFILE),
+    "calculate_nutrition": ("/calculate-nutrition", {}, FOOD_ITEMS),
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 < pct <= 100)"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+async def run_scenario(session: aiohttp.ClientSession, base_url: str, name: str,
+                       requests: int, concurrency: int) -> Dict[str, float]:
+    path, params, body = SCENARIOS[name]
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                async with session.post(base_url + path, params=params, json=body) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, requests))])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4),
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Human-readable regressions of ``current`` against ``baseline``"""
+    regressions = []
+    if current["config"] != baseline["config"]:
+        print("warning: run configuration differs from the baseline; comparison may not be meaningful")
+    for name, result in current["scenarios"].items():
+        reference = baseline["scenarios"].get(name)
+        if reference is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {reference[metric]} -> {result[metric]}")
+        if result["throughput_rps"] < reference["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {reference['throughput_rps']} -> {result['throughput_rps']}")
+        if result["error_rate"] > reference["error_rate"] + tolerance / 10:
+            regressions.append(f"{name}: error_rate {reference['error_rate']} -> {result['error_rate']}")
+    return regressions
+
+
+def print_results(results: Dict, baseline: Optional[Dict]) -> None:
+    print(f"{'scenario':<22}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, result in results["scenarios"].items():
+        print(f"{name:<22}{result['throughput_rps']:>9.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}")
+        reference = (baseline or {}).get("scenarios", {}).get(name)
+        if reference:
+            print(f"{'  baseline':<22}{reference['throughput_rps']:>9.1f}{reference['p50_ms']:>10.1f}"
+                  f"{reference['p95_ms']:>10.1f}{reference['p99_ms']:>10.1f}{reference['errors']:>8}")
+
+
+async def main(args: argparse.Namespace) -> int:
+    llm_url = serve_in_thread(create_llm_app(
+        args.llm_latency, error_rate=args.llm_error_rate, meal_items=args.meal_items, seed=args.seed))
+    fatsecret_url = serve_in_thread(create_fatsecret_app(
+        latency=args.fatsecret_latency, error_rate=args.fatsecret_error_rate,
+        search_results=args.search_results, servings=args.servings, seed=args.seed))
+    os.environ.setdefault("API_KEY", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+    os.environ["API_URL"] = f"{llm_url}/v1/chat/completions"
+    os.environ["FAT_SECRET_BASEURL"] = f"{fatsecret_url}/rest/server.api"
+    os.environ["FAT_SECRET_AUTH_URL"] = f"{fatsecret_url}/connect/token"
+    os.environ["PLAN_CACHE_ENABLED"] = "false"
+    os.environ["PLAN_STORE_BACKEND"] = "memory"
+    os.environ["NUTRITION_CACHE_PATH"] = ""
+    os.environ["NUTRITION_CACHE_TTL_SECONDS"] = "0"
+    os.environ["FOOD_ALIAS_PATH"] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}/api/v1"
+    scenarios = args.scenarios or list(SCENARIOS)
+    results = {"config": {key: value for key, value in vars(args).items()
+                          if key not in ("save_baseline", "compare", "tolerance", "port", "scenarios")},
+               "scenarios": {}}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for name in scenarios:
+            # Warm up connections and the FatSecret token outside the measurement
+            await run_scenario(session, base_url, name, args.warmup, args.concurrency)
+            results["scenarios"][name] = await run_scenario(
+                session, base_url, name, args.requests, args.concurrency)
+
+    server.should_exit = True
+    await server_task
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(f"{args.requests} requests per scenario, concurrency {args.concurrency}, "
+          f"LLM {args.llm_latency}, FatSecret {args.fatsecret_latency}")
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), help="default: all")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--llm-latency", default="lognormal:0.5,0.3",
+                        help="seconds, or fixed:/uniform:/normal:/lognormal: distribution")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--meal-items", type=int, default=11, help="items in each mock meal plan")
+    parser.add_argument("--fatsecret-latency", default="lognormal:0.08,0.3")
+    parser.add_argument("--fatsecret-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-results", type=int, default=1, help="foods per mock foods.search response")
+    parser.add_argument("--servings", type=int, default=1, help="servings per mock food.get response")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (default 20%%)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
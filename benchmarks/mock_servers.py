@@ -0,0 +1,233 @@
+"""Local stand-ins for the upstream APIs used by the benchmarks.
+
+Nothing here talks to the network beyond localhost, so benchmarks are
+repeatable and free to run.
+"""
+import asyncio
+import json
+import random
+import threading
+import zlib
+from typing import Callable, Optional, Union
+from aiohttp import web
+
+SAMPLE_MEAL_PLAN = [
+    {"meal": "BREAKFAST", "item": "Boiled eggs", "quantity": 2, "unit": "pcs"},
+    {"meal": "BREAKFAST", "item": "Oatmeal", "quantity": 80, "unit": "g"},
+    {"meal": "BREAKFAST", "item": "Banana", "quantity": 1, "unit": "pcs"},
+    {"meal": "LUNCH", "item": "Grilled chicken breast", "quantity": 150, "unit": "g"},
+    {"meal": "LUNCH", "item": "Brown rice", "quantity": 120, "unit": "g"},
+    {"meal": "LUNCH", "item": "Steamed broccoli", "quantity": 100, "unit": "g"},
+    {"meal": "DINNER", "item": "Baked salmon", "quantity": 140, "unit": "g"},
+    {"meal": "DINNER", "item": "Sweet potato", "quantity": 150, "unit": "g"},
+    {"meal": "DINNER", "item": "Mixed salad", "quantity": 100, "unit": "g"},
+    {"meal": "SNACK", "item": "Greek yogurt", "quantity": 150, "unit": "g"},
+    {"meal": "SNACK", "item": "Almonds", "quantity": 30, "unit": "g"},
+]
+
+SAMPLE_WORKOUT_PLAN = [
+    {
+        "day": f"Day {day}",
+        "focus": "Full Body",
+        "workoutPlan": [
+            {"name": "Squat", "sets": 3, "reps": "8-12", "rest": "90 sec"},
+            {"name": "Bench Press", "sets": 3, "reps": "8-12", "rest": "90 sec"},
+            {"name": "Barbell Row", "sets": 3, "reps": "8-12", "rest": "90 sec"},
+        ],
+    }
+    for day in range(1, 4)
+]
+
+
+Latency = Union[float, str]
+
+
+def latency_sampler(spec: Latency, seed: Optional[int] = None) -> Callable[[], float]:
+    """Build a function that draws one latency in seconds from ``spec``.
+
+    ``spec`` is a number of seconds or ``"fixed:S"``, ``"uniform:LOW,HIGH"``,
+    ``"normal:MEAN,STDDEV"`` or ``"lognormal:MEDIAN,SIGMA"`` (a long tail,
+    closest to real API latencies). Draws are never negative.
+    """
+    if isinstance(spec, (int, float)):
+        return lambda: float(spec)
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "fixed", kind
+    values = [float(value) for value in params.split(",")]
+    rng = random.Random(seed)
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda: values[0] * rng.lognormvariate(0.0, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+def meal_plan_payload(items: int) -> list:
+    """SAMPLE_MEAL_PLAN repeated or truncated to ``items`` entries"""
+    return [SAMPLE_MEAL_PLAN[index % len(SAMPLE_MEAL_PLAN)] for index in range(items)]
+
+
+def create_llm_app(latency: Latency = 1.0, chunk_size: int = 8, error_rate: float = 0.0,
+                   meal_items: Optional[int] = None, seed: Optional[int] = None) -> web.Application:
+    """Mock chat-completions endpoint that takes ``latency`` seconds per completion.
+
+    Streaming requests (``"stream": true``) receive the same content as
+    server-sent events spread evenly over the drawn latency. ``error_rate``
+    of requests fail with a 500 after the latency; ``meal_items`` sets the
+    size of the meal plan payload.
+    """
+    draw_latency = latency_sampler(latency, seed)
+    rng = random.Random(seed)
+    meal_plan = meal_plan_payload(meal_items) if meal_items else SAMPLE_MEAL_PLAN
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        system = body["messages"][0]["content"]
+        payload = SAMPLE_WORKOUT_PLAN if "workout" in system else meal_plan
+        content = json.dumps(payload)
+        # Rough 4 characters per token, enough for the usage metrics
+        usage = {"prompt_tokens": len(json.dumps(body["messages"])) // 4, "completion_tokens": len(content) // 4}
+        delay = draw_latency()
+
+        if rng.random() < error_rate:
+            await asyncio.sleep(delay)
+            return web.json_response({"error": {"message": "mock upstream failure"}}, status=500)
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return web.json_response({
+                "choices": [{
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+        for chunk in chunks:
+            await asyncio.sleep(delay / len(chunks))
+            event = {"choices": [{"delta": {"content": chunk}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        if (body.get("stream_options") or {}).get("include_usage"):
+            event = {"choices": [], "usage": usage}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def start_server(app: web.Application, port: int = 0) -> tuple:
+    """Start ``app`` on localhost and return ``(runner, base_url)``"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{bound_port}"
+
+
+def serve_in_thread(app: web.Application) -> str:
+    """Serve ``app`` from its own thread and event loop; returns the base URL.
+
+    Keeping mocks off the benchmark's loop means a blocked app loop cannot
+    also stall the upstreams it is waiting on.
+    """
+    ready = threading.Event()
+    state = {}
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _, state["url"] = loop.run_until_complete(start_server(app))
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return state["url"]
+
+
+def _mock_serving(food_id: int) -> dict:
+    return {
+        "serving_description": "100 g",
+        "metric_serving_amount": "100.000",
+        "metric_serving_unit": "g",
+        "calories": str(100 + food_id % 200),
+        "protein": "10.0",
+        "carbohydrate": "20.0",
+        "fat": "5.0",
+        "saturated_fat": "1.5",
+        "sugar": "3.0",
+        "fiber": "2.0",
+        "cholesterol": "30",
+        "sodium": "120",
+        "potassium": "250",
+    }
+
+
+def create_fatsecret_app(latency: Latency = 0.05, token_latency: float = 0.2,
+                         expires_in: int = 86400, error_rate: float = 0.0,
+                         search_results: int = 1, servings: int = 1,
+                         seed: Optional[int] = None) -> web.Application:
+    """Mock FatSecret OAuth and ``server.api`` endpoints.
+
+    ``error_rate`` of API calls fail with a 503. ``search_results`` and
+    ``servings`` set payload sizes. Food ids are derived from the search
+    text, so the same name always gets the same nutrients. Request and
+    connection counts are kept in ``app["stats"]``.
+    """
+    stats = {"token_requests": 0, "search_requests": 0, "detail_requests": 0, "errors": 0,
+             "connections": set()}
+    draw_latency = latency_sampler(latency, seed)
+    rng = random.Random(seed)
+
+    def track(request: web.Request) -> None:
+        stats["connections"].add(id(request.transport))
+
+    async def token(request: web.Request) -> web.Response:
+        track(request)
+        stats["token_requests"] += 1
+        await asyncio.sleep(token_latency)
+        return web.json_response({"access_token": f"token-{stats['token_requests']}",
+                                  "expires_in": expires_in, "token_type": "Bearer"})
+
+    async def server_api(request: web.Request) -> web.Response:
+        track(request)
+        await asyncio.sleep(draw_latency())
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": {"code": 12, "message": "mock upstream failure"}}, status=503)
+        method = request.query.get("method")
+        if method == "foods.search":
+            stats["search_requests"] += 1
+            expression = request.query.get("search_expression", "")
+            food_id = zlib.crc32(expression.lower().encode()) % 100000
+            return web.json_response({"foods": {"food": [
+                {"food_id": str(food_id + offset), "food_name": f"{expression} {offset}" if offset else expression}
+                for offset in range(search_results)
+            ]}})
+        if method == "food.get.v2":
+            stats["detail_requests"] += 1
+            food_id = int(request.query.get("food_id", "0"))
+            return web.json_response({"food": {
+                "food_id": str(food_id),
+                "servings": {"serving": [_mock_serving(food_id) for _ in range(servings)]},
+            }})
+        return web.json_response({"error": {"code": 3, "message": "unknown method"}}, status=400)
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/connect/token", token)
+    app.router.add_get("/rest/server.api", server_api)
+    return app
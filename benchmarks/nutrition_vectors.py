@@ -0,0 +1,88 @@
+"""Microbenchmark: nutrition aggregation with Pydantic models vs NutrientVector.
+
+Both paths start from resolved per-100 g foods and produce the total for
+N items. The model path builds a NutritionResponse per item and sums
+them field by field (the pre-vector implementation); the vector path
+scales all items in one matrix, sums ``array('d')`` rows and converts
+only the total.
+
+    python -m benchmarks.nutrition_vectors --items 1000 --repeat 20
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+
+from app.models.schemas import FoodItem, NutrientInfo, NutritionResponse  # noqa: E402
+from app.services.nutrient_db import compute_nutrition, nutrient_db, portion_grams  # noqa: E402
+from app.services.nutrient_vector import NUTRIENT_FIELDS, NUTRIENT_UNITS, NutrientVector  # noqa: E402
+
+
+def model_path(records, items) -> NutritionResponse:
+    responses = []
+    for record, item in zip(records, items):
+        factor = portion_grams(record, item) / 100.0
+        responses.append(NutritionResponse(**{
+            field: NutrientInfo(value=round(record.per_100g.get(field, 0.0) * factor, 2), unit=NUTRIENT_UNITS[field])
+            for field in NUTRIENT_FIELDS
+        }))
+
+    total_nutrition = {}
+    for nutrient in NUTRIENT_FIELDS:
+        total = sum(getattr(data, nutrient).value for data in responses if getattr(data, nutrient) is not None)
+        unit = next((getattr(data, nutrient).unit for data in responses
+                     if getattr(data, nutrient) is not None), 'g')
+        total_nutrition[nutrient] = NutrientInfo(value=round(total, 2), unit=unit)
+    return NutritionResponse(**total_nutrition)
+
+
+def vector_path(records, items) -> NutritionResponse:
+    return NutrientVector.total(compute_nutrition(records, items)).to_response()
+
+
+def measure(path, records, items, repeat: int) -> dict:
+    path(records, items)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        path(records, items)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    path(records, items)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": elapsed * 1000, "peak_kb": peak / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    nutrient_db.load()
+    rng = random.Random(7)
+    names = list(nutrient_db.names)
+    items = [
+        FoodItem(meal="LUNCH", name=rng.choice(names), quantity=rng.choice([1, 2, 50, 100, 150, 250]),
+                 unit=rng.choice(["g", "ml", "pcs", "serving"]))
+        for _ in range(args.items)
+    ]
+    records = [nutrient_db.get(item.name) for item in items]
+
+    results = {"models": measure(model_path, records, items, args.repeat),
+               "vectors": measure(vector_path, records, items, args.repeat)}
+    print(f"{args.items} items, 16 nutrients each")
+    for label, result in results.items():
+        print(f"{label:<8} {result['ms']:8.2f} ms  {result['peak_kb']:8.0f} KB peak allocation")
+    speedup = results["models"]["ms"] / results["vectors"]["ms"]
+    print(f"vectors are {speedup:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Sequential vs pipelined /meal-plans?include_nutrition=true.
+
+The sequential path waits for the whole completion before starting any
+FatSecret lookup; the pipelined path starts each lookup as soon as its
+item is parsed from the stream.
+
+    python -m benchmarks.pipeline --latency 2.0 --fatsecret-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import aiohttp
+
+from benchmarks.concurrent_meal_plans import PROFILE
+from benchmarks.mock_servers import create_fatsecret_app, create_llm_app, serve_in_thread
+
+
+async def main(latency: float, fatsecret_latency: float, runs: int, port: int) -> None:
+    llm_url = serve_in_thread(create_llm_app(latency))
+    fatsecret_url = serve_in_thread(create_fatsecret_app(latency=fatsecret_latency))
+    os.environ.setdefault("API_KEY", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+    os.environ["API_URL"] = f"{llm_url}/v1/chat/completions"
+    os.environ["FAT_SECRET_BASEURL"] = f"{fatsecret_url}/rest/server.api"
+    os.environ["FAT_SECRET_AUTH_URL"] = f"{fatsecret_url}/connect/token"
+    # Every run should pay for its lookups
+    os.environ["NUTRITION_CACHE_PATH"] = ""
+    os.environ["NUTRITION_CACHE_TTL_SECONDS"] = "0"
+
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"http://127.0.0.1:{port}/api/v1/meal-plans"
+    timings = {"sequential": [], "pipelined": []}
+    async with aiohttp.ClientSession() as session:
+        for _ in range(runs):
+            for label, pipeline in (("sequential", "false"), ("pipelined", "true")):
+                start = time.perf_counter()
+                async with session.post(url, json=PROFILE,
+                                        params={"include_nutrition": "true", "pipeline": pipeline}) as response:
+                    body = await response.json()
+                timings[label].append(time.perf_counter() - start)
+                assert body["foods_nutrition"], body
+
+    server.should_exit = True
+    await server_task
+
+    print(f"mock LLM {latency:.2f}s, mock FatSecret {fatsecret_latency:.2f}s per call, {runs} runs")
+    for label, values in timings.items():
+        print(f"{label:<11} mean {sum(values) / len(values):.2f}s  min {min(values):.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--fatsecret-latency", type=float, default=0.3)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.fatsecret_latency, args.runs, args.port))
@@ -0,0 +1,101 @@
+"""Microbenchmark: per-request CPU spent turning LLM output into a response.
+
+The legacy path cleaned the decoded items into dicts, re-encoded them as
+indented ``meal_plan_text``, decoded that text again to build FoodItems
+for nutrition and rendered the response with the stdlib encoder. The
+typed path validates the items once, keeps them on the plan and renders
+with orjson (when installed).
+
+    python -m benchmarks.plan_parsing --items 16 --repeat 2000
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+os.environ.setdefault("API_KEY", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+
+from pydantic import BaseModel  # noqa: E402
+from app.api.serialization import orjson  # noqa: E402
+from app.models.schemas import FoodItem, MealPlan, UserProfile, parse_meal_items  # noqa: E402
+from benchmarks.concurrent_meal_plans import PROFILE  # noqa: E402
+from benchmarks.mock_servers import SAMPLE_MEAL_PLAN  # noqa: E402
+
+
+class LegacyMealPlan(BaseModel):
+    id: str
+    user_profile: UserProfile
+    meal_plan_text: str
+    response_time_seconds: float
+
+
+def legacy_clean(item: Dict) -> Optional[Dict]:
+    if not isinstance(item, dict) or not item.get("item"):
+        return None
+    return {
+        "mealPlanType": item.get("meal", "SNACK"),
+        "name": item.get("item").strip(),
+        "totalFood": float(item.get("quantity", 1)),
+        "unit": item.get("unit", "g").lower(),
+        "servingSize": float(item.get("quantity", 1))
+    }
+
+
+def legacy_food_item(item: Dict) -> Optional[FoodItem]:
+    quantity = float(item.get("quantity") or item.get("totalFood", 1.0))
+    try:
+        return FoodItem(meal=item.get("meal") or item.get("mealPlanType", "SNACK"),
+                        name=(item.get("item") or item.get("name", "")).strip(),
+                        quantity=quantity, unit=item.get("unit", "g").lower(), serving_size=quantity)
+    except ValueError:
+        return None
+
+
+def legacy_path(content: str, user: UserProfile) -> bytes:
+    cleaned = [item for item in map(legacy_clean, json.loads(content)) if item is not None]
+    plan = LegacyMealPlan(id="plan", user_profile=user, meal_plan_text=json.dumps(cleaned, indent=2),
+                          response_time_seconds=1.0)
+    food_items: List[FoodItem] = [item for item in map(legacy_food_item, json.loads(plan.meal_plan_text)) if item]
+    assert food_items
+    return json.dumps(plan.model_dump(mode="json")).encode()
+
+
+def typed_path(content: str, user: UserProfile) -> bytes:
+    plan = MealPlan(id="plan", user_profile=user, items=parse_meal_items(json.loads(content)),
+                    response_time_seconds=1.0)
+    assert plan.items
+    data = plan.model_dump(mode="json")
+    return orjson.dumps(data) if orjson is not None else json.dumps(data).encode()
+
+
+def measure(path, content: str, user: UserProfile, repeat: int) -> float:
+    path(content, user)  # warm up
+    start = time.process_time()
+    for _ in range(repeat):
+        path(content, user)
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    items = [SAMPLE_MEAL_PLAN[i % len(SAMPLE_MEAL_PLAN)] for i in range(args.items)]
+    content = json.dumps(items)
+    user = UserProfile(**PROFILE)
+
+    legacy = measure(legacy_path, content, user, args.repeat)
+    typed = measure(typed_path, content, user, args.repeat)
+    print(f"{args.items} items per plan, orjson {'on' if orjson is not None else 'not installed'}")
+    print(f"legacy  {legacy:8.1f} us CPU per request")
+    print(f"typed   {typed:8.1f} us CPU per request")
+    print(f"saved   {legacy - typed:8.1f} us ({1 - typed / legacy:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Time-to-first-item for /meal-plans versus /meal-plans/stream.
+
+Both endpoints run against the same mock LLM (and, with
+``--include-nutrition``, a mock FatSecret server).
+
+    python -m benchmarks.stream_meal_plan --latency 2.0 --include-nutrition
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+
+from benchmarks.concurrent_meal_plans import PROFILE
+from benchmarks.mock_servers import create_fatsecret_app, create_llm_app, serve_in_thread
+
+
+async def main(latency: float, fatsecret_latency: float, include_nutrition: bool, port: int) -> None:
+    llm_url = serve_in_thread(create_llm_app(latency))
+    fatsecret_url = serve_in_thread(create_fatsecret_app(latency=fatsecret_latency))
+    os.environ.setdefault("API_KEY", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_ID", "benchmark")
+    os.environ.setdefault("FAT_SECRET_CLIENT_SECRET", "benchmark")
+    os.environ["API_URL"] = f"{llm_url}/v1/chat/completions"
+    os.environ["FAT_SECRET_BASEURL"] = f"{fatsecret_url}/rest/server.api"
+    os.environ["FAT_SECRET_AUTH_URL"] = f"{fatsecret_url}/connect/token"
+    # Measure cold lookups every run
+    os.environ["NUTRITION_CACHE_PATH"] = ""
+    os.environ["NUTRITION_CACHE_TTL_SECONDS"] = "0"
+
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}/api/v1"
+    params = {"include_nutrition": "true" if include_nutrition else "false"}
+    async with aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        async with session.post(f"{base}/meal-plans", json=PROFILE, params=params) as response:
+            await response.read()
+        blocking_total = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first_item = first_nutrition = None
+        async with session.post(f"{base}/meal-plans/stream", json=PROFILE, params=params) as response:
+            async for line in response.content:
+                event = json.loads(line)
+                elapsed = time.perf_counter() - start
+                if event["event"] == "item" and first_item is None:
+                    first_item = elapsed
+                if event["event"] == "nutrition" and first_nutrition is None:
+                    first_nutrition = elapsed
+        streaming_total = time.perf_counter() - start
+
+    server.should_exit = True
+    await server_task
+
+    print(f"/meal-plans         first item: {blocking_total:.2f}s  complete: {blocking_total:.2f}s")
+    print(f"/meal-plans/stream  first item: {first_item:.2f}s  complete: {streaming_total:.2f}s")
+    if first_nutrition is not None:
+        print(f"/meal-plans/stream  first nutrition: {first_nutrition:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--fatsecret-latency", type=float, default=0.1)
+    parser.add_argument("--include-nutrition", action="store_true")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.fatsecret_latency, args.include_nutrition, args.port))
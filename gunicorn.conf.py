@@ -0,0 +1,32 @@
+"""Production server settings: ``gunicorn main:app -c gunicorn.conf.py``
+
+Uvicorn workers, one per CPU unless WEB_CONCURRENCY says otherwise. The
+app is imported once in the master and forked (preload), without the
+reloader. State the workers must agree on (FatSecret token, plan cache,
+batch job progress, stored plans, nutrition cache) lives in the SQLite
+files under ./data.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+reload = False
+# Requests end within REQUEST_BUDGET_SECONDS (60 s), but with the budget
+# disabled an LLM call may take LLM_TIMEOUT_SECONDS (120 s) plus retries
+timeout = int(os.getenv("WORKER_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+
+if workers > 1:
+    # Plans saved by one worker must be readable by the others immediately
+    os.environ.setdefault("PLAN_STORE_BATCH_SIZE", "1")
+
+
+def on_starting(server):
+    if workers > 1 and os.getenv("PLAN_STORE_BACKEND", "sqlite") == "memory":
+        server.log.warning("PLAN_STORE_BACKEND=memory with %d workers: plans are only visible to the worker that saved them", workers)
+    if workers > 1 and os.getenv("SHARED_STATE_PATH") == "":
+        server.log.warning("SHARED_STATE_PATH is empty with %d workers: token, plan cache and batch jobs are per worker", workers)
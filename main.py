@@ -1,15 +1,33 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
+from app.api.serialization import response_class
+from app.api.middleware import RequestMetricsMiddleware
 from app.core.config import settings
+from app.core.logging_config import setup_logging, stop_logging
+from app.services.llm_client import llm_client
+from app.services.nutrition_cache import nutrition_cache
+from app.services.nutrient_db import nutrient_db
+from app.services.food_matcher import food_matcher
+from app.services.fatsecret_client import fatsecret_client
+from app.db.database import init_db, plan_store
+from app.db.shared_state import shared_state
+from app.services.nutrition_service import warm_nutrition_cache
+from app.services.metrics_publisher import publish_metrics, publish_periodically
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
+setup_logging()
+logger = logging.getLogger("app.main")
+
 app = FastAPI(
     title="Meal Plan API",
     description="API for generating personalized meal plans",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=response_class()
 )
 
 # Configure CORS
@@ -20,14 +38,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 @app.on_event("startup")
 async def start_app():
-    print("Application started!")
+    await llm_client.start()
+    await fatsecret_client.start()
+    if settings.NUTRIENT_DB_ENABLED:
+        nutrient_db.load()
+    await nutrition_cache.open()
+    await food_matcher.open()
+    await shared_state.open()
+    await init_db()
+    if settings.SHARED_STATE_PATH:
+        # Each worker shares its metrics so any worker can serve /metrics for all of them
+        app.state.metrics_publisher = asyncio.create_task(publish_periodically())
+    if settings.NUTRITION_CACHE_WARM_FOODS:
+        # Warm in the background so startup is not held up by FatSecret
+        asyncio.create_task(warm_nutrition_cache(settings.NUTRITION_CACHE_WARM_FOODS))
+    logger.info("Application started")
 
 @app.on_event("shutdown")
 async def shutdown_app():
-    print("Application shutting down")
+    logger.info("Application shutting down")
+    if getattr(app.state, "metrics_publisher", None) is not None:
+        app.state.metrics_publisher.cancel()
+        await publish_metrics()
+    await llm_client.close()
+    await fatsecret_client.close()
+    await nutrition_cache.close()
+    await food_matcher.close()
+    await plan_store.close()
+    await shared_state.close()
+    stop_logging()
 
 # Include router with versioned prefix
 app.include_router(router, prefix="/api/v1")
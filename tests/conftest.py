@@ -0,0 +1,53 @@
+import os
+
+# Settings are read at import: keep tests offline and free of on-disk state
+os.environ.update(
+    API_KEY="test",
+    FAT_SECRET_CLIENT_ID="test",
+    FAT_SECRET_CLIENT_SECRET="test",
+    NUTRIENT_DB_ENABLED="false",
+    NUTRITION_CACHE_PATH="",
+    FOOD_ALIAS_PATH="",
+    FOOD_CATALOG_PATH="",
+    SHARED_STATE_PATH="",
+    PLAN_STORE_BACKEND="memory",
+    REQUEST_BUDGET_SECONDS="0",
+)
+
+import pytest
+
+from app.core.config import settings
+from app.services.fatsecret_client import fatsecret_client
+from app.services.food_matcher import FoodNameIndex, food_matcher
+from app.services.nutrition_cache import nutrition_cache
+from benchmarks.mock_servers import create_fatsecret_app, serve_in_thread
+
+
+def serve_fatsecret(monkeypatch, latency: float):
+    app = create_fatsecret_app(latency=latency, token_latency=0.0)
+    url = serve_in_thread(app)
+    monkeypatch.setattr(settings, "FAT_SECRET_BASEURL", f"{url}/rest/server.api")
+    monkeypatch.setattr(settings, "FAT_SECRET_AUTH_URL", f"{url}/connect/token")
+    nutrition_cache._memory.clear()
+    food_matcher.aliases.clear()
+    food_matcher.index = FoodNameIndex()
+    # Sessions and tokens belong to the previous test's event loop and server
+    fatsecret_client._session = None
+    fatsecret_client._access_token = None
+    fatsecret_client._refresh_task = None
+    return app["stats"]
+
+
+@pytest.fixture
+def fatsecret(monkeypatch):
+    """A fresh mock FatSecret server, with the nutrition cache and learned aliases cleared.
+
+    Returns the mock's request counters (``search_requests``, ``detail_requests``, ...).
+    """
+    return serve_fatsecret(monkeypatch, latency=0.01)
+
+
+@pytest.fixture
+def slow_fatsecret(monkeypatch):
+    """As ``fatsecret``, but every API call takes half a second"""
+    return serve_fatsecret(monkeypatch, latency=0.5)
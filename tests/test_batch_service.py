@@ -0,0 +1,55 @@
+import asyncio
+
+from fastapi import HTTPException
+
+from app.db.shared_state import SharedState
+from app.models.schemas import UserProfile
+from app.services import batch_service
+from benchmarks.concurrent_meal_plans import PROFILE
+
+
+def test_progress_seen_by_another_worker_is_consistent(tmp_path, monkeypatch):
+    state = SharedState(str(tmp_path / "state.db"))
+    monkeypatch.setattr(batch_service, "shared_state", state)
+    other = UserProfile(**{**PROFILE, "age": 45})
+
+    async def publish_progress():
+        await state.open()
+        try:
+            job = await batch_service.create_batch_job([UserProfile(**PROFILE), other], include_nutrition=False)
+            job.status = "running"
+            job.stats.completed, job.stats.failed = 1, 1
+            job.items[0].status, job.items[0].meal_plan_id = "completed", "plan-1"
+            job.items[1].status, job.items[1].error = "failed", "LLM failed"
+            batch_service._published_at.clear()  # skip the publish interval
+            await batch_service.publish_batch_job(job)
+            # As seen by another worker
+            batch_service.batch_jobs.pop(job.job_id)
+            return await batch_service.get_batch_job(job.job_id)
+        finally:
+            await state.close()
+
+    polled = asyncio.run(publish_progress())
+
+    assert polled.status == "running"
+    assert (polled.stats.completed, polled.stats.failed) == (1, 1)
+    assert [(item.status, item.meal_plan_id, item.error) for item in polled.items] == [
+        ("completed", "plan-1", None),
+        ("failed", None, "LLM failed"),
+    ]
+
+
+def test_structured_error_detail_is_stored_as_text(monkeypatch):
+    async def failing_get_meal_plan(profile, targets=None):
+        raise HTTPException(status_code=502, detail={"error": "upstream", "status": 503})
+
+    monkeypatch.setattr(batch_service, "get_meal_plan", failing_get_meal_plan)
+
+    async def run_job():
+        job = await batch_service.create_batch_job([UserProfile(**PROFILE)], include_nutrition=False)
+        return [item async for item in batch_service.run_batch_job(job, [UserProfile(**PROFILE)])]
+
+    [item] = asyncio.run(run_job())
+
+    assert item.status == "failed"
+    assert item.error == "{'error': 'upstream', 'status': 503}"
@@ -0,0 +1,94 @@
+import asyncio
+import contextvars
+import time
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.models.schemas import FoodItem, MealPlan, UserProfile
+from app.services import combined_service
+from app.services.deadline import remaining, request_deadline, start_budget, upstream_timeout
+from app.services.fatsecret_client import fatsecret_client
+from app.services.llm_client import llm_client
+from app.services.targets import macro_targets
+from benchmarks.concurrent_meal_plans import PROFILE
+from benchmarks.mock_servers import create_llm_app, serve_in_thread
+
+
+def in_context(fn):
+    """Run ``fn`` in a copy of the context, so budgets do not leak between tests"""
+    return contextvars.copy_context().run(fn)
+
+
+def test_no_budget_leaves_limits_alone():
+    def check():
+        start_budget(0)
+        return remaining(), upstream_timeout(120.0)
+
+    assert in_context(check) == (None, 120.0)
+
+
+def test_budget_caps_upstream_timeouts():
+    def check():
+        start_budget(10.0)
+        return remaining(), upstream_timeout(120.0), upstream_timeout(5.0)
+
+    left, capped, uncapped = in_context(check)
+    assert 9.0 < left <= 10.0
+    assert 9.0 < capped <= 10.0
+    assert uncapped == 5.0
+
+
+def test_exhausted_budget_raises_504():
+    def check():
+        request_deadline.set(time.monotonic() - 1.0)
+        assert remaining() == 0.0
+        upstream_timeout(120.0)
+
+    with pytest.raises(HTTPException) as error:
+        in_context(check)
+    assert error.value.status_code == 504
+
+
+def test_llm_call_over_budget_returns_504(monkeypatch):
+    url = serve_in_thread(create_llm_app(latency=2.0))
+    monkeypatch.setattr(settings, "API_URL", f"{url}/v1/chat/completions")
+
+    async def call():
+        start_budget(0.2)
+        try:
+            await llm_client.chat_completion([{"role": "user", "content": "plan"}], kind="meal")
+        finally:
+            await llm_client.close()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(call())
+    assert error.value.status_code == 504
+
+
+def test_lookups_past_the_deadline_are_pending(slow_fatsecret, monkeypatch):
+    user = UserProfile(**PROFILE)
+    items = [FoodItem.from_plan_item({"meal": "LUNCH", "item": name, "quantity": 100, "unit": "g"})
+             for name in ("Brown rice", "Grilled chicken breast")]
+
+    async def fake_get_meal_plan(user, use_cache=False, targets=None):
+        return MealPlan(id=str(uuid.uuid4()), user_profile=user, items=items, response_time_seconds=0.0,
+                        targets=(targets or macro_targets(user)).to_model())
+
+    monkeypatch.setattr(combined_service, "get_meal_plan", fake_get_meal_plan)
+
+    async def plan():
+        start_budget(0.2)
+        try:
+            return await combined_service.get_meal_plan_with_nutrition(user)
+        finally:
+            await fatsecret_client.close()
+
+    result = asyncio.run(plan())
+
+    assert result.nutrition_complete is False
+    assert [food.pending for food in result.foods_nutrition] == [True, True]
+    assert all(food.nutrition is None for food in result.foods_nutrition)
+    assert result.total_nutrition is None
@@ -0,0 +1,34 @@
+import pytest
+
+from app.services.json_stream import JSONArrayStreamParser
+
+GOOD = '{"item": "Oatmeal", "quantity": 80}'
+TRAILING_COMMA = '{"item": "Eggs", "quantity": 2,}'
+GARBAGE = '{"item": "Rice" "quantity": 150}'
+
+
+def feed_in_chunks(parser, text, size=7):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+def test_trailing_comma_in_element_is_repaired():
+    items = feed_in_chunks(JSONArrayStreamParser(), f"[{TRAILING_COMMA}, {GOOD}]")
+
+    assert items == [{"item": "Eggs", "quantity": 2}, {"item": "Oatmeal", "quantity": 80}]
+
+
+def test_malformed_element_raises_by_default():
+    with pytest.raises(ValueError):
+        feed_in_chunks(JSONArrayStreamParser(), f"[{GARBAGE}, {GOOD}]")
+
+
+def test_skip_invalid_drops_only_the_malformed_element():
+    parser = JSONArrayStreamParser(skip_invalid=True)
+    items = feed_in_chunks(parser, f"```json\n[{GOOD}, {GARBAGE}, {TRAILING_COMMA}]\n```")
+
+    assert [item["item"] for item in items] == ["Oatmeal", "Eggs"]
+    assert parser.skipped == 1
+    assert parser.finished
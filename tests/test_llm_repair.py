@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm_repair import join_continuation, repair_json_array, repair_stats
+from app.services.openAI_services import decode_plan_response
+
+EGGS = {"meal": "BREAKFAST", "item": "Eggs", "quantity": 2, "unit": "pcs"}
+OATS = {"meal": "BREAKFAST", "item": "Oatmeal", "quantity": 80, "unit": "g"}
+PLAN = json.dumps([EGGS, OATS], indent=2)
+
+
+def test_complete_array_is_clean():
+    repair = repair_json_array(PLAN, "meal")
+
+    assert repair.outcome == "clean"
+    assert repair.elements == [EGGS, OATS]
+
+
+def test_fenced_array_with_trailing_comma_is_repaired():
+    repair = repair_json_array(f"```json\n{PLAN[:-2]},\n]\n```", "meal")
+
+    assert repair.outcome == "repaired"
+    assert repair.elements == [EGGS, OATS]
+
+
+def test_array_followed_by_prose_with_braces_is_repaired():
+    text = PLAN + '\n\nNote: swap {"item": "Eggs"} for tofu if vegan.'
+    repair = repair_json_array(text, "meal")
+
+    assert repair.outcome == "repaired"
+    assert repair.elements == [EGGS, OATS]
+    assert repair.kept == PLAN
+
+
+def test_truncated_mid_object_keeps_complete_elements():
+    text = PLAN[:PLAN.index('"Oatmeal"') + 4]
+    repair = repair_json_array(text, "meal")
+
+    assert repair.outcome == "truncated"
+    assert repair.elements == [EGGS]
+    assert json.loads(join_continuation(repair.prefix, json.dumps(OATS) + "]")) == [EGGS, OATS]
+
+
+@pytest.mark.parametrize("text", ['{"error": "nope"}', "Sorry, I can't help with that.", "", '[{"meal": "BREAKF'])
+def test_nothing_to_keep_fails(text):
+    assert repair_json_array(text, "meal") == (None, "failed", "", "")
+
+
+def test_tokens_saved_counts_only_kept_output(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CONTINUATION_ENABLED", False)
+    prose = " Enjoy your meals! " * 20
+    content = PLAN + prose + "{"
+    result = {"choices": [{"message": {"content": content}}], "usage": {"completion_tokens": 300}}
+    before = repair_stats.counters["tokens_saved"]
+
+    elements = asyncio.run(decode_plan_response("meal", [], result, max_tokens=1000))
+
+    assert elements == [EGGS, OATS]
+    saved = repair_stats.counters["tokens_saved"] - before
+    assert saved == round(300 * len(PLAN) / len(content))
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from app.core.metrics import Counter, Histogram, Metric, Registry
+
+
+def test_render_merged_sums_worker_snapshots():
+    registry = Registry()
+    errors = registry.register(Counter("errors_total", "Errors", ("upstream",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    errors.inc(upstream="llm")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    # Snapshots travel between workers as JSON
+    snapshot = json.loads(json.dumps(registry.snapshot()))
+
+    assert registry.render_merged([snapshot]) == registry.render()
+    merged = registry.render_merged([snapshot, snapshot]).splitlines()
+    assert 'errors_total{upstream="llm"} 2' in merged
+    assert 'latency_seconds_bucket{le="0.1"} 2' in merged
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in merged
+    assert "latency_seconds_sum 1.1" in merged
+
+
+def test_incomplete_metric_fails_at_construction():
+    class NoSamples(Metric):
+        def collect(self):
+            return {}
+
+    with pytest.raises(TypeError):
+        NoSamples("no_samples", "Missing samples()")
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.services.food_matcher import FoodMatcher, FoodNameIndex, covers
+from app.services.nutrient_db import BUNDLED_FOODS_PATH, NutrientDatabase
+
+HEADER = "food_id,name,aliases,grams_per_piece,grams_per_serving,grams_per_ml,calories,protein,carbs,fat\n"
+
+
+@pytest.fixture
+def dry_foods_db(tmp_path):
+    """A table with the dry foods but not the drinks named after them"""
+    path = tmp_path / "foods.csv"
+    path.write_text(
+        HEADER
+        + "1,whey protein,whey protein powder|protein powder,,30,,400,78,10,6.7\n"
+        + "2,dark chocolate,chocolate,10,28,,598,7.8,45.9,42.6\n"
+    )
+    db = NutrientDatabase(str(path))
+    db.load()
+    return db
+
+
+@pytest.fixture(scope="module")
+def bundled_db():
+    db = NutrientDatabase(BUNDLED_FOODS_PATH)
+    db.load()
+    return db
+
+
+@pytest.mark.parametrize("name", ["chocolate milk", "whey protein shake", "Chocolate Milkshake"])
+def test_drinks_do_not_match_dry_foods(dry_foods_db, name):
+    assert dry_foods_db.lookup(name) is None
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Chocolate", "dark chocolate"),
+    ("Whey protein powders", "whey protein"),
+])
+def test_names_and_aliases_still_match(dry_foods_db, name, expected):
+    assert dry_foods_db.get(name).name == expected
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("grilled chicken breasts, skinless", "chicken breast"),
+    ("Boiled Eggs", "egg"),
+    ("Steamed Broccoli", "broccoli"),
+    ("Cherry tomatoes", "tomato"),
+    ("chocolate milk", "chocolate milk"),
+    ("Protein shake", "protein shake"),
+])
+def test_bundled_table_matches(bundled_db, name, expected):
+    assert bundled_db.get(name).name == expected
+
+
+def test_index_match_whole_words():
+    index = FoodNameIndex()
+    index.build([("chocolate", "1"), ("whey protein", "2")])
+
+    # Trigram scores alone accept the longer names
+    assert index.match("chocolate milk", 0.8) is not None
+    assert index.match("chocolate milk", 0.8, whole_words=True) is None
+    assert index.match("whey protein shake", 0.8, whole_words=True) is None
+    assert index.match("whey proteins", 0.8, whole_words=True).food_id == "2"
+
+
+def test_covers_ignores_descriptors():
+    assert covers("chicken breast", "Grilled chicken breasts, skinless")
+    assert not covers("chocolate", "chocolate milk")
+
+
+def test_only_the_chosen_search_result_is_indexed():
+    matcher = FoodMatcher(alias_path=None, catalog_path=None, min_score=0.8)
+    results = [
+        {"food_id": "1", "food_name": "Chicken Breast Fillets", "food_type": "Brand", "brand_name": "Tyson"},
+        {"food_id": "2", "food_name": "Chicken Breast", "food_type": "Generic"},
+    ]
+
+    food = matcher.choose("grilled chicken breast", results)
+    asyncio.run(matcher.learn("grilled chicken breast", food["food_id"], food["food_name"]))
+
+    assert food["food_id"] == "2"
+    assert len(matcher.index) == 1
+    # The branded result is reached only through a search, never the index
+    assert matcher.resolve("chicken breast fillets") is None
+    assert matcher.resolve("chicken breasts").food_id == "2"
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models.schemas import FoodNutrients
+from app.services.nutrition_cache import NutritionCache, normalize_food_name
+
+OATS = FoodNutrients(name="oats", source="fatsecret", per_100g={"calories": 389.0})
+
+
+def test_promoted_entry_keeps_its_disk_expiry(tmp_path, monkeypatch):
+    path = str(tmp_path / "nutrition.db")
+
+    async def promote():
+        writer = NutritionCache(max_size=10, ttl_seconds=3600, disk_ttl_seconds=60, db_path=path)
+        await writer.open()
+        await writer.set("Oats", OATS)
+        await writer.close()
+
+        reader = NutritionCache(max_size=10, ttl_seconds=3600, disk_ttl_seconds=60, db_path=path)
+        await reader.open()
+        try:
+            assert await reader.get("oats") == OATS
+            # Past the disk expiry but well within the memory TTL
+            later = time.monotonic() + 120
+            monkeypatch.setattr(time, "monotonic", lambda: later)
+            return reader._memory_get(normalize_food_name("oats"))
+        finally:
+            await reader.close()
+
+    assert asyncio.run(promote()) is None
+
+
+@pytest.mark.parametrize("plural, singular", [
+    ("cookies", "cookie"),
+    ("Chocolate Chip Cookies", "chocolate chip cookie"),
+    ("smoothies", "smoothie"),
+    ("brownies", "brownie"),
+    ("pies", "pie"),
+    ("berries", "berry"),
+    ("tomatoes", "tomato"),
+    ("eggs", "egg"),
+])
+def test_plural_and_singular_share_a_key(plural, singular):
+    assert normalize_food_name(plural) == normalize_food_name(singular)
@@ -0,0 +1,96 @@
+import asyncio
+import uuid
+
+from app.models.schemas import FoodItem, MealPlan, UserProfile
+from app.services import combined_service
+from app.services.combined_service import get_meal_plan_with_nutrition
+from app.services.fatsecret_client import fatsecret_client
+from app.services.nutrition_cache import normalize_food_name
+from app.services.nutrition_service import calculate_nutrition_for_foods, resolve_foods_nutrition
+from app.services.targets import macro_targets
+from benchmarks.concurrent_meal_plans import PROFILE
+
+# Repeated names and case/plural variants of the same foods
+ITEMS = [
+    FoodItem.from_plan_item({"meal": meal, "item": name, "quantity": quantity, "unit": unit})
+    for meal, name, quantity, unit in [
+        ("BREAKFAST", "Eggs", 2, "pcs"),
+        ("BREAKFAST", "Oatmeal", 80, "g"),
+        ("LUNCH", "Brown rice", 150, "g"),
+        ("LUNCH", "Grilled chicken breast", 150, "g"),
+        ("DINNER", "brown rice", 100, "g"),
+        ("DINNER", "Egg", 1, "pcs"),
+        ("DINNER", "Grilled Chicken Breasts", 120, "g"),
+        ("SNACK", "oatmeal", 40, "g"),
+    ]
+]
+UNIQUE_FOODS = len({normalize_food_name(item.name) for item in ITEMS})
+
+
+def upstream_calls(stats) -> int:
+    return stats["search_requests"] + stats["detail_requests"]
+
+
+def run(coroutine):
+    async def with_client():
+        try:
+            return await coroutine
+        finally:
+            await fatsecret_client.close()
+    return asyncio.run(with_client())
+
+
+def test_variants_share_one_lookup():
+    assert UNIQUE_FOODS == 4
+
+
+def test_resolve_foods_nutrition_calls_upstream_at_most_twice_per_food(fatsecret):
+    results = run(resolve_foods_nutrition(ITEMS))
+
+    assert all(result is not None for result in results)
+    assert upstream_calls(fatsecret) <= 2 * UNIQUE_FOODS
+
+
+def test_meal_plan_with_nutrition_calls_upstream_at_most_twice_per_food(fatsecret, monkeypatch):
+    user = UserProfile(**PROFILE)
+
+    async def fake_get_meal_plan(user, use_cache=False, targets=None):
+        return MealPlan(
+            id=str(uuid.uuid4()),
+            user_profile=user,
+            items=ITEMS,
+            response_time_seconds=0.0,
+            targets=(targets or macro_targets(user)).to_model()
+        )
+
+    monkeypatch.setattr(combined_service, "get_meal_plan", fake_get_meal_plan)
+    result = run(get_meal_plan_with_nutrition(user))
+
+    assert len(result.foods_nutrition) == len(ITEMS)
+    assert upstream_calls(fatsecret) <= 2 * UNIQUE_FOODS
+
+
+def test_concurrent_identical_calls_add_no_upstream_requests(fatsecret):
+    async def concurrent_calls():
+        await asyncio.gather(
+            *[resolve_foods_nutrition(ITEMS) for _ in range(5)],
+            *[calculate_nutrition_for_foods(ITEMS) for _ in range(5)],
+        )
+
+    run(concurrent_calls())
+
+    # One search and one detail call per food, as for a single call
+    assert upstream_calls(fatsecret) == 2 * UNIQUE_FOODS
+
+
+def test_failed_shared_lookup_is_retried(fatsecret):
+    async def with_failed_lookup():
+        failed = asyncio.get_running_loop().create_future()
+        failed.set_exception(RuntimeError("upstream auth failed"))
+        lookups = {normalize_food_name("Oatmeal"): failed}
+        return await resolve_foods_nutrition([ITEMS[1]], lookups), lookups
+
+    results, lookups = run(with_failed_lookup())
+
+    assert results[0] is not None
+    assert lookups[normalize_food_name("Oatmeal")].result() is not None
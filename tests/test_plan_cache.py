@@ -0,0 +1,14 @@
+from app.models.schemas import UserProfile
+from app.services.plan_cache import profile_fingerprint
+from app.services.targets import macro_targets
+from benchmarks.concurrent_meal_plans import PROFILE
+
+
+def test_meal_plans_for_different_calorie_targets_do_not_share_a_key():
+    user = UserProfile(**PROFILE)
+    other = UserProfile(**dict(PROFILE, height=195, weeklyWeightLossGoal=1.5))
+    assert macro_targets(user).calories != macro_targets(other).calories
+
+    assert profile_fingerprint("meal", user) != profile_fingerprint("meal", other)
+    # Workout plans do not depend on the calorie target
+    assert profile_fingerprint("workout", user) == profile_fingerprint("workout", other)
@@ -0,0 +1,151 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.api.routes import get_all_meal_plans
+from app.db.plan_store import InMemoryPlanStore, SQLitePlanStore, decode_cursor, encode_cursor
+from app.models.schemas import MealPlan, UserProfile
+from benchmarks.concurrent_meal_plans import PROFILE
+
+START = datetime(2026, 1, 1)
+
+
+def make_plan(plan_id: str, minutes: float = 0) -> MealPlan:
+    return MealPlan(id=plan_id, user_profile=UserProfile(**PROFILE), response_time_seconds=0.0,
+                    created_at=START + timedelta(minutes=minutes))
+
+
+def make_store(path, **overrides) -> SQLitePlanStore:
+    options = dict(batch_size=100, flush_interval=60.0, retention_days=0, max_plans=0)
+    options.update(overrides)
+    return SQLitePlanStore(str(path), **options)
+
+
+async def all_pages(store, limit: int):
+    ids, cursor = [], None
+    while True:
+        plans, cursor = await store.list("meal", limit, cursor=cursor)
+        ids.extend(plan.id for plan in plans)
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    key = ("2026-01-01T00:00:00.000000", "plan-1")
+
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", encode_cursor(("only one",))[:-2]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_malformed_cursor_returns_400():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_all_meal_plans(Response(), skip=0, limit=10, cursor="not-a-cursor", include_text=False))
+
+    assert error.value.status_code == 400
+    assert "Invalid cursor" in error.value.detail
+
+
+@pytest.mark.parametrize("store_factory", [
+    lambda path: make_store(path),
+    lambda path: InMemoryPlanStore(max_plans=0),
+], ids=["sqlite", "memory"])
+def test_keyset_pagination_visits_every_plan_once(tmp_path, store_factory):
+    # Saved out of order, with two plans sharing a timestamp
+    plans = [make_plan("c", 2), make_plan("a", 0), make_plan("e", 3), make_plan("b", 1), make_plan("d", 2)]
+
+    async def paginate():
+        store = store_factory(tmp_path / "plans.db")
+        await store.open()
+        try:
+            for plan in plans:
+                await store.save("meal", plan)
+            return await all_pages(store, limit=2), await store.list("meal", 2, skip=3)
+        finally:
+            await store.close()
+
+    ids, (skipped, next_cursor) = asyncio.run(paginate())
+
+    assert ids == ["a", "b", "c", "d", "e"]
+    assert [plan.id for plan in skipped] == ["d", "e"]
+    assert next_cursor is None
+
+
+def test_saves_are_batched_and_flushed_on_close(tmp_path):
+    path = tmp_path / "plans.db"
+
+    async def save_then_close():
+        store = make_store(path)
+        await store.open()
+        for index in range(3):
+            await store.save("meal", make_plan(f"plan-{index}", index))
+        # Buffered plans are readable before they are written
+        assert (await store.get("meal", "plan-1")).id == "plan-1"
+        with sqlite3.connect(str(path)) as db:
+            written = db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        await store.close()
+        return written
+
+    async def reopen():
+        store = make_store(path)
+        try:
+            return await store.count("meal"), await store.get("meal", "plan-2")
+        finally:
+            await store.close()
+
+    assert asyncio.run(save_then_close()) == 0
+    count, plan = asyncio.run(reopen())
+    assert count == 3
+    assert plan.id == "plan-2"
+
+
+def test_full_batch_is_written_immediately(tmp_path):
+    path = tmp_path / "plans.db"
+
+    async def save():
+        store = make_store(path, batch_size=2)
+        await store.open()
+        try:
+            await store.save("meal", make_plan("a"))
+            await store.save("meal", make_plan("b", 1))
+            with sqlite3.connect(str(path)) as db:
+                return db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        finally:
+            await store.close()
+
+    assert asyncio.run(save()) == 2
+
+
+def test_retention_prunes_old_and_excess_plans_on_open(tmp_path):
+    path = tmp_path / "plans.db"
+    now = datetime.utcnow()
+    ages_in_days = {"ancient": 400, "old": 5, "older": 6, "recent": 1, "newest": 0}
+
+    async def save_all():
+        store = make_store(path)
+        await store.open()
+        for plan_id, age in ages_in_days.items():
+            plan = make_plan(plan_id)
+            plan.created_at = now - timedelta(days=age)
+            await store.save("meal", plan)
+        await store.close()
+
+    async def reopen():
+        store = make_store(path, retention_days=90, max_plans=3)
+        await store.open()
+        try:
+            return await all_pages(store, limit=10)
+        finally:
+            await store.close()
+
+    asyncio.run(save_all())
+
+    # Past 90 days is dropped, then only the three newest are kept
+    assert asyncio.run(reopen()) == ["old", "recent", "newest"]
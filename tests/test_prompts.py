@@ -0,0 +1,74 @@
+import pytest
+
+from app.models.schemas import UserProfile
+from app.services import prompts
+from benchmarks.concurrent_meal_plans import PROFILE
+
+
+@pytest.fixture
+def no_encoding_cache():
+    prompts._encoding.cache_clear()
+    prompts._element_tokens.cache_clear()
+    yield
+    prompts._encoding.cache_clear()
+    prompts._element_tokens.cache_clear()
+
+
+def test_system_prompt_is_shared_across_users():
+    other = UserProfile(**{**PROFILE, "age": 52, "weight": 95.0, "dietType": "vegan"})
+    first = prompts.meal_plan_messages(UserProfile(**PROFILE))
+    second = prompts.meal_plan_messages(other, variety="This is Tuesday of a 7-day plan")
+
+    # Only the user message differs, so the cached prefix is reused
+    assert first[0] == second[0] == {"role": "system", "content": prompts.MEAL_PLAN_SYSTEM_PROMPT}
+    assert first[1] != second[1]
+    assert prompts.workout_plan_messages(UserProfile(**PROFILE))[0] == prompts.workout_plan_messages(other)[0]
+
+
+def test_user_message_carries_the_profile_and_targets():
+    content = prompts.meal_plan_messages(UserProfile(**PROFILE))[1]["content"]
+
+    assert "Daily Targets:" in content
+    assert f"Age: {PROFILE['age']}" in content
+    assert "Daily Targets:" not in prompts.MEAL_PLAN_SYSTEM_PROMPT
+
+
+class _OfflineTiktoken:
+    """Fails the way tiktoken does when its BPE files cannot be downloaded"""
+
+    @staticmethod
+    def encoding_for_model(model):
+        raise ConnectionError("cannot download o200k_base.tiktoken")
+
+    @staticmethod
+    def get_encoding(name):
+        raise ConnectionError("cannot download o200k_base.tiktoken")
+
+
+def test_unavailable_encoding_falls_back_to_estimate(monkeypatch, no_encoding_cache):
+    monkeypatch.setattr(prompts, "tiktoken", _OfflineTiktoken)
+
+    text = '[{"item": "Oats", "quantity": 80}]'
+    assert prompts.estimate_tokens(text) == len(prompts._WORD_OR_SYMBOL.findall(text))
+    assert prompts.meal_plan_max_tokens() >= prompts.settings.LLM_MIN_OUTPUT_TOKENS
+
+
+def test_encoding_is_loaded_lazily(monkeypatch, no_encoding_cache):
+    loads = []
+
+    class FakeTiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            loads.append(model)
+            return FakeEncoding()
+
+    class FakeEncoding:
+        @staticmethod
+        def encode(text):
+            return text.split()
+
+    monkeypatch.setattr(prompts, "tiktoken", FakeTiktoken)
+    assert loads == []
+    assert prompts.estimate_tokens("one two three") == 3
+    assert prompts.estimate_tokens("four five") == 2
+    assert loads == [prompts.settings.MODEL]
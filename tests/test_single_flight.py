@@ -0,0 +1,41 @@
+import asyncio
+
+from app.services.single_flight import SingleFlight
+from app.services.upstream_scheduler import BATCH, UpstreamScheduler, request_priority
+
+
+def make_scheduler() -> UpstreamScheduler:
+    return UpstreamScheduler(name="test", max_concurrency=1, rate_per_second=1000.0, burst=1000,
+                             max_retries=0, backoff_base=0.0, backoff_max=0.0)
+
+
+def test_interactive_caller_promotes_batch_started_call():
+    async def scenario():
+        scheduler = make_scheduler()
+        flight = SingleFlight("test")
+        order = []
+        release = asyncio.Event()
+
+        async def call(label):
+            order.append(label)
+
+        async def batch(fn):
+            request_priority.set(BATCH)
+            return await fn()
+
+        # Hold the only slot so everything below queues
+        holder = asyncio.create_task(scheduler.run(release.wait))
+        await asyncio.sleep(0.01)
+        other = asyncio.create_task(batch(lambda: scheduler.run(lambda: call("other batch"))))
+        await asyncio.sleep(0.01)
+        shared = asyncio.create_task(batch(lambda: flight.do("food", lambda: scheduler.run(lambda: call("shared")))))
+        await asyncio.sleep(0.01)
+        # An interactive request joins the batch-started call
+        joined = asyncio.create_task(flight.do("food", lambda: scheduler.run(lambda: call("unused"))))
+        await asyncio.sleep(0.01)
+
+        release.set()
+        await asyncio.gather(holder, shared, other, joined)
+        return order
+
+    assert asyncio.run(scenario()) == ["shared", "other batch"]
@@ -0,0 +1,40 @@
+import uuid
+
+from app.models.schemas import FoodItem, MealPlan, PlanTargets, UserProfile
+from app.services.combined_service import fit_to_targets
+from app.services.nutrient_vector import NutrientVector
+from app.services.targets import missed_targets
+from benchmarks.concurrent_meal_plans import PROFILE
+
+TARGETS = PlanTargets(calories=2000, protein_g=150, carbs_g=200, fat_g=67)
+
+
+def vector(calories, protein, carbs, fat):
+    return NutrientVector.from_mapping({"calories": calories, "protein": protein, "carbs": carbs, "fat": fat})
+
+
+def plan(items):
+    return MealPlan(id=str(uuid.uuid4()), user_profile=UserProfile(**PROFILE), items=items,
+                    response_time_seconds=0.0, targets=TARGETS)
+
+
+def test_missed_targets_checks_every_macro():
+    on_target = [vector(1000, 75, 100, 33), vector(1000, 75, 100, 34)]
+    low_protein = [vector(1000, 40, 150, 33), vector(1000, 40, 150, 34)]
+
+    assert missed_targets(on_target, TARGETS) == []
+    assert missed_targets(low_protein, TARGETS) == ["protein_g", "carbs_g"]
+
+
+def test_fit_to_targets_rescales_calories_and_reports_macro_misses():
+    items = [FoodItem(meal="LUNCH", name="rice", quantity=200, unit="g"),
+             FoodItem(meal="DINNER", name="pasta", quantity=200, unit="g")]
+    # Half the calories, and carb-heavy: rescaling fixes calories but not the macro split
+    nutrition = [vector(500, 10, 110, 8), vector(500, 10, 110, 8)]
+
+    fitted, fitted_nutrition = fit_to_targets(plan(items), nutrition)
+
+    assert fitted.targets.rescale_factor == 2.0
+    assert fitted.items[0].quantity == 400
+    assert "calories" not in fitted.targets.missed_targets
+    assert fitted.targets.missed_targets == ["protein_g", "carbs_g", "fat_g"]
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from app.services import upstream_scheduler
+from app.services.upstream_scheduler import BATCH, INTERACTIVE, RetryableUpstreamError, UpstreamScheduler
+
+real_sleep = asyncio.sleep
+
+
+class FakeClock:
+    """Monotonic time that only moves when the scheduler sleeps"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        await real_sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(upstream_scheduler.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(upstream_scheduler.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def make_scheduler(max_concurrency: int = 1, rate: float = 1000.0, burst: int = 1000,
+                   max_retries: int = 0) -> UpstreamScheduler:
+    return UpstreamScheduler(name="test", max_concurrency=max_concurrency, rate_per_second=rate, burst=burst,
+                             max_retries=max_retries, backoff_base=0.5, backoff_max=4.0)
+
+
+async def settle():
+    for _ in range(10):
+        await real_sleep(0)
+
+
+def test_interactive_calls_are_admitted_before_batch(clock):
+    async def scenario():
+        scheduler = make_scheduler()
+        order = []
+        release = asyncio.Event()
+
+        async def call(label):
+            order.append(label)
+
+        holder = asyncio.create_task(scheduler.run(release.wait))
+        await settle()
+        queued = []
+        for label, priority in [("batch 1", BATCH), ("batch 2", BATCH), ("interactive", INTERACTIVE)]:
+            queued.append(asyncio.create_task(scheduler.run(lambda label=label: call(label), priority=priority)))
+            await settle()
+        assert scheduler.stats()["queue_depth"] == 3
+
+        release.set()
+        await asyncio.gather(holder, *queued)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch 1", "batch 2"]
+
+
+def test_token_bucket_limits_the_call_rate(clock):
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=10, rate=2.0, burst=2)
+        started = clock.now
+        admitted = []
+
+        async def call():
+            admitted.append(clock.now - started)
+
+        await asyncio.gather(*[scheduler.run(call) for _ in range(6)])
+        return admitted
+
+    admitted = asyncio.run(scenario())
+
+    # The burst goes at once, then one call per 1 / rate seconds
+    assert admitted[:2] == [0.0, 0.0]
+    assert admitted[2:] == pytest.approx([0.5, 1.0, 1.5, 2.0])
+
+
+def test_cancelled_waiter_gives_up_its_place(clock):
+    async def scenario():
+        scheduler = make_scheduler()
+        order = []
+        release = asyncio.Event()
+
+        async def call(label):
+            order.append(label)
+
+        holder = asyncio.create_task(scheduler.run(release.wait))
+        await settle()
+        cancelled = asyncio.create_task(scheduler.run(lambda: call("cancelled")))
+        waiting = asyncio.create_task(scheduler.run(lambda: call("waiting")))
+        await settle()
+        cancelled.cancel()
+        await settle()
+
+        release.set()
+        await asyncio.gather(holder, waiting)
+        return order, cancelled.cancelled(), scheduler.stats()
+
+    order, was_cancelled, stats = asyncio.run(scenario())
+
+    assert order == ["waiting"]
+    assert was_cancelled
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_waiter_cancelled_after_the_hand_off_releases_the_slot(clock):
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler._acquire(INTERACTIVE)
+        waiter = asyncio.create_task(scheduler.run(lambda: real_sleep(0)))
+        await settle()
+        # Hand the slot to the waiter and cancel it before it resumes
+        scheduler._release()
+        waiter.cancel()
+        await settle()
+        return waiter.cancelled(), scheduler.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == (True, 0)
+
+
+def test_retryable_errors_are_retried_with_backoff(clock):
+    async def scenario():
+        scheduler = make_scheduler(max_retries=2)
+        attempts = []
+
+        async def flaky():
+            attempts.append(clock.now)
+            if len(attempts) < 3:
+                raise RetryableUpstreamError(429, retry_after=3.0)
+            return "ok"
+
+        return await scheduler.run(flaky), attempts, scheduler.stats()
+
+    result, attempts, stats = asyncio.run(scenario())
+
+    assert result == "ok"
+    # Retry-After is a floor for the jittered backoff
+    assert [later - earlier for earlier, later in zip(attempts, attempts[1:])] == [3.0, 3.0]
+    assert (stats["retries"], stats["rate_limited"], stats["failures"]) == (2, 2, 0)
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.schemas import UserProfile
+from app.services import weekly_plan_service
+from benchmarks.concurrent_meal_plans import PROFILE
+
+
+def test_first_failed_day_cancels_the_others(monkeypatch):
+    finished = []
+
+    async def fake_get_meal_plan(user, variety=None, targets=None):
+        if variety.startswith("This is Monday"):
+            raise HTTPException(status_code=502, detail="LLM failed")
+        await asyncio.sleep(0.2)
+        finished.append(variety)
+
+    monkeypatch.setattr(weekly_plan_service, "get_meal_plan", fake_get_meal_plan)
+
+    async def plan_week():
+        with pytest.raises(HTTPException):
+            await weekly_plan_service.get_weekly_meal_plan(UserProfile(**PROFILE), days=7)
+        # Give any day still running time to finish
+        await asyncio.sleep(0.3)
+
+    asyncio.run(plan_week())
+
+    assert finished == []